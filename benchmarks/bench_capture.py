@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+"""
+截图后端基准测试
+
+示例：
+    python benchmarks/bench_capture.py --backend replay --source test_pic
+    python benchmarks/bench_capture.py --backend mss --frames 200
+"""
+
+import argparse
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from src.core.capture_backend import (ChangeDetector, PILGrabBackend,  # noqa: E402
+                                      ReplayBackend, create_capture_backend)
+
+
+def run_benchmark(backend, bbox, frames, use_array):
+    """连续截图frames次，返回每帧耗时（毫秒）和变化帧数"""
+    detector = ChangeDetector()
+    latencies = []
+    changed_frames = 0
+
+    for _ in range(frames):
+        start = time.perf_counter()
+        frame = backend.grab_array(bbox) if use_array else backend.grab(bbox)
+        if frame is None:
+            frame = backend.grab(bbox)
+        if detector.has_changed(frame):
+            changed_frames += 1
+        latencies.append((time.perf_counter() - start) * 1000)
+
+    return latencies, changed_frames
+
+
+def main():
+    parser = argparse.ArgumentParser(description="截图后端基准测试")
+    parser.add_argument("--backend", default="replay",
+                        choices=["auto", "mss", "pil", "replay"])
+    parser.add_argument("--source", default="test_pic", help="回放后端的图片目录或文件")
+    parser.add_argument("--frames", type=int, default=100)
+    parser.add_argument("--bbox", default="0,0,400,500",
+                        help="截图区域 left,top,right,bottom")
+    parser.add_argument("--array", action="store_true", help="使用NumPy帧视图做变化检测")
+    args = parser.parse_args()
+
+    bbox = tuple(int(value) for value in args.bbox.split(","))
+    if args.backend == "replay":
+        backend = ReplayBackend(args.source)
+    elif args.backend == "pil":
+        backend = PILGrabBackend()
+    else:
+        backend = create_capture_backend(args.backend)
+
+    try:
+        latencies, changed_frames = run_benchmark(
+            backend, bbox, args.frames, args.array)
+    finally:
+        backend.close()
+
+    total = sum(latencies) / 1000
+    latencies.sort()
+    print(f"后端: {backend.name}, 帧数: {args.frames}, 区域: {bbox}")
+    print(f"吞吐: {args.frames / total:.1f} 帧/秒")
+    print(f"延迟: 平均 {statistics.mean(latencies):.2f} ms, "
+          f"P50 {latencies[len(latencies) // 2]:.2f} ms, "
+          f"P95 {latencies[int(len(latencies) * 0.95) - 1]:.2f} ms")
+    print(f"变化帧: {changed_frames}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+# -*- coding: utf-8 -*-
+"""
+多区域识别基准测试
+
+在本进程内启动模拟OCR服务（见fake_ocr_endpoint.py），把一张模拟截图裁剪成多个区域，
+对比逐个区域调用OCRProcessor.recognize_table与RegionScanner并行识别的总耗时。
+并行识别的耗时应接近单个区域的耗时，而不是各区域耗时之和。
+配置只在本进程内修改，不会写入screen_ocr_config.json。
+
+示例：
+    python benchmarks/bench_capture_regions.py
+    python benchmarks/bench_capture_regions.py --regions 6 --latency 0.5 --rounds 3
+"""
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import threading
+import time
+from http.server import ThreadingHTTPServer
+from pathlib import Path
+
+from PIL import Image
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from fake_ocr_endpoint import make_handler  # noqa: E402
+from src.utils import config_manager  # noqa: E402
+from src.core.capture_artifact import CaptureArtifact  # noqa: E402
+from src.core.ocr_processor import OCRProcessor  # noqa: E402
+from src.core.region_scanner import RegionScanner  # noqa: E402
+
+
+def build_regions(count, seed):
+    """生成模拟截图，并按列切分成count个区域，返回[(区域, CaptureArtifact)]"""
+    rng = random.Random(seed)
+    width, height = 240 * count, 600
+    image = Image.frombytes("L", (width, height), rng.randbytes(width * height)).convert("RGB")
+    captured = []
+    for index in range(count):
+        region = {"name": f"区域{index + 1}", "x1": index * 240, "y1": 0,
+                  "x2": (index + 1) * 240, "y2": height,
+                  "profile": "full" if index == 0 else "items"}
+        captured.append((region, CaptureArtifact(image.crop((region["x1"], 0, region["x2"], height)))))
+    return captured
+
+
+def main():
+    parser = argparse.ArgumentParser(description="多区域识别基准测试")
+    parser.add_argument("--regions", type=int, default=4, help="区域数量")
+    parser.add_argument("--latency", type=float, default=0.3, help="模拟OCR服务每次请求的延迟（秒）")
+    parser.add_argument("--rounds", type=int, default=5, help="每种方式的测量轮数")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), make_handler(args.latency, 0.0))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    os.environ.setdefault("TENCENTCLOUD_SECRET_ID", "bench")
+    os.environ.setdefault("TENCENTCLOUD_SECRET_KEY", "bench")
+    config_manager.config.update({
+        "ocr_engine": "tencent",
+        "raw_response_log": "off",
+        "ocr_rate_limit": {"qps": 100, "burst": 100},
+        "ocr_endpoints": [{"name": "fake", "endpoint": f"127.0.0.1:{server.server_port}",
+                           "protocol": "http"}],
+    })
+
+    processor = OCRProcessor()
+    scanner = RegionScanner(processor, max_workers=args.regions)
+    captured = build_regions(args.regions, args.seed)
+    try:
+        # 预热连接
+        processor.recognize_table(CaptureArtifact(Image.new("RGB", (8, 8))), use_template=False)
+
+        def sequential():
+            return scanner.merge(captured, [processor.recognize_table(artifact, False)
+                                            for _, artifact in captured])
+
+        print(f"{args.regions} 个区域, 模拟延迟 {args.latency * 1000:.0f}ms/请求")
+        timings = {}
+        for label, function in (("逐个识别", sequential), ("并行识别", lambda: scanner.scan(captured))):
+            seconds = []
+            for _ in range(args.rounds):
+                # 清空结果缓存，每轮都实际发送请求
+                processor.result_cache.clear()
+                start = time.perf_counter()
+                title, items, _ = function()
+                seconds.append(time.perf_counter() - start)
+            timings[label] = statistics.median(seconds)
+            print(f"{label}  中位数 {timings[label] * 1000:8.1f}ms  标题 {title}, 物品 {len(items)} 个")
+
+        print(f"加速比 x{timings['逐个识别'] / timings['并行识别']:.1f}")
+        return 0
+    finally:
+        scanner.close()
+        processor.close()
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
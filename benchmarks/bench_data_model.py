@@ -0,0 +1,218 @@
+# -*- coding: utf-8 -*-
+"""
+数据模型内存与速度基准测试
+
+生成模拟的历史数据（默认10万个物品），对比原先的字典结构和src/core/models中的
+__slots__模型：标题组、解析后的套装（含驻留的类别名）和历史数量各自占用的内存，
+以及构建、排序分组所需的时间；最后用新模型跑一遍DataSorter的解析和排序流程
+（默认不做模糊去重，--dedup开启）。
+
+示例：
+    python benchmarks/bench_data_model.py
+    python benchmarks/bench_data_model.py --items 300000 --quantity-count 4
+"""
+
+import argparse
+import gc
+import random
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from src.core.data_sorter import DataSorter  # noqa: E402
+from src.core.models import DataGroup, SetEntry, quantity_row  # noqa: E402
+
+CATEGORIES = ["游乐场", "春节家具", "万圣节精品", "海洋", "圣诞", "下10层", "马戏团", "樱花", "星空", "田园"]
+
+
+def build_rows(item_count, max_items, seed):
+    """生成原始数据表的(A列, B列)行"""
+    rng = random.Random(seed)
+    rows = []
+    set_index = 0
+    while item_count > 0:
+        set_index += 1
+        count = min(item_count, rng.randint(1, max_items))
+        title = f"{rng.randint(2015, 2024)}{rng.choice(CATEGORIES)}套装{set_index}"
+        rows.append((title, f"物品{set_index}_0"))
+        rows.extend((None, f"物品{set_index}_{offset}") for offset in range(1, count))
+        rows.append((None, None))
+        item_count -= count
+    return rows
+
+
+def parse_title(title):
+    """与DataSorter.parse_title相同规则的简化版本，两种结构共用"""
+    year = int(title[:4])
+    category, _, set_number = title[4:].partition("套装")
+    return year, category, int(set_number)
+
+
+def legacy_groups(rows):
+    """原先的标题组：{'title', 'items'}字典"""
+    groups = []
+    for a_value, b_value in rows:
+        if a_value:
+            groups.append({'title': a_value, 'items': [b_value]})
+        elif b_value:
+            groups[-1]['items'].append(b_value)
+    return groups
+
+
+def model_groups(rows):
+    """DataGroup标题组"""
+    groups = []
+    for a_value, b_value in rows:
+        if a_value:
+            groups.append(DataGroup(a_value, [b_value]))
+        elif b_value:
+            groups[-1].items.append(b_value)
+    return groups
+
+
+def legacy_entries(groups):
+    """原先的套装字典（年份、类别、套装号和sort_key重复保存）"""
+    entries = []
+    for group in groups:
+        year, category, set_number = parse_title(group['title'])
+        entries.append({
+            'original_title': group['title'],
+            'year': year,
+            'category': category,
+            'set_number': set_number,
+            'items': list(group['items']),
+            'sort_key': (year, category, set_number)
+        })
+    return entries
+
+
+def model_entries(groups):
+    """SetEntry套装（类别名驻留，sort_key按需计算）"""
+    entries = []
+    for group in groups:
+        year, category, set_number = parse_title(group.title)
+        entries.append(SetEntry(group.title, year, category, set_number, list(group.items)))
+    return entries
+
+
+def build_quantity_rows(names, quantity_count, ratio, seed):
+    """生成排序结果表中的(物品名, 数量列值)，没有填写数量的位置为None"""
+    rng = random.Random(seed)
+    return [(name, [rng.randint(1, 99) if rng.random() < ratio else None
+                    for _ in range(quantity_count)]) for name in names]
+
+
+def legacy_quantities(quantity_rows):
+    """原先的历史数量：{物品名: {'quantity1': 值, ...}}"""
+    keys = [f'quantity{index}' for index in range(1, len(quantity_rows[0][1]) + 1)]
+    historical_quantities = {}
+    for name, values in quantity_rows:
+        quantities = {}
+        for key, value in zip(keys, values):
+            if value is not None and str(value).strip():
+                quantities[key] = value
+        if quantities:
+            historical_quantities[name] = quantities
+    return historical_quantities
+
+
+def model_quantities(quantity_rows):
+    """历史数量元组：{物品名: (值, ...)}"""
+    historical_quantities = {}
+    for name, values in quantity_rows:
+        quantities = quantity_row(values)
+        if quantities:
+            historical_quantities[name] = quantities
+    return historical_quantities
+
+
+def group_sorted(entries, key, category):
+    """按sort_key排序后按类别分组"""
+    categories = {}
+    for entry in sorted(entries, key=key):
+        categories.setdefault(category(entry), []).append(entry)
+    return categories
+
+
+def measure(function, *args, repeat=3):
+    """返回(结果, 结果占用的内存字节数, 耗时秒)
+
+    耗时取不开启tracemalloc时多次执行的最小值，内存单独执行一次统计。
+    """
+    seconds = []
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        function(*args)
+        seconds.append(time.perf_counter() - start)
+
+    gc.collect()
+    tracemalloc.start()
+    result = function(*args)
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, current, min(seconds)
+
+
+def report(label, legacy, model, show_memory=True):
+    """输出一组对比结果"""
+    _, legacy_bytes, legacy_seconds = legacy
+    _, model_bytes, model_seconds = model
+    line = (f"{label:<8} 字典 {legacy_seconds * 1000:7.1f}ms  模型 {model_seconds * 1000:7.1f}ms  "
+            f"耗时 {model_seconds / legacy_seconds:6.1%}")
+    if show_memory:
+        line += (f"   字典 {legacy_bytes / 1048576:6.2f}MB  模型 {model_bytes / 1048576:6.2f}MB  "
+                 f"内存 {model_bytes / legacy_bytes:6.1%}")
+    print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="数据模型内存与速度基准测试")
+    parser.add_argument("--items", type=int, default=100000, help="物品数量")
+    parser.add_argument("--max-items", type=int, default=10, help="每个套装最多的物品数")
+    parser.add_argument("--quantity-count", type=int, default=2, help="数量列数")
+    parser.add_argument("--quantity-ratio", type=float, default=0.6, help="有历史数量的物品比例")
+    parser.add_argument("--dedup", action="store_true",
+                        help="DataSorter流程中启用模糊去重（默认关闭，只测模型本身）")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    rows = build_rows(args.items, args.max_items, args.seed)
+    names = [b_value for _, b_value in rows if b_value]
+    print(f"{len(names)} 个物品, {sum(1 for a_value, _ in rows if a_value)} 个套装")
+
+    legacy = measure(legacy_groups, rows)
+    model = measure(model_groups, rows)
+    report("标题组", legacy, model)
+
+    legacy_parsed = measure(legacy_entries, legacy[0])
+    model_parsed = measure(model_entries, model[0])
+    report("套装", legacy_parsed, model_parsed)
+
+    quantity_rows = build_quantity_rows(names, args.quantity_count, args.quantity_ratio, args.seed)
+    report("历史数量", measure(legacy_quantities, quantity_rows), measure(model_quantities, quantity_rows))
+
+    # 排序分组只产生列表，不比较内存
+    report("排序分组",
+           measure(group_sorted, legacy_parsed[0], lambda x: x['sort_key'], lambda x: x['category']),
+           measure(group_sorted, model_parsed[0], lambda x: x.sort_key, lambda x: x.category),
+           show_memory=False)
+
+    distinct = len({id(entry.category) for entry in model_parsed[0]})
+    print(f"类别名对象: 字典 {len({id(entry['category']) for entry in legacy_parsed[0]})} 个, "
+          f"模型 {distinct} 个")
+
+    # 完整的DataSorter解析和排序流程（标题正则解析，可选模糊去重）
+    sorter = DataSorter(None)
+    sorter.dedup_config = dict(sorter.dedup_config, enabled=args.dedup)
+    start = time.perf_counter()
+    categories = sorter._sort_parsed_data(sorter._parse_data_groups(model[0]))
+    print(f"DataSorter 解析+排序 {(time.perf_counter() - start) * 1000:.1f}ms, {len(categories)} 个类别")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
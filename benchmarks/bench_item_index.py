@@ -0,0 +1,137 @@
+# -*- coding: utf-8 -*-
+"""
+物品索引基准测试
+
+生成模拟的历史数据（默认10万个物品），测量ItemIndex建立索引、保存和加载索引文件、
+少量套装变化后增量更新所需的时间，以及完整物品名、物品名片段和单字三类查询的
+延迟（中位数和p99），并与逐个物品做子串匹配的线性扫描对比。
+
+示例：
+    python benchmarks/bench_item_index.py
+    python benchmarks/bench_item_index.py --items 300000 --changed 50
+"""
+
+import argparse
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from src.core.data_sorter import DataSorter  # noqa: E402
+from src.core.item_index import ItemIndex  # noqa: E402
+from src.core.models import DataGroup  # noqa: E402
+from src.utils.fuzzy_matcher import normalize_text  # noqa: E402
+
+CATEGORIES = ["游乐场", "春节家具", "万圣节精品", "海洋", "圣诞", "下10层", "马戏团", "樱花", "星空", "田园"]
+STYLES = ["南瓜", "幽灵", "樱花", "星空", "海浪", "珊瑚", "雪人", "灯笼", "糖果", "木马",
+          "贝壳", "月光", "田园", "复古", "水晶", "彩虹", "森林", "童话", "金色", "琉璃"]
+OBJECTS = ["摇椅", "吊灯", "书架", "餐桌", "地毯", "屏风", "花架", "壁画", "衣柜", "沙发",
+           "台灯", "秋千", "帐篷", "鱼缸", "床", "钟", "窗帘", "栅栏", "拱门", "雕像"]
+
+
+def build_groups(item_count, max_items, seed):
+    """生成模拟的标题组和历史数量"""
+    rng = random.Random(seed)
+    groups = []
+    historical_quantities = {}
+    set_index = 0
+    while item_count > 0:
+        set_index += 1
+        count = min(item_count, rng.randint(1, max_items))
+        title = f"{rng.randint(2015, 2024)}{rng.choice(CATEGORIES)}套装{set_index}"
+        items = [f"{rng.choice(STYLES)}{rng.choice(OBJECTS)}{set_index}{chr(0x41 + offset)}"
+                 for offset in range(count)]
+        for item_name in items:
+            if rng.random() < 0.5:
+                historical_quantities[item_name] = (rng.randint(1, 99), None)
+        groups.append(DataGroup(title, items))
+        item_count -= count
+    return groups, historical_quantities
+
+
+def timed(function, *args):
+    """返回(结果, 耗时秒)"""
+    start = time.perf_counter()
+    result = function(*args)
+    return result, time.perf_counter() - start
+
+
+def latency(function, queries):
+    """逐个查询，返回(中位数, p99)微秒"""
+    seconds = []
+    for query in queries:
+        start = time.perf_counter()
+        function(query)
+        seconds.append(time.perf_counter() - start)
+    seconds.sort()
+    return (statistics.median(seconds) * 1e6,
+            seconds[min(len(seconds) - 1, int(len(seconds) * 0.99))] * 1e6)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="物品索引基准测试")
+    parser.add_argument("--items", type=int, default=100000, help="物品数量")
+    parser.add_argument("--max-items", type=int, default=10, help="每个套装最多的物品数")
+    parser.add_argument("--changed", type=int, default=20, help="增量更新时变化的套装数")
+    parser.add_argument("--queries", type=int, default=2000, help="每类查询的次数")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    groups, historical_quantities = build_groups(args.items, args.max_items, args.seed)
+    print(f"{sum(len(group.items) for group in groups)} 个物品, {len(groups)} 个套装")
+
+    sorter = DataSorter(None)
+    work_dir = Path(tempfile.mkdtemp(prefix="bench_item_index_"))
+    try:
+        index_file = work_dir / "item_index.json"
+        item_index = ItemIndex(sorter, index_file)
+        _, seconds = timed(item_index.update, groups, historical_quantities)
+        print(f"建立索引   {seconds * 1000:8.1f}ms  {len(item_index.postings)} 个n-gram")
+
+        _, seconds = timed(item_index.save)
+        print(f"保存索引   {seconds * 1000:8.1f}ms  {index_file.stat().st_size / 1048576:.1f}MB")
+        item_index, seconds = timed(ItemIndex, sorter, index_file)
+        print(f"加载索引   {seconds * 1000:8.1f}ms  {len(item_index)} 个物品")
+
+        # 修改部分套装的物品、删除部分套装、追加新套装
+        rng = random.Random(args.seed + 1)
+        changed = list(groups)
+        for position in rng.sample(range(len(changed)), args.changed):
+            group = changed[position]
+            changed[position] = DataGroup(group.title, group.items + [f"新增物品{position}"])
+        del changed[-args.changed:]
+        changed.extend(DataGroup(f"2025海洋套装{90000 + offset}", [f"追加物品{offset}"])
+                       for offset in range(args.changed))
+        (added, removed), seconds = timed(item_index.update, changed, historical_quantities)
+        print(f"增量更新   {seconds * 1000:8.1f}ms  新增 {added} 个套装, 删除 {removed} 个套装")
+        # ItemIndex.refresh在更新后保存索引文件，同时重新排好受影响的倒排表
+        _, seconds = timed(item_index.save)
+        print(f"更新后保存 {seconds * 1000:8.1f}ms")
+
+        names = [item_name for group in changed for item_name in group.items]
+        keys = [normalize_text(item_name) for item_name in names]
+        exact = [rng.choice(names) for _ in range(args.queries)]
+        fragments = [rng.choice(STYLES) + rng.choice(OBJECTS) for _ in range(args.queries)]
+        single = [rng.choice(OBJECTS)[0] for _ in range(args.queries)]
+
+        def scan(query):
+            key = normalize_text(query)
+            return [name for name, item_key in zip(names, keys) if key in item_key][:50]
+
+        print(f"{'查询':<8} {'索引中位数':>10} {'索引p99':>10} {'线性扫描中位数':>14}")
+        for label, queries in (("完整名", exact), ("片段", fragments), ("单字", single)):
+            median, p99 = latency(item_index.search, queries)
+            scan_median, _ = latency(scan, queries[:20])
+            print(f"{label:<8} {median:8.1f}us {p99:8.1f}us {scan_median:12.1f}us")
+        return 0
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
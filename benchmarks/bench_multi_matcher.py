@@ -0,0 +1,151 @@
+# -*- coding: utf-8 -*-
+"""
+多模式匹配基准测试
+
+生成模拟的过滤规则、修饰词和类别优先级列表（默认各500条），对比逐条规则匹配的写法
+（逐个re.match加列表成员判断、逐个str.replace、逐个优先级词判断是否为子串）与
+src/utils/multi_matcher中的合并正则和Aho-Corasick自动机的耗时，并检查两者结果是否一致。
+类别名与实际数据一样从有限的类别中抽取（默认300个），重复出现的类别名直接使用缓存结果。
+逐个替换时前一个修饰词删除后可能拼出新的修饰词，与一次删除的结果允许有少量差异。
+
+示例：
+    python benchmarks/bench_multi_matcher.py
+    python benchmarks/bench_multi_matcher.py --rules 50 --texts 100000
+    python benchmarks/bench_multi_matcher.py --rules 5 --categories 20000
+"""
+
+import argparse
+import random
+import re
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from src.utils.multi_matcher import KeywordMatcher, PatternMatcher  # noqa: E402
+
+CHARS = "春节情人元宵劳动端午七夕中秋国庆万圣诞游乐场海洋马戏团樱花星空田园精品动态叮当猫年主题"
+
+
+def random_word(rng, low, high):
+    """随机中文词"""
+    return "".join(rng.choice(CHARS) for _ in range(rng.randint(low, high)))
+
+
+def build_rules(count, seed):
+    """生成(无效物品名正则, 无效物品名文本, 修饰词, 优先级列表)"""
+    rng = random.Random(seed)
+    patterns = [r"^\+\d+$", r"^\*\d+$", r"^-\d+$", r"^\d+$"]
+    patterns += [f"^{re.escape(random_word(rng, 2, 4))}\\d*$" for _ in range(count - len(patterns))]
+    texts = [random_word(rng, 2, 5) for _ in range(count)]
+    # 修饰词较长，避免随机文本中出现大量重叠，使逐个替换和一次删除的结果可以比较
+    modifiers = list(dict.fromkeys(random_word(rng, 3, 4) for _ in range(count)))
+    priority_order = list(dict.fromkeys(random_word(rng, 2, 3) for _ in range(count)))
+    return patterns, texts, modifiers, priority_order
+
+
+def build_texts(count, distinct, rules, seed):
+    """生成物品名和类别名，部分包含规则中的词"""
+    patterns, texts, modifiers, priority_order = rules
+    rng = random.Random(seed + 1)
+    items = []
+    for _ in range(count):
+        roll = rng.random()
+        if roll < 0.1:
+            items.append(rng.choice(texts))
+        elif roll < 0.2:
+            items.append(str(rng.randint(0, 999)))
+        else:
+            items.append(random_word(rng, 3, 8))
+
+    pool = []
+    for _ in range(distinct):
+        category = random_word(rng, 2, 6)
+        if rng.random() < 0.3:
+            category = rng.choice(priority_order) if rng.random() < 0.5 else category + rng.choice(modifiers)
+        pool.append(category)
+    categories = [rng.choice(pool) for _ in range(count)]
+    return items, categories
+
+
+def legacy_is_invalid(text, patterns, texts):
+    """原先的写法：逐个正则匹配，再在列表中查找"""
+    for pattern in patterns:
+        if re.match(pattern, text):
+            return True
+    return text in texts
+
+
+def legacy_clean(category, modifiers):
+    """原先的写法：逐个修饰词替换"""
+    for modifier in modifiers:
+        category = category.replace(modifier, '')
+    return category
+
+
+def legacy_rank(category, priority_order, priority_map):
+    """逐个优先级词判断：完全相同优先，否则取第一个包含的词"""
+    index = priority_map.get(category)
+    if index is not None:
+        return index
+    return next((index for index, word in enumerate(priority_order) if word in category), None)
+
+
+def timed(function, *args):
+    """返回(结果, 耗时秒)"""
+    start = time.perf_counter()
+    result = function(*args)
+    return result, time.perf_counter() - start
+
+
+def report(label, legacy_seconds, matcher_seconds, detail=""):
+    """输出一组对比结果"""
+    print(f"{label:<8} 逐条 {legacy_seconds * 1000:9.1f}ms  合并 {matcher_seconds * 1000:8.1f}ms  "
+          f"x{legacy_seconds / matcher_seconds:6.1f}  {detail}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="多模式匹配基准测试")
+    parser.add_argument("--rules", type=int, default=500, help="每类规则的数量")
+    parser.add_argument("--texts", type=int, default=20000, help="物品名和类别名的数量")
+    parser.add_argument("--categories", type=int, default=300, help="不同类别名的数量")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    rules = build_rules(args.rules, args.seed)
+    patterns, texts, modifiers, priority_order = rules
+    items, categories = build_texts(args.texts, args.categories, rules, args.seed)
+
+    (pattern_matcher, keyword_texts, modifier_matcher, priority_matcher), seconds = timed(
+        lambda: (PatternMatcher(patterns), frozenset(texts),
+                 KeywordMatcher(modifiers), KeywordMatcher(priority_order)))
+    print(f"规则 {args.rules} 条/类, 文本 {args.texts} 条, 编译 {seconds * 1000:.1f}ms")
+
+    legacy, legacy_seconds = timed(lambda: [legacy_is_invalid(text, patterns, texts) for text in items])
+    merged, merged_seconds = timed(lambda: [pattern_matcher.match(text) or text in keyword_texts
+                                            for text in items])
+    differences = sum(a != b for a, b in zip(legacy, merged))
+    report("物品过滤", legacy_seconds, merged_seconds, f"过滤 {sum(merged)} 条, 差异 {differences}")
+
+    legacy, legacy_seconds = timed(lambda: [legacy_clean(category, modifiers) for category in categories])
+    merged, merged_seconds = timed(lambda: [modifier_matcher.remove(category) for category in categories])
+    differences = sum(a != b for a, b in zip(legacy, merged))
+    report("修饰词", legacy_seconds, merged_seconds, f"差异 {differences}")
+
+    # DataSorter对每个不同的类别名计算一次优先级
+    distinct = list(dict.fromkeys(categories))
+    priority_map = {category: index for index, category in enumerate(priority_order)}
+    legacy, legacy_seconds = timed(lambda: [legacy_rank(category, priority_order, priority_map)
+                                            for category in distinct])
+    merged, merged_seconds = timed(lambda: [priority_matcher.rank(category) for category in distinct])
+    priority_differences = sum(a != b for a, b in zip(legacy, merged))
+    exact = sum(category in priority_map for category in distinct)
+    report("优先级", legacy_seconds, merged_seconds,
+           f"完全相同 {exact} 条, 含优先级词 {sum(b is not None for b in merged) - exact} 条, "
+           f"差异 {priority_differences}")
+    return 1 if priority_differences else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,184 @@
+# -*- coding: utf-8 -*-
+"""
+排序结果导出基准测试
+
+生成模拟的排序数据，分别用openpyxl（SheetLayout.write）和XML导出引擎
+（SortedSheetExporter，单进程和多进程）替换同一个工作簿中的排序结果表，比较耗时，
+并逐个单元格核对值、字体、对齐、填充、行高和列宽是否一致。
+
+示例：
+    python benchmarks/bench_sorted_export.py
+    python benchmarks/bench_sorted_export.py --sets 50000 --categories 400 --workers 1 4 0
+    python benchmarks/bench_sorted_export.py --max-width 40 --block-width 6
+"""
+
+import argparse
+import random
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import openpyxl  # noqa: E402
+from src.core.models import SetEntry  # noqa: E402
+from src.core.sheet_layout import SheetLayout  # noqa: E402
+from src.core.sorted_sheet_exporter import SortedSheetExporter  # noqa: E402
+
+SHEET_NAME = "排序结果"
+
+
+def build_data(sets, categories, max_items, quantity_ratio, quantity_count, seed):
+    """生成模拟的[(类别, 套装列表)]和历史数量"""
+    rng = random.Random(seed)
+    blocks = {f"类别{index:03d}": [] for index in range(categories)}
+    names = list(blocks)
+    historical_quantities = {}
+
+    for set_index in range(sets):
+        category = rng.choice(names)
+        year = rng.randint(2015, 2024)
+        items = [f"物品{set_index}_{offset}" for offset in range(rng.randint(1, max_items))]
+        blocks[category].append(SetEntry(f"{year}{category}套装{set_index}", year, category,
+                                         set_index, items))
+        for item_name in items:
+            if rng.random() < quantity_ratio:
+                historical_quantities[item_name] = tuple(
+                    rng.choice([rng.randint(1, 99), "已满"]) for _ in range(quantity_count))
+
+    ordered_blocks = [(category, entries) for category, entries in blocks.items() if entries]
+    return ordered_blocks, historical_quantities
+
+
+def make_workbook(path, layout, ordered_blocks):
+    """创建带原始数据表和旧排序结果表的工作簿"""
+    workbook = openpyxl.Workbook()
+    raw_sheet = workbook.active
+    raw_sheet.title = "Sheet1"
+    for _, entries in ordered_blocks[:20]:
+        for entry in entries[:5]:
+            raw_sheet.append([entry.original_title])
+            for item_name in entry.items:
+                raw_sheet.append([None, item_name])
+            raw_sheet.append([])
+    layout.write(workbook.create_sheet(SHEET_NAME), ordered_blocks[:3])
+    workbook.save(path)
+
+
+def run_openpyxl(path, layout, sheets, historical_quantities):
+    """与DataSorter相同的openpyxl写入流程"""
+    workbook = openpyxl.load_workbook(path)
+    for sheet_name in select_sorted(workbook.sheetnames):
+        workbook.remove(workbook[sheet_name])
+    for sheet_name, ordered_blocks in sheets:
+        layout.write(workbook.create_sheet(sheet_name), ordered_blocks, historical_quantities)
+    workbook.save(path)
+    workbook.close()
+
+
+def select_sorted(sheet_names):
+    """需要替换的排序结果表"""
+    return [name for name in sheet_names if name == SHEET_NAME]
+
+
+def describe_cell(cell):
+    """单元格的值和样式，用于比较"""
+    return (cell.value, bool(cell.font.b), cell.alignment.horizontal, cell.alignment.vertical,
+            cell.fill.fill_type, cell.fill.fgColor.rgb if cell.fill.fill_type else None)
+
+
+def compare(expected_path, actual_path, limit=10):
+    """逐个单元格比较两个工作簿，返回差异描述列表"""
+    differences = []
+    expected_book = openpyxl.load_workbook(expected_path)
+    actual_book = openpyxl.load_workbook(actual_path)
+    if expected_book.sheetnames != actual_book.sheetnames:
+        return [f"工作表不同: {expected_book.sheetnames} != {actual_book.sheetnames}"]
+
+    for expected, actual in zip(expected_book.worksheets, actual_book.worksheets):
+        if (expected.max_row, expected.max_column) != (actual.max_row, actual.max_column):
+            differences.append(f"{expected.title} 尺寸不同: {expected.dimensions} != {actual.dimensions}")
+            continue
+        for expected_row, actual_row in zip(expected.iter_rows(), actual.iter_rows()):
+            for expected_cell, actual_cell in zip(expected_row, actual_row):
+                if describe_cell(expected_cell) != describe_cell(actual_cell):
+                    differences.append(f"{expected.title}!{expected_cell.coordinate}: "
+                                       f"{describe_cell(expected_cell)} != {describe_cell(actual_cell)}")
+                    if len(differences) >= limit:
+                        return differences
+
+        for row in range(1, expected.max_row + 1):
+            if expected.row_dimensions[row].height != actual.row_dimensions[row].height:
+                differences.append(f"{expected.title} 第{row}行行高不同")
+        for letter, dimension in expected.column_dimensions.items():
+            if dimension.width != actual.column_dimensions[letter].width:
+                differences.append(f"{expected.title} {letter}列列宽不同")
+    return differences[:limit]
+
+
+def timed(function, *args):
+    """执行一次并返回耗时（秒）"""
+    start = time.perf_counter()
+    function(*args)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="排序结果导出基准测试")
+    parser.add_argument("--sets", type=int, default=20000, help="套装数量")
+    parser.add_argument("--categories", type=int, default=200, help="类别数量")
+    parser.add_argument("--max-items", type=int, default=8, help="每个套装最多的物品数")
+    parser.add_argument("--quantity-ratio", type=float, default=0.5, help="有历史数量的物品比例")
+    parser.add_argument("--block-width", type=int, default=5)
+    parser.add_argument("--max-width", type=int, default=0)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 0],
+                        help="XML导出的进程数，可指定多个，0表示CPU核数")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--keep", help="把生成的工作簿保留到该目录")
+    args = parser.parse_args()
+
+    layout = SheetLayout(args.block_width, args.max_width)
+    ordered_blocks, historical_quantities = build_data(
+        args.sets, args.categories, args.max_items, args.quantity_ratio,
+        layout.quantity_count, args.seed)
+    sheets = [(SHEET_NAME, ordered_blocks)]
+
+    work_dir = Path(tempfile.mkdtemp(prefix="bench_sorted_export_"))
+    try:
+        base_path = work_dir / "base.xlsx"
+        make_workbook(base_path, layout, ordered_blocks)
+
+        openpyxl_path = work_dir / "openpyxl.xlsx"
+        shutil.copy(base_path, openpyxl_path)
+        openpyxl_seconds = timed(run_openpyxl, openpyxl_path, layout, sheets, historical_quantities)
+        cell_count = SortedSheetExporter(layout).count_cells(sheets)
+        print(f"{len(ordered_blocks)} 个类别, {args.sets} 个套装, 约 {cell_count} 个单元格")
+        print(f"openpyxl          {openpyxl_seconds:8.2f}s")
+
+        failed = False
+        for workers in args.workers:
+            xml_path = work_dir / f"xml_{workers}.xlsx"
+            shutil.copy(base_path, xml_path)
+            # parallel_min_cells为0：即使数据量小也按指定进程数并行
+            exporter = SortedSheetExporter(layout, max_workers=workers, parallel_min_cells=0)
+            seconds = timed(exporter.export, xml_path, sheets, historical_quantities, select_sorted)
+
+            differences = compare(openpyxl_path, xml_path)
+            status = "一致" if not differences else "不一致"
+            label = f"xml workers={workers or '自动'}"
+            print(f"{label:<17} {seconds:8.2f}s  x{openpyxl_seconds / seconds:5.1f}  {status}")
+            for difference in differences:
+                print(f"    {difference}")
+            failed = failed or bool(differences)
+
+        if args.keep:
+            shutil.copytree(work_dir, args.keep, dirs_exist_ok=True)
+        return 1 if failed else 0
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
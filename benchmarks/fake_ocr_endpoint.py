@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+"""
+本地模拟OCR服务，用于测试客户端池、限流和重试
+
+示例：
+    python benchmarks/fake_ocr_endpoint.py --port 18080 --latency 0.2 --throttle-rate 0.1
+
+对应的screen_ocr_config.json配置：
+    "ocr_endpoints": [
+        {"name": "fake", "endpoint": "127.0.0.1:18080", "protocol": "http"}
+    ]
+"""
+
+import argparse
+import json
+import random
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+SAMPLE_TABLE = {
+    "TableDetections": [
+        {"Type": 0, "Cells": [
+            {"ColTl": -1, "RowTl": -1, "ColBr": -1, "RowBr": -1,
+             "Text": "2023万圣节精品套装3", "Confidence": 98}
+        ]},
+        {"Type": 1, "Cells": [
+            {"ColTl": 0, "RowTl": 0, "ColBr": 1, "RowBr": 1, "Text": "图片", "Confidence": 99},
+            {"ColTl": 1, "RowTl": 0, "ColBr": 2, "RowBr": 1, "Text": "物品名", "Confidence": 99},
+            {"ColTl": 1, "RowTl": 1, "ColBr": 2, "RowBr": 2, "Text": "南瓜灯", "Confidence": 96},
+            {"ColTl": 1, "RowTl": 2, "ColBr": 2, "RowBr": 3, "Text": "幽灵摇椅", "Confidence": 93}
+        ]}
+    ]
+}
+
+
+def make_handler(latency, throttle_rate):
+    """创建请求处理器"""
+
+    class FakeOCRHandler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            time.sleep(latency)
+
+            response = {"RequestId": str(uuid.uuid4())}
+            if random.random() < throttle_rate:
+                response["Error"] = {"Code": "RequestLimitExceeded",
+                                     "Message": "模拟限流"}
+            elif self.headers.get("X-TC-Action") == "GeneralAccurateOCR":
+                response["TextDetections"] = []
+            else:
+                response.update(SAMPLE_TABLE)
+
+            body = json.dumps({"Response": response}, ensure_ascii=False).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    return FakeOCRHandler
+
+
+def main():
+    parser = argparse.ArgumentParser(description="本地模拟OCR服务")
+    parser.add_argument("--port", type=int, default=18080)
+    parser.add_argument("--latency", type=float, default=0.2, help="每次请求的模拟延迟（秒）")
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="返回限流错误的概率")
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer(("127.0.0.1", args.port),
+                                 make_handler(args.latency, args.throttle_rate))
+    print(f"模拟OCR服务已启动: http://127.0.0.1:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
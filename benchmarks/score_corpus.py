@@ -0,0 +1,243 @@
+# -*- coding: utf-8 -*-
+"""
+识别结果回归语料评分
+
+语料格式（benchmarks/corpus/）：
+    <样本名>.json            截图路径（相对项目根目录）和期望结果
+                             {"image": "test_pic/1.png",
+                              "expected": {"title": "...", "items": ["...", ...]}}
+    <样本名>.response.json   录制的OCR原始响应（TableDetections格式）
+
+手工构造的响应带有 "Synthetic": true，评分时标记为[合成]，重新录制后该标记随之消失。
+没有image的样本只有手工构造的响应（用于模拟误识别、低置信度和版面噪声），录制和导入时跳过。
+
+评分时用录制的响应重放OCRProcessor的提取流程，统计物品名精确率/召回率、
+标题准确率和单样本提取耗时；没有录制响应的样本会跳过。
+
+示例：
+    python benchmarks/score_corpus.py
+    python benchmarks/score_corpus.py --record                     # 调用OCR接口录制缺失的响应
+    python benchmarks/score_corpus.py --import-sink logs/ocr_responses_20240101.jsonl.gz
+    python benchmarks/score_corpus.py --min-recall 0.95 --max-ms 5 --baseline corpus_baseline.json
+
+作为回归门禁时，任一指标低于阈值或比基线变差超过容差，进程以1退出；
+没有任何可评分样本时以2退出。
+"""
+
+import argparse
+import json
+import statistics
+import sys
+import time
+from collections import Counter
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from PIL import Image  # noqa: E402
+from src.core.capture_artifact import CaptureArtifact  # noqa: E402
+from src.core.ocr_processor import OCRProcessor  # noqa: E402
+from src.utils.response_sink import iter_raw_responses  # noqa: E402
+
+RESPONSE_SUFFIX = ".response.json"
+
+
+def load_corpus(corpus_dir):
+    """加载语料，返回样本列表"""
+    samples = []
+    for path in sorted(Path(corpus_dir).glob("*.json")):
+        if path.name.endswith(RESPONSE_SUFFIX):
+            continue
+        with open(path, "r", encoding="utf-8") as f:
+            sample = json.load(f)
+        sample["name"] = path.stem
+        sample["response_path"] = path.with_name(path.stem + RESPONSE_SUFFIX)
+        samples.append(sample)
+    return samples
+
+
+def load_artifact(sample):
+    """读取样本截图，转换为与屏幕截图一致的RGB格式"""
+    with Image.open(ROOT / sample["image"]) as image:
+        return CaptureArtifact(image.convert("RGB"))
+
+
+def save_response(sample, response):
+    """保存录制的OCR响应"""
+    with open(sample["response_path"], "w", encoding="utf-8") as f:
+        json.dump(response, f, ensure_ascii=False, indent=1)
+    print(f"已录制: {sample['response_path'].name}")
+
+
+def record_missing(samples, processor, overwrite):
+    """调用OCR接口录制缺失的响应"""
+    for sample in samples:
+        if "image" not in sample or (sample["response_path"].exists() and not overwrite):
+            continue
+        # 录制整表识别的响应，不使用表格模板
+        response = processor.recognize_table(load_artifact(sample), use_template=False)
+        if response:
+            save_response(sample, response)
+        else:
+            print(f"录制失败: {sample['name']}")
+
+
+def import_from_sink(samples, sink_paths, overwrite):
+    """从原始响应存储中按截图内容哈希导入响应
+
+    只有样本截图与当时的屏幕截图像素完全一致（例如取自debug_images目录）时才能匹配。
+    """
+    wanted = {load_artifact(sample).digest: sample for sample in samples
+              if "image" in sample and (overwrite or not sample["response_path"].exists())}
+    for sink_path in sink_paths:
+        for record in iter_raw_responses(sink_path):
+            sample = wanted.pop(record.get("digest"), None)
+            if sample is not None and record.get("action") == "RecognizeTableAccurateOCR":
+                save_response(sample, record["response"])
+    for sample in wanted.values():
+        print(f"未在原始响应中找到: {sample['name']}")
+
+
+def score_sample(processor, sample, response, repeat):
+    """重放一个样本，返回评分结果"""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        title, items = processor.extract_title_and_items(response)
+        timings.append((time.perf_counter() - start) * 1000)
+
+    expected = sample["expected"]
+    expected_items = Counter(processor._clean_text(item) for item in expected["items"])
+    actual_items = Counter(items)
+    matched = sum((expected_items & actual_items).values())
+
+    return {
+        "name": sample["name"],
+        "synthetic": bool(response.get("Synthetic")),
+        "title_ok": title == expected["title"],
+        "title": title,
+        "matched": matched,
+        "predicted": sum(actual_items.values()),
+        "expected": sum(expected_items.values()),
+        "missing": sorted((expected_items - actual_items).elements()),
+        "extra": sorted((actual_items - expected_items).elements()),
+        "ms": statistics.median(timings),
+    }
+
+
+def summarize(results):
+    """汇总整体指标"""
+    matched = sum(result["matched"] for result in results)
+    predicted = sum(result["predicted"] for result in results)
+    expected = sum(result["expected"] for result in results)
+    return {
+        "samples": len(results),
+        "precision": matched / predicted if predicted else 1.0,
+        "recall": matched / expected if expected else 1.0,
+        "title_accuracy": sum(result["title_ok"] for result in results) / len(results),
+        "mean_ms": statistics.mean(result["ms"] for result in results),
+    }
+
+
+def check_gate(summary, args):
+    """检查门禁阈值和基线，返回失败原因列表"""
+    failures = []
+    for key, minimum in (("precision", args.min_precision), ("recall", args.min_recall),
+                         ("title_accuracy", args.min_title_accuracy)):
+        if minimum is not None and summary[key] < minimum:
+            failures.append(f"{key} {summary[key]:.3f} < {minimum}")
+    if args.max_ms is not None and summary["mean_ms"] > args.max_ms:
+        failures.append(f"mean_ms {summary['mean_ms']:.3f} > {args.max_ms}")
+
+    if args.baseline and Path(args.baseline).exists():
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        for key in ("precision", "recall", "title_accuracy"):
+            if summary[key] < baseline[key] - args.tolerance:
+                failures.append(f"{key} {summary[key]:.3f} 低于基线 {baseline[key]:.3f}")
+        # 耗时允许按比例波动
+        if summary["mean_ms"] > baseline["mean_ms"] * (1 + args.time_tolerance):
+            failures.append(f"mean_ms {summary['mean_ms']:.3f} 超过基线 {baseline['mean_ms']:.3f} "
+                            f"的 {1 + args.time_tolerance:.0%}")
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description="识别结果回归语料评分")
+    parser.add_argument("--corpus", default=str(ROOT / "benchmarks" / "corpus"))
+    parser.add_argument("--record", action="store_true", help="调用OCR接口录制缺失的响应")
+    parser.add_argument("--import-sink", nargs="+", metavar="PATH",
+                        help="从ocr_responses_*.jsonl.gz中按内容哈希导入响应")
+    parser.add_argument("--overwrite", action="store_true", help="录制/导入时覆盖已有响应")
+    parser.add_argument("--with-correction", action="store_true",
+                        help="启用已知物品名纠错（默认关闭，只评估OCR过滤和解析规则）")
+    parser.add_argument("--repeat", type=int, default=20, help="每个样本重复提取次数，耗时取中位数")
+    parser.add_argument("--min-precision", type=float)
+    parser.add_argument("--min-recall", type=float)
+    parser.add_argument("--min-title-accuracy", type=float)
+    parser.add_argument("--max-ms", type=float, help="单样本平均提取耗时上限（毫秒）")
+    parser.add_argument("--baseline", help="与基线结果比较")
+    parser.add_argument("--save-baseline", help="把本次结果保存为基线")
+    parser.add_argument("--tolerance", type=float, default=0.0, help="准确率指标允许下降的幅度")
+    parser.add_argument("--time-tolerance", type=float, default=0.5, help="耗时允许增加的比例")
+    args = parser.parse_args()
+
+    samples = load_corpus(args.corpus)
+    processor = OCRProcessor()
+
+    if args.record:
+        record_missing(samples, processor, args.overwrite)
+    if args.import_sink:
+        import_from_sink(samples, args.import_sink, args.overwrite)
+
+    if not args.with_correction:
+        processor.item_corrector.correction_config = dict(
+            processor.item_corrector.correction_config, enabled=False)
+
+    results = []
+    skipped = []
+    for sample in samples:
+        if not sample["response_path"].exists():
+            skipped.append(sample["name"])
+            continue
+        with open(sample["response_path"], "r", encoding="utf-8") as f:
+            response = json.load(f)
+        results.append(score_sample(processor, sample, response, args.repeat))
+    processor.close()
+
+    for result in results:
+        status = "OK " if result["title_ok"] and not result["missing"] and not result["extra"] else "ERR"
+        source = "[合成]" if result["synthetic"] else ""
+        print(f"[{status}] {result['name'] + source:<12} 标题={result['title']!s:<20} "
+              f"物品 {result['matched']}/{result['expected']} 提取 {result['ms']:.3f}ms")
+        if result["missing"]:
+            print(f"      缺失: {result['missing']}")
+        if result["extra"]:
+            print(f"      多余: {result['extra']}")
+    synthetic = sum(result["synthetic"] for result in results)
+    if synthetic:
+        print(f"{synthetic}/{len(results)} 个样本使用手工构造的响应，可用 --record --overwrite 录制真实响应")
+    if skipped:
+        print(f"跳过 {len(skipped)} 个没有录制响应的样本: {', '.join(skipped)}")
+
+    if not results:
+        print("没有可评分的样本，请先使用 --record 或 --import-sink 录制响应")
+        return 2
+
+    summary = summarize(results)
+    print(f"样本 {summary['samples']}  精确率 {summary['precision']:.3f}  召回率 {summary['recall']:.3f}  "
+          f"标题准确率 {summary['title_accuracy']:.3f}  平均提取 {summary['mean_ms']:.3f}ms")
+
+    if args.save_baseline:
+        with open(args.save_baseline, "w", encoding="utf-8") as f:
+            json.dump(summary, f, indent=2)
+
+    failures = check_gate(summary, args)
+    for failure in failures:
+        print(f"回归: {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -5,8 +5,10 @@
 
 from src.utils import logger
 from src.ui import MainWindow
+import argparse
 import sys
 import os
+import multiprocessing
 from pathlib import Path
 
 # 添加src目录到Python路径
@@ -14,8 +16,34 @@ src_path = Path(__file__).parent / "src"
 sys.path.insert(0, str(src_path))
 
 
+def parse_args():
+    """解析命令行参数"""
+    parser = argparse.ArgumentParser(description="屏幕截图OCR工具")
+    parser.add_argument("--search", metavar="物品名", help="不启动界面，查询物品所在的套装和历史数量")
+    parser.add_argument("--limit", type=int, help="查询结果的最大数量")
+    return parser.parse_args()
+
+
+def search_items(query, limit=None):
+    """命令行物品查询，找到结果时返回0"""
+    from src.core import ExcelManager, DataSorter, ItemIndex
+
+    item_index = ItemIndex(DataSorter(ExcelManager()))
+    item_index.refresh()
+    results = item_index.search(query, limit)
+    for location in results:
+        print(location.describe())
+    if not results:
+        print(f"没有找到包含 {query} 的物品")
+    return 0 if results else 1
+
+
 def main():
     """主函数"""
+    args = parse_args()
+    if args.search:
+        sys.exit(search_items(args.search, args.limit))
+
     try:
         logger.info("=" * 50)
         logger.info("屏幕截图OCR工具启动")
@@ -41,4 +69,6 @@ def main():
 
 
 if __name__ == "__main__":
+    # 打包后本地OCR引擎的进程池需要freeze_support
+    multiprocessing.freeze_support()
     main()
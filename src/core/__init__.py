@@ -7,5 +7,7 @@ from .screen_capture import ScreenCapture
 from .ocr_processor import OCRProcessor
 from .excel_manager import ExcelManager
 from .data_sorter import DataSorter
+from .item_index import ItemIndex
+from .region_scanner import RegionScanner
 
-__all__ = ['ScreenCapture', 'OCRProcessor', 'ExcelManager', 'DataSorter']
+__all__ = ['ScreenCapture', 'OCRProcessor', 'ExcelManager', 'DataSorter', 'ItemIndex', 'RegionScanner']
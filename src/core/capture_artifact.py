@@ -0,0 +1,74 @@
+# -*- coding: utf-8 -*-
+"""
+截图产物模块
+
+一次截图只编码一次PNG，编码结果和内容哈希由OCR请求、结果缓存和调试归档共享。
+"""
+
+import base64
+import hashlib
+import io
+import threading
+from datetime import datetime
+from ..utils import config_manager
+
+
+class CaptureArtifact:
+    """截图产物"""
+
+    __slots__ = ('image', 'captured_at', 'compress_level',
+                 '_png_bytes', '_digest', '_base64', '_lock')
+
+    def __init__(self, image, captured_at=None, compress_level=None):
+        # 确保像素数据已加载，之后可以在多个线程中只读访问
+        image.load()
+        self.image = image
+        self.captured_at = captured_at or datetime.now()
+        self.compress_level = (compress_level if compress_level is not None
+                               else config_manager.get("png_compress_level", 1))
+        self._png_bytes = None
+        self._digest = None
+        self._base64 = None
+        self._lock = threading.Lock()
+
+    @property
+    def size(self):
+        """图像尺寸"""
+        return self.image.size
+
+    @property
+    def digest(self):
+        """基于像素内容的哈希，与编码参数无关
+
+        像素字节相同但尺寸或颜色模式不同的图像（如100x20与20x100）也是不同的截图，
+        所以尺寸和模式一起参与哈希。
+        """
+        if self._digest is None:
+            hasher = hashlib.blake2b(digest_size=8)
+            hasher.update(f"{self.image.mode}:{self.image.width}x{self.image.height}:".encode())
+            hasher.update(self.image.tobytes())
+            self._digest = hasher.hexdigest()
+        return self._digest
+
+    @property
+    def png_bytes(self):
+        """PNG编码结果（首次访问时编码，多线程下只编码一次）"""
+        if self._png_bytes is None:
+            with self._lock:
+                if self._png_bytes is None:
+                    buffer = io.BytesIO()
+                    self.image.save(buffer, format='PNG',
+                                    compress_level=self.compress_level)
+                    self._png_bytes = buffer.getvalue()
+        return self._png_bytes
+
+    @property
+    def image_base64(self):
+        """OCR请求使用的base64字符串"""
+        if self._base64 is None:
+            self._base64 = base64.b64encode(self.png_bytes).decode('ascii')
+        return self._base64
+
+    def release_payload(self):
+        """释放base64副本，保留PNG字节供归档使用"""
+        self._base64 = None
@@ -0,0 +1,156 @@
+# -*- coding: utf-8 -*-
+"""
+截图后端模块
+
+提供可替换的截图实现：PIL ImageGrab、复用缓冲区的mss持久截图器，
+以及用于无显示环境基准测试的文件回放后端。
+"""
+
+import hashlib
+from pathlib import Path
+from PIL import Image, ImageGrab
+from ..utils import logger, config_manager
+
+try:
+    import mss
+    MSS_AVAILABLE = True
+except ImportError:
+    MSS_AVAILABLE = False
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
+
+class CaptureBackend:
+    """截图后端基类"""
+
+    name = "base"
+
+    def grab(self, bbox):
+        """截取bbox=(left, top, right, bottom)区域，返回PIL图像"""
+        raise NotImplementedError
+
+    def grab_array(self, bbox):
+        """截取区域并返回NumPy数组（HxWxC），不支持时返回None"""
+        if not NUMPY_AVAILABLE:
+            return None
+        return np.asarray(self.grab(bbox))
+
+    def close(self):
+        """释放截图资源"""
+
+
+class PILGrabBackend(CaptureBackend):
+    """PIL ImageGrab截图后端（每次截图都会新建设备上下文）"""
+
+    name = "pil"
+
+    def grab(self, bbox):
+        return ImageGrab.grab(bbox=bbox)
+
+
+class MSSBackend(CaptureBackend):
+    """mss持久截图后端，复用设备上下文和位图缓冲区"""
+
+    name = "mss"
+
+    def __init__(self):
+        self.grabber = mss.mss()
+
+    def _grab_raw(self, bbox):
+        left, top, right, bottom = bbox
+        return self.grabber.grab({"left": left, "top": top,
+                                  "width": right - left, "height": bottom - top})
+
+    def grab(self, bbox):
+        shot = self._grab_raw(bbox)
+        return Image.frombuffer("RGB", shot.size, shot.bgra, "raw", "BGRX", 0, 1)
+
+    def grab_array(self, bbox):
+        """返回BGRA帧缓冲区的零拷贝视图，仅在下一次截图前有效"""
+        if not NUMPY_AVAILABLE:
+            return None
+        shot = self._grab_raw(bbox)
+        return np.frombuffer(shot.raw, dtype=np.uint8).reshape(shot.height, shot.width, 4)
+
+    def close(self):
+        self.grabber.close()
+
+
+class ReplayBackend(CaptureBackend):
+    """文件回放后端，循环返回预先加载的截图帧"""
+
+    name = "replay"
+
+    def __init__(self, source):
+        source = Path(source)
+        if source.is_dir():
+            paths = sorted(path for path in source.iterdir()
+                           if path.suffix.lower() in (".png", ".jpg", ".jpeg", ".bmp"))
+        else:
+            paths = [source]
+
+        # 预先解码所有帧，回放时不再产生磁盘读取和解码开销
+        self.frames = [Image.open(path).convert("RGB") for path in paths]
+        if not self.frames:
+            raise ValueError(f"回放目录中没有图片: {source}")
+        self.index = 0
+        logger.info(f"回放截图后端已加载 {len(self.frames)} 帧: {source}")
+
+    def grab(self, bbox):
+        frame = self.frames[self.index]
+        self.index = (self.index + 1) % len(self.frames)
+
+        left, top, right, bottom = bbox
+        if right <= frame.width and bottom <= frame.height:
+            return frame.crop(bbox)
+        return frame.copy()
+
+
+class ChangeDetector:
+    """画面变化检测器，用于轮询截图时跳过未变化的帧"""
+
+    def __init__(self, threshold=2.0, sample_step=4):
+        self.threshold = threshold
+        self.sample_step = sample_step
+        self.previous = None
+
+    def has_changed(self, frame):
+        """判断帧与上一帧相比是否发生变化
+
+        frame: NumPy数组（推荐，来自grab_array）或PIL图像
+        """
+        if NUMPY_AVAILABLE and not isinstance(frame, Image.Image):
+            # 隔行隔列采样后比较平均差异，避免整帧拷贝
+            sample = frame[::self.sample_step, ::self.sample_step].astype(np.int16)
+            changed = (self.previous is None or self.previous.shape != sample.shape or
+                       float(np.abs(sample - self.previous).mean()) > self.threshold)
+            self.previous = sample
+            return changed
+
+        signature = hashlib.blake2b(
+            frame.convert("L").resize((64, 64)).tobytes(), digest_size=16).digest()
+        changed = signature != self.previous
+        self.previous = signature
+        return changed
+
+
+def create_capture_backend(name=None):
+    """根据配置创建截图后端，auto时优先使用mss"""
+    name = name or config_manager.get("capture_backend", "auto")
+
+    if name == "replay":
+        return ReplayBackend(config_manager.get("capture_replay_source", "test_pic"))
+
+    if name in ("auto", "mss") and MSS_AVAILABLE:
+        try:
+            return MSSBackend()
+        except Exception as e:
+            logger.warning(f"mss截图后端初始化失败，改用PIL: {e}")
+    elif name == "mss":
+        logger.warning("mss未安装，改用PIL截图后端")
+
+    return PILGrabBackend()
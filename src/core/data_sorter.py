@@ -5,18 +5,37 @@
 
 import re
 import os
+import json
+import hashlib
+import threading
+import zipfile
 from pathlib import Path
 from ..utils import logger, config_manager
+from ..utils.fuzzy_matcher import NGramIndex, normalize_text
+from ..utils.multi_matcher import keyword_matcher
+from ..utils.atomic_file import atomic_save_workbook, atomic_write_text
+from .sheet_layout import SheetLayout
+from .models import SetEntry
+from .sorted_sheet_exporter import SortedSheetExporter
+from .xlsx_appender import UnsupportedWorkbookError
 
 try:
     import openpyxl
-    from openpyxl.styles import PatternFill, Font, Alignment
-    from openpyxl.utils import get_column_letter
     OPENPYXL_AVAILABLE = True
 except ImportError:
     OPENPYXL_AVAILABLE = False
     logger.error("openpyxl未安装")
 
+# 修饰词清理、类别优先级或模糊去重的匹配方式变化时递增，使上次保存的排序状态失效
+CATEGORY_RULES_VERSION = 3
+
+
+def _digest(value):
+    """计算可JSON序列化数据的摘要"""
+    encoded = json.dumps(value, ensure_ascii=False, sort_keys=True,
+                         default=str, separators=(',', ':')).encode('utf-8')
+    return hashlib.blake2b(encoded, digest_size=16).hexdigest()
+
 
 class DataSorter:
     """数据排序处理器"""
@@ -24,15 +43,69 @@ class DataSorter:
     def __init__(self, excel_manager):
         self.excel_manager = excel_manager
         self.category_config = config_manager.get_category_config()
+        self.dedup_config = config_manager.get_dedup_config()
+        self.modifier_matcher, self.priority_matcher = self._build_matchers(self.category_config)
+        # 热加载在配置监视线程中替换规则；排序和建立索引期间持有此锁，一次处理只使用同一套规则
+        self.rules_lock = threading.Lock()
+        config_manager.add_listener(self.reload_rules)
+        self.last_merge_report = []
+        self.last_sort_changed = []  # 上次排序中发生变化的类别
+        self.last_sort_skipped = False  # 上次排序是否因内容未变化而跳过写入
+        self.last_sort_live = False  # 上次排序是否直接写入了正在运行的Excel
 
         if not OPENPYXL_AVAILABLE:
             raise ImportError("openpyxl是必需的依赖包")
 
+    @staticmethod
+    def _build_matchers(category_config):
+        """根据类别配置编译修饰词和优先级匹配器（相同的词表共用已编译的匹配器）"""
+        return (keyword_matcher(category_config.get('modifiers_to_remove')),
+                keyword_matcher(category_config.get('priority_order')))
+
+    def reload_rules(self):
+        """配置修改后重新加载类别和去重规则，规则没有变化时不重新编译，返回是否有变化
+
+        新规则先编译好，再在规则锁内一起替换；正在进行的排序结束后才会生效。
+        """
+        category_config = config_manager.get_category_config()
+        dedup_config = config_manager.get_dedup_config()
+        if category_config == self.category_config and dedup_config == self.dedup_config:
+            return False
+        modifier_matcher, priority_matcher = self._build_matchers(category_config)
+        with self.rules_lock:
+            self.category_config = category_config
+            self.dedup_config = dedup_config
+            self.modifier_matcher = modifier_matcher
+            self.priority_matcher = priority_matcher
+        logger.info("类别和去重规则已重新加载")
+        return True
+
     def sort_excel_data(self):
-        """Excel排序处理主函数"""
+        """Excel排序处理主函数，排序期间持有规则锁"""
+        with self.rules_lock:
+            return self._sort_excel_data()
+
+    def _sort_excel_data(self):
+        """读取、解析、排序并写入排序结果"""
+        self.last_sort_changed = []
+        self.last_sort_skipped = False
+        self.last_sort_live = False
         try:
-            # 读取历史数量数据
-            historical_quantities = self.excel_manager.read_historical_quantities()
+            # 文件自上次排序后未被修改时，无需读取即可跳过；
+            # 工作簿在Excel中打开时可能有未保存的修改，不能只看文件时间戳
+            previous_state = self._load_sort_state()
+            file_stamp = self._file_stamp()
+            config_digest = self._config_digest()
+            live = self.excel_manager.get_live_read_workbook() is not None
+            if (not live and previous_state.get('file_stamp') == file_stamp and
+                    previous_state.get('config_digest') == config_digest):
+                logger.info("Excel文件自上次排序后未修改，跳过排序")
+                self.last_sort_skipped = True
+                return True
+
+            # 读取历史数量数据（按排序结果表写入时的布局读取，布局配置修改后不会错位）
+            historical_quantities = self.excel_manager.read_historical_quantities(
+                self.written_block_width(previous_state))
 
             # 读取原始数据
             data_groups = self.excel_manager.read_data()
@@ -49,11 +122,26 @@ class DataSorter:
             # 排序数据
             sorted_data = self._sort_parsed_data(parsed_data)
 
+            # 与上次排序结果比较，内容未变化时跳过重写
+            category_digests = self._category_digests(
+                sorted_data, historical_quantities)
+            self.last_sort_changed = self._diff_categories(
+                previous_state.get('category_digests', {}), category_digests)
+            if (not self.last_sort_changed and
+                    previous_state.get('config_digest') == config_digest and
+                    self._sorted_sheets_exist()):
+                logger.info("排序数据没有变化，跳过重写")
+                self.last_sort_skipped = True
+                self._save_sort_state(category_digests, config_digest)
+                return True
+            logger.info(f"发生变化的类别: {self.last_sort_changed}")
+
             # 写入排序结果
             success = self._write_sorted_data(
                 sorted_data, historical_quantities)
 
             if success:
+                self._save_sort_state(category_digests, config_digest)
                 logger.info("Excel数据排序处理完成")
                 return True
             else:
@@ -64,51 +152,192 @@ class DataSorter:
             logger.error(f"排序处理失败: {e}")
             return False
 
+    def _file_stamp(self):
+        """Excel文件的修改时间和大小"""
+        try:
+            stat = os.stat(self.excel_manager.excel_file_path)
+            return [stat.st_mtime_ns, stat.st_size]
+        except (OSError, TypeError):
+            return None
+
+    def _config_digest(self):
+        """影响排序结果的配置摘要（类别规则、去重、布局和工作表名）"""
+        return _digest([
+            CATEGORY_RULES_VERSION,
+            self.category_config,
+            self.dedup_config,
+            config_manager.get_layout_config(),
+            config_manager.get_env('excel_sorted_sheet_name', '排序结果'),
+        ])
+
+    def _category_digests(self, categories, historical_quantities):
+        """按类别计算套装、物品和对应数量的摘要"""
+        return {
+            category: _digest([
+                [item.original_title, item.items,
+                 [historical_quantities.get(name) for name in item.items]]
+                for item in items])
+            for category, items in categories.items()
+        }
+
+    @staticmethod
+    def _diff_categories(previous_digests, current_digests):
+        """返回新增、删除或内容变化的类别"""
+        changed = [category for category, digest in current_digests.items()
+                   if previous_digests.get(category) != digest]
+        changed.extend(category for category in previous_digests
+                       if category not in current_digests)
+        return changed
+
+    def _sorted_sheets_exist(self):
+        """排序结果表是否仍在工作簿中（可能被用户手动删除）"""
+        return bool(self.excel_manager.get_sorted_sheet_names(
+            self.excel_manager.read_workbook_sheet_names()))
+
+    def _state_file(self):
+        return Path(config_manager.get("sort_state_file", "sort_state.json"))
+
+    def _load_sort_state(self):
+        """加载上次排序的状态，Excel文件不同时视为无状态"""
+        try:
+            state_file = self._state_file()
+            if state_file.exists():
+                with open(state_file, 'r', encoding='utf-8') as f:
+                    state = json.load(f)
+                if state.get('excel_file') == str(self.excel_manager.excel_file_path):
+                    return state
+        except Exception as e:
+            logger.warning(f"读取排序状态失败: {e}")
+        return {}
+
+    def written_block_width(self, state=None):
+        """排序结果表写入时使用的类别块宽度，没有排序状态时使用当前布局配置"""
+        if state is None:
+            state = self._load_sort_state()
+        return state.get('block_width') or SheetLayout.from_config().block_width
+
+    def _save_sort_state(self, category_digests, config_digest):
+        """保存本次排序的状态（写入后的文件时间戳、各类别摘要和类别块宽度）"""
+        state = {
+            'excel_file': str(self.excel_manager.excel_file_path),
+            'file_stamp': self._file_stamp(),
+            'config_digest': config_digest,
+            'category_digests': category_digests,
+            'block_width': SheetLayout.from_config().block_width,
+        }
+        try:
+            atomic_write_text(self._state_file(),
+                              json.dumps(state, ensure_ascii=False, indent=1))
+        except Exception as e:
+            logger.warning(f"保存排序状态失败: {e}")
+
     def _parse_data_groups(self, data_groups):
         """解析数据组，提取年份、类别、套装号"""
         parsed_data = []
         seen_combinations = set()  # 用于检测重复的组合
+        self.last_merge_report = []
+
+        dedup_config = self.dedup_config
+        fuzzy_enabled = dedup_config.get('enabled', True)
+        title_threshold = dedup_config.get('title_threshold', 0.85)
+        title_index = NGramIndex()
 
         for group in data_groups:
-            title = group['title']
-            items = group['items']
+            title = group.title
+            items = group.items
 
             # 解析标题
-            parsed_info = self._parse_title(title)
+            parsed_info = self.parse_title(title)
             if not parsed_info:
                 continue
+            year, category, set_number = parsed_info
 
             # 创建唯一标识符
-            unique_id = f"{parsed_info['year']}_{parsed_info['category']}_{parsed_info['set_number']}_{title}"
+            unique_id = f"{year}_{category}_{set_number}_{title}"
 
             # 检查是否已存在相同的组合
             if unique_id in seen_combinations:
-                logger.debug(f"发现重复的组合，跳过: {unique_id}")
+                logger.debug("发现重复的组合，跳过: %s", unique_id)
                 continue
 
+            # 模糊匹配：同年份、同类别、同套装号且标题近似的视为同一套装
+            # （标题较短时不同类别的标题相似度也可能超过阈值，不能跨类别合并）
+            if fuzzy_enabled:
+                match = title_index.find_best(
+                    normalize_text(title), title_threshold,
+                    accept=lambda entry: (entry.year == year and
+                                          entry.category == category and
+                                          entry.set_number == set_number))
+                if match:
+                    self._merge_duplicate_set(match[1], title, items, match[2])
+                    continue
+
             seen_combinations.add(unique_id)
 
-            parsed_data.append({
-                'original_title': title,
-                'year': parsed_info['year'],
-                'category': parsed_info['category'],
-                'set_number': parsed_info['set_number'],
-                'items': items,
-                'sort_key': (parsed_info['year'], parsed_info['category'], parsed_info['set_number'])
-            })
+            entry = SetEntry(title, year, category, set_number, list(items))
+            parsed_data.append(entry)
+            if fuzzy_enabled:
+                title_index.add(normalize_text(title), entry)
+
+            logger.debug("解析标题: %s → 年份:%s, 类别:%s, 套装号:%s", title,
+                         year, category, set_number)
 
-            logger.debug(
-                f"解析标题: {title} → 年份:{parsed_info['year']}, 类别:{parsed_info['category']}, 套装号:{parsed_info['set_number']}")
+        if self.last_merge_report:
+            logger.info(f"模糊去重合并了 {len(self.last_merge_report)} 个近似重复套装:")
+            for record in self.last_merge_report:
+                logger.info(
+                    f"  '{record['merged_title']}' → '{record['kept_title']}' "
+                    f"(相似度 {record['score']:.2f}, 策略 {record['policy']}, 新增物品 {record['items_added']})")
 
         logger.info(f"解析完成，共 {len(parsed_data)} 个有效套装")
         return parsed_data
 
-    def _parse_title(self, title):
-        """解析单个标题，提取年份、类别、套装号"""
+    def _merge_duplicate_set(self, entry, title, items, score):
+        """按合并策略将近似重复的套装合并到已有条目"""
+        policy = self.dedup_config.get('merge_policy', 'union')
+        items_added = 0
+
+        if policy == 'keep_longest':
+            if len(items) > len(entry.items):
+                items_added = len(items) - len(entry.items)
+                entry.original_title = title
+                entry.items = list(items)
+        elif policy == 'union':
+            merged_items = self._merge_item_lists(entry.items, items)
+            items_added = len(merged_items) - len(entry.items)
+            entry.items = merged_items
+        # keep_first：保留先出现的套装，直接丢弃后出现的
+
+        self.last_merge_report.append({
+            'kept_title': entry.original_title,
+            'merged_title': title,
+            'score': score,
+            'policy': policy,
+            'items_added': items_added
+        })
+
+    def _merge_item_lists(self, kept_items, new_items):
+        """合并物品列表，近似重复的物品名只保留先出现的写法"""
+        item_threshold = self.dedup_config.get('item_threshold', 0.85)
+        item_index = NGramIndex()
+        merged = list(kept_items)
+        for item_name in merged:
+            item_index.add(normalize_text(item_name))
+
+        for item_name in new_items:
+            key = normalize_text(item_name)
+            if item_index.find_best(key, item_threshold):
+                continue
+            item_index.add(key)
+            merged.append(item_name)
+        return merged
+
+    def parse_title(self, title):
+        """解析单个标题，返回(年份, 类别, 套装号)，无法解析时返回None"""
         # 提取年份（4位数字）
         year_match = re.search(r'(\d{4})', title)
         if not year_match:
-            logger.debug(f"未找到年份: {title}")
+            logger.debug("未找到年份: %s", title)
             return None
 
         year = int(year_match.group(1))
@@ -146,29 +375,18 @@ class DataSorter:
             else:
                 return None
         else:
-            logger.debug(f"未找到套装关键词: {title}")
+            logger.debug("未找到套装关键词: %s", title)
             return None
 
-        return {
-            'year': year,
-            'category': category,
-            'set_number': set_number
-        }
+        return year, category, set_number
 
     def _clean_category_name(self, category):
         """清理类别名称，移除修饰词"""
         if not category:
             return category
 
-        modifiers_to_remove = self.category_config.get(
-            'modifiers_to_remove', [])
-        cleaned_category = category
-
-        for modifier in modifiers_to_remove:
-            cleaned_category = cleaned_category.replace(modifier, '')
-
-        # 去除多余的空格
-        cleaned_category = cleaned_category.strip()
+        # 一次扫描删除所有修饰词，再去除多余的空格
+        cleaned_category = self.modifier_matcher.remove(category).strip()
 
         # 如果清理后的类别名为空，返回原始类别名
         if not cleaned_category:
@@ -176,19 +394,19 @@ class DataSorter:
 
         # 输出清理日志
         if cleaned_category != category:
-            logger.debug(f"类别名清理: '{category}' → '{cleaned_category}'")
+            logger.debug("类别名清理: '%s' → '%s'", category, cleaned_category)
 
         return cleaned_category
 
     def _sort_parsed_data(self, parsed_data):
         """对解析后的数据进行排序"""
         # 按照年份、类别、套装号排序
-        sorted_data = sorted(parsed_data, key=lambda x: x['sort_key'])
+        sorted_data = sorted(parsed_data, key=lambda x: x.sort_key)
 
         # 按类别分组
         categories = {}
         for item in sorted_data:
-            category = item['category']
+            category = item.category
             if category not in categories:
                 categories[category] = []
             categories[category].append(item)
@@ -197,25 +415,25 @@ class DataSorter:
         return categories
 
     def _sort_categories_by_priority(self, categories):
-        """按照优先级和内容数量对类别进行排序"""
-        priority_order = self.category_config.get('priority_order', [])
-
-        # 创建优先级映射
-        priority_map = {category: index for index,
-                        category in enumerate(priority_order)}
+        """按照优先级和内容数量对类别进行排序
 
+        类别名与优先级列表中的词完全相同时按该词排序；否则包含其中的词即视为匹配
+        （如"万圣"匹配"2023万圣主题"），同时包含多个时按最靠前的词排序。
+        """
         # 分离有优先级的类别和无优先级的类别
-        prioritized_categories = []
+        priority_map = {}
         unprioritized_categories = []
 
         for category in categories.keys():
-            if category in priority_map:
-                prioritized_categories.append(category)
+            priority = self.priority_matcher.rank(category)
+            if priority is not None:
+                priority_map[category] = priority
             else:
                 unprioritized_categories.append(category)
 
-        # 对有优先级的类别按照配置顺序排序
-        prioritized_categories.sort(key=lambda x: priority_map[x])
+        # 对有优先级的类别按照配置顺序排序，匹配同一个词的按内容数量（从多到少）排序
+        prioritized_categories = sorted(
+            priority_map, key=lambda x: (priority_map[x], -len(categories[x])))
 
         # 对无优先级的类别按照内容数量（从多到少）排序
         unprioritized_categories.sort(
@@ -237,107 +455,34 @@ class DataSorter:
         if historical_quantities is None:
             historical_quantities = {}
 
-        try:
-            workbook = openpyxl.load_workbook(
-                self.excel_manager.excel_file_path)
+        # 工作簿已在Excel中打开时直接写入，无需保存文件后重新打开
+        if config_manager.get("live_sort_output", True):
+            book = self.excel_manager.get_live_workbook()
+            if book is not None:
+                if self._write_sorted_data_live(book, categories, historical_quantities):
+                    self.last_sort_live = True
+                    return True
+                logger.warning("实时写入排序结果失败，改为写入文件")
 
-            # 创建或获取排序结果工作表
+        try:
             sorted_sheet_name = config_manager.get_env(
                 'excel_sorted_sheet_name', '排序结果')
 
-            if sorted_sheet_name in workbook.sheetnames:
-                # 如果工作表已存在，删除它
-                workbook.remove(workbook[sorted_sheet_name])
-                logger.info(f"删除已存在的工作表: {sorted_sheet_name}")
-
-            # 创建新的工作表
-            sorted_sheet = workbook.create_sheet(sorted_sheet_name)
-            logger.info(f"创建新工作表: {sorted_sheet_name}")
-
             # 使用自定义排序获取类别顺序
             sorted_category_names = self._sort_categories_by_priority(
                 categories)
 
-            # 计算每个类别的列位置
-            current_col = 1
-            category_positions = {}
+            layout = SheetLayout.from_config()
+            sheets = self._split_sheets(
+                sorted_sheet_name, sorted_category_names, categories)
 
-            for category in sorted_category_names:
-                category_positions[category] = current_col
-                item_count = len(categories[category])
-                logger.debug(
-                    f"类别 '{category}' (共{item_count}项) 分配到列 {get_column_letter(current_col)}-{get_column_letter(current_col+3)}")
-                current_col += 5  # 4列数据 + 1列空隙
-
-            # 写入数据
-            for category in sorted_category_names:
-                items = categories[category]
-                start_col = category_positions[category]
-                current_row = 1
-
-                logger.debug(f"开始写入类别: {category}")
-
-                # 写入每个套装的数据
-                for item in items:
-                    # 写入套装标题
-                    title_cell = sorted_sheet.cell(
-                        row=current_row, column=start_col, value=item['original_title'])
-                    title_cell.font = Font(bold=True)
-                    title_cell.alignment = Alignment(
-                        horizontal='center', vertical='center')
-
-                    # 写入物品名
-                    item_row = current_row
-                    for item_name in item['items']:
-                        item_cell = sorted_sheet.cell(
-                            row=item_row, column=start_col + 1, value=item_name)
-                        item_cell.font = Font(bold=True)
-                        item_cell.alignment = Alignment(
-                            horizontal='center', vertical='center')
-
-                        # 检查并写入历史数量数据
-                        if item_name in historical_quantities:
-                            quantities = historical_quantities[item_name]
-
-                            # 写入第一个数量（C列）
-                            if 'quantity1' in quantities:
-                                quantity1_cell = sorted_sheet.cell(
-                                    row=item_row, column=start_col + 2, value=quantities['quantity1'])
-                                quantity1_cell.font = Font(bold=True)
-                                quantity1_cell.alignment = Alignment(
-                                    horizontal='center', vertical='center')
-                                logger.debug(
-                                    f"恢复数量数据: {item_name} -> C列: {quantities['quantity1']}")
-
-                            # 写入第二个数量（D列）
-                            if 'quantity2' in quantities:
-                                quantity2_cell = sorted_sheet.cell(
-                                    row=item_row, column=start_col + 3, value=quantities['quantity2'])
-                                quantity2_cell.font = Font(bold=True)
-                                quantity2_cell.alignment = Alignment(
-                                    horizontal='center', vertical='center')
-                                logger.debug(
-                                    f"恢复数量数据: {item_name} -> D列: {quantities['quantity2']}")
-
-                        item_row += 1
-
-                    # 移动到下一个套装（至少空一行）
-                    current_row = max(current_row + 1, item_row + 1)
-
-                logger.debug(f"类别 {category} 写入完成")
-
-            # 应用格式设置
-            self._apply_excel_formatting(
-                sorted_sheet, categories, category_positions, current_col)
-
-            # 保存文件
-            workbook.save(self.excel_manager.excel_file_path)
-            workbook.close()
+            if not self._export_sorted_sheets_xml(layout, sheets, historical_quantities):
+                self._write_sorted_sheets_openpyxl(layout, sheets, historical_quantities)
 
             logger.info(f"排序数据已写入工作表: {sorted_sheet_name}")
-            recovered_count = len([k for k in historical_quantities.keys()
-                                   if any(item_name == k for items in categories.values()
-                                          for item in items for item_name in item['items'])])
+            written_items = {item_name for items in categories.values()
+                             for item in items for item_name in item.items}
+            recovered_count = len(written_items.intersection(historical_quantities))
             logger.info(f"已恢复 {recovered_count} 个家具的历史数量数据")
 
             return True
@@ -346,49 +491,96 @@ class DataSorter:
             logger.error(f"写入排序数据失败: {e}")
             return False
 
-    def _apply_excel_formatting(self, sorted_sheet, categories, category_positions, max_col):
-        """应用Excel格式设置"""
-        try:
-            max_row = sorted_sheet.max_row
-
-            # 设置行高为20
-            for row in range(1, max_row + 1):
-                sorted_sheet.row_dimensions[row].height = 20
-
-            # 设置列宽和格式
-            for category in categories.keys():
-                start_col = category_positions[category]
-
-                # 第1列：标题列，宽度20.13
-                title_col_letter = get_column_letter(start_col)
-                sorted_sheet.column_dimensions[title_col_letter].width = 20.13
-
-                # 第2列：物品名列，宽度20.13
-                item_col_letter = get_column_letter(start_col + 1)
-                sorted_sheet.column_dimensions[item_col_letter].width = 20.13
+    def _export_sorted_sheets_xml(self, layout, sheets, historical_quantities):
+        """直接生成排序结果表的XML写入文件（数据量大时多进程并行），返回是否已写入"""
+        if config_manager.get("sorted_export", {}).get("engine", "xml") != "xml":
+            return False
 
-                # 第3列：剩余列1，宽度5.13
-                col3_letter = get_column_letter(start_col + 2)
-                sorted_sheet.column_dimensions[col3_letter].width = 5.13
+        exporter = SortedSheetExporter.from_config(layout)
+        try:
+            # 已存在的排序结果表（包括按年份拆分的表）会被替换
+            exporter.export(self.excel_manager.excel_file_path, sheets, historical_quantities,
+                            self.excel_manager.get_sorted_sheet_names,
+                            config_manager.get("excel_backup_count", 2))
+            return True
+        except (UnsupportedWorkbookError, zipfile.BadZipFile, KeyError) as e:
+            logger.info(f"无法直接生成排序结果XML，改用openpyxl写入: {e}")
+            return False
 
-                # 第4列：剩余列2，宽度5.13
-                col4_letter = get_column_letter(start_col + 3)
-                sorted_sheet.column_dimensions[col4_letter].width = 5.13
+    def _write_sorted_sheets_openpyxl(self, layout, sheets, historical_quantities):
+        """使用openpyxl重建排序结果表并原子保存"""
+        workbook = openpyxl.load_workbook(
+            self.excel_manager.excel_file_path)
 
-                # 第5列：空隙列，宽度1.13，整列标红
-                if start_col + 4 <= max_col:
-                    gap_col_letter = get_column_letter(start_col + 4)
-                    sorted_sheet.column_dimensions[gap_col_letter].width = 1.13
+        # 删除已存在的排序结果表（包括按年份拆分的表）
+        for sheet_name in self.excel_manager.get_sorted_sheet_names(workbook.sheetnames):
+            workbook.remove(workbook[sheet_name])
+            logger.info(f"删除已存在的工作表: {sheet_name}")
 
-                    # 设置整列背景为红色
-                    red_fill = PatternFill(
-                        start_color="FF0000", end_color="FF0000", fill_type="solid")
+        for sheet_name, ordered_blocks in sheets:
+            sorted_sheet = workbook.create_sheet(sheet_name)
+            logger.info(f"创建新工作表: {sheet_name}")
+            layout.write(sorted_sheet, ordered_blocks, historical_quantities)
 
-                    for row in range(1, max_row + 1):
-                        cell = sorted_sheet.cell(row=row, column=start_col + 4)
-                        cell.fill = red_fill
+        # 原子保存文件，保存中断时原文件不受影响
+        atomic_save_workbook(workbook, self.excel_manager.excel_file_path,
+                             config_manager.get("excel_backup_count", 2))
+        workbook.close()
 
-            logger.debug("Excel格式设置完成")
+    def _write_sorted_data_live(self, book, categories, historical_quantities):
+        """使用xlwings把排序结果写入正在运行的Excel工作簿"""
+        try:
+            sorted_sheet_name = config_manager.get_env(
+                'excel_sorted_sheet_name', '排序结果')
+            sorted_category_names = self._sort_categories_by_priority(
+                categories)
+            layout = SheetLayout.from_config()
+
+            app = book.app
+            screen_updating = app.screen_updating
+            app.screen_updating = False
+            try:
+                # 删除已存在的排序结果表后重新创建，避免残留格式和列宽
+                sheet_names = [sheet.name for sheet in book.sheets]
+                for sheet_name in self.excel_manager.get_sorted_sheet_names(sheet_names):
+                    book.sheets[sheet_name].delete()
+                    logger.info(f"删除已存在的工作表: {sheet_name}")
+
+                for sheet_name, ordered_blocks in self._split_sheets(
+                        sorted_sheet_name, sorted_category_names, categories):
+                    sorted_sheet = book.sheets.add(sheet_name, after=book.sheets[-1])
+                    logger.info(f"创建新工作表: {sheet_name}")
+                    layout.write_live(sorted_sheet, ordered_blocks, historical_quantities)
+            finally:
+                app.screen_updating = screen_updating
+
+            try:
+                book.save()
+                logger.info("Excel文件已自动保存")
+            except Exception as e:
+                logger.warning(f"自动保存失败: {e}")
+
+            logger.info(f"排序数据已实时写入工作表: {sorted_sheet_name}")
+            return True
 
         except Exception as e:
-            logger.error(f"应用Excel格式失败: {e}")
+            logger.error(f"实时写入排序数据失败: {e}")
+            return False
+
+    def _split_sheets(self, sorted_sheet_name, sorted_category_names, categories):
+        """按配置拆分工作表，返回[(工作表名, [(类别, 套装列表)])]"""
+        if not config_manager.get_layout_config().get('sheet_per_year', False):
+            return [(sorted_sheet_name,
+                     [(category, categories[category]) for category in sorted_category_names])]
+
+        # 按年份分表，每张表内沿用相同的类别顺序
+        years = sorted({entry.year for entries in categories.values() for entry in entries})
+        sheets = []
+        for year in years:
+            ordered_blocks = []
+            for category in sorted_category_names:
+                entries = [entry for entry in categories[category] if entry.year == year]
+                if entries:
+                    ordered_blocks.append((category, entries))
+            sheets.append((f"{sorted_sheet_name}_{year}", ordered_blocks))
+        return sheets
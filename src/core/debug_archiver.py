@@ -0,0 +1,137 @@
+# -*- coding: utf-8 -*-
+"""
+调试图片归档模块
+
+后台线程异步写入调试截图，按内容哈希去重，并按数量、容量和时间清理旧图片。
+保留策略只作用于本模块写入的图片（文件名带微秒时间和内容哈希），
+目录中之前保存的 capture_年月日_时分秒.png 等其他文件不会被清理。
+"""
+
+import queue
+import re
+import threading
+import time
+from collections import deque
+from pathlib import Path
+from ..utils import logger, config_manager
+
+FILE_PREFIX = "capture_"
+# 本模块写入的文件名：前缀 + 年月日_时分秒_微秒 + 内容哈希（16位十六进制）
+ARCHIVE_NAME = re.compile(rf"{FILE_PREFIX}\d{{8}}_\d{{6}}_\d{{6}}_[0-9a-f]{{16}}\.png")
+
+
+class DebugImageArchiver:
+    """异步调试图片归档器"""
+
+    def __init__(self, debug_dir):
+        self.debug_dir = Path(debug_dir)
+        self.debug_dir.mkdir(exist_ok=True)
+
+        archive_config = config_manager.get("debug_archive", {})
+        self.max_count = archive_config.get("max_count", 500)
+        self.max_bytes = archive_config.get("max_total_mb", 200) * 1024 * 1024
+        self.max_age = archive_config.get("max_age_days", 7) * 86400
+
+        self.queue = queue.Queue(maxsize=archive_config.get("queue_size", 8))
+        self.files = deque()  # (路径, 大小, 修改时间)，按时间从旧到新
+        self.total_bytes = 0
+        self.seen_hashes = set()
+        self.thread = None
+        self.dropped = 0
+
+        self._scan_existing()
+
+    def _scan_existing(self):
+        """扫描本模块写入的调试图片，初始化保留队列和哈希集合"""
+        entries = []
+        for path in self.debug_dir.glob(f"{FILE_PREFIX}*.png"):
+            if not ARCHIVE_NAME.fullmatch(path.name):
+                continue
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            entries.append((path, stat.st_size, stat.st_mtime))
+            # 文件名末尾是内容哈希
+            self.seen_hashes.add(path.stem.rsplit("_", 1)[-1])
+
+        entries.sort(key=lambda entry: entry[2])
+        self.files.extend(entries)
+        self.total_bytes = sum(entry[1] for entry in entries)
+
+    def _ensure_thread(self):
+        """首次提交时启动后台写入线程"""
+        if self.thread is None or not self.thread.is_alive():
+            self.thread = threading.Thread(
+                target=self._worker, name="DebugImageArchiver", daemon=True)
+            self.thread.start()
+
+    def submit(self, artifact):
+        """提交截图产物，不阻塞截图流程；队列已满时丢弃"""
+        self._ensure_thread()
+        try:
+            self.queue.put_nowait(artifact)
+            return True
+        except queue.Full:
+            self.dropped += 1
+            logger.warning(f"调试图片队列已满，丢弃本次截图（累计丢弃 {self.dropped} 张）")
+            return False
+
+    def close(self, timeout=5):
+        """等待队列写完并停止后台线程"""
+        if self.thread is None or not self.thread.is_alive():
+            return
+        try:
+            self.queue.put(None, timeout=timeout)
+        except queue.Full:
+            return
+        self.thread.join(timeout)
+
+    def _worker(self):
+        """后台写入循环"""
+        while True:
+            task = self.queue.get()
+            if task is None:
+                break
+            try:
+                self._write(task)
+            except Exception as e:
+                logger.error(f"保存调试图片失败: {e}")
+
+    def _write(self, artifact):
+        """写入一张调试图片，直接使用截图产物中已编码的PNG字节"""
+        digest = artifact.digest
+        if digest in self.seen_hashes:
+            logger.info(f"调试图片内容未变化，跳过保存: {digest}")
+            return
+
+        # 文件名包含微秒和内容哈希，同一秒内的多次截图不会互相覆盖
+        filename = f"{FILE_PREFIX}{artifact.captured_at.strftime('%Y%m%d_%H%M%S_%f')}_{digest}.png"
+        filepath = self.debug_dir / filename
+        png_bytes = artifact.png_bytes
+        filepath.write_bytes(png_bytes)
+
+        size = len(png_bytes)
+        self.seen_hashes.add(digest)
+        self.files.append((filepath, size, time.time()))
+        self.total_bytes += size
+        logger.info(f"调试图片已保存: {filepath}")
+
+        self._enforce_retention()
+
+    def _enforce_retention(self):
+        """按数量、容量和保存时间清理最旧的调试图片"""
+        expire_before = time.time() - self.max_age
+        while self.files and (len(self.files) > self.max_count or
+                              self.total_bytes > self.max_bytes or
+                              self.files[0][2] < expire_before):
+            path, size, _ = self.files.popleft()
+            self.total_bytes -= size
+            self.seen_hashes.discard(path.stem.rsplit("_", 1)[-1])
+            try:
+                path.unlink()
+                logger.info(f"清理旧调试图片: {path}")
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                logger.warning(f"清理调试图片失败: {e}")
@@ -7,8 +7,13 @@ import os
 import sys
 import subprocess
 import re
+from contextlib import contextmanager
 from pathlib import Path
 from ..utils import logger, config_manager
+from ..utils.atomic_file import atomic_save_workbook
+from .sheet_layout import SheetLayout
+from .models import DataGroup, quantity_row
+from .xlsx_appender import XlsxAppender, UnsupportedWorkbookError
 
 try:
     import openpyxl
@@ -26,6 +31,11 @@ except ImportError:
     XLWINGS_AVAILABLE = False
     logger.warning("xlwings未安装，将仅使用openpyxl")
 
+try:
+    import pythoncom
+except ImportError:
+    pythoncom = None
+
 
 class ExcelManager:
     """Excel文件管理器"""
@@ -76,7 +86,7 @@ class ExcelManager:
                     worksheet.title = excel_sheet_name
 
                 # 保存文件
-                workbook.save(self.excel_file_path)
+                atomic_save_workbook(workbook, self.excel_file_path)
                 workbook.close()
                 logger.info(f"创建新的Excel文件: {self.excel_file_path}")
 
@@ -120,9 +130,41 @@ class ExcelManager:
                 return True
             logger.warning("xlwings写入失败，尝试使用openpyxl")
 
+        # 直接修改工作表XML追加，不重写其他工作表
+        if config_manager.get("xlsx_patch_append", True):
+            if self._write_with_xml_patch(title, items):
+                return True
+
         # 备用方案：使用openpyxl
         return self._write_with_openpyxl(title, items)
 
+    @staticmethod
+    @contextmanager
+    def worker_thread():
+        """在后台线程中读取Excel时使用：Windows上xlwings需要每个线程先初始化COM"""
+        if pythoncom is None:
+            yield
+            return
+        pythoncom.CoInitialize()
+        try:
+            yield
+        finally:
+            pythoncom.CoUninitialize()
+
+    def get_live_workbook(self):
+        """获取已在运行的Excel中打开的工作簿，未打开时返回None（不会启动Excel）"""
+        if not self.xlwings_available or not self.excel_file_name:
+            return None
+
+        try:
+            for app in xw.apps:
+                for book in app.books:
+                    if book.name == self.excel_file_name:
+                        return book
+        except Exception as e:
+            logger.warning(f"查找已打开的Excel工作簿失败: {e}")
+        return None
+
     def _write_with_xlwings(self, title, items):
         """使用xlwings写入正在运行的Excel"""
         try:
@@ -178,7 +220,7 @@ class ExcelManager:
                 for i, item_name in enumerate(items):
                     item_row = current_row + i
                     ws.range(f'B{item_row}').value = item_name
-                    logger.debug(f"写入物品名到B{item_row}: {item_name}")
+                    logger.debug("写入物品名到B%d: %s", item_row, item_name)
 
             # 保存文件
             try:
@@ -193,6 +235,33 @@ class ExcelManager:
             logger.error(f"xlwings写入失败: {e}")
             return False
 
+    def _write_with_xml_patch(self, title, items):
+        """直接修改xlsx中目标工作表的XML追加数据"""
+        try:
+            # 检查文件是否被占用
+            try:
+                with open(self.excel_file_path, 'r+b'):
+                    pass
+            except PermissionError:
+                logger.error(f"Excel文件正在被使用: {self.excel_file_path}")
+                return False
+
+            # 第一行为标题和第一个物品，之后每行一个物品
+            rows = [[title if i == 0 else None, item_name]
+                    for i, item_name in enumerate(items)] or [[title]]
+            start_row = XlsxAppender(self.excel_file_path).append_rows(
+                rows, config_manager.get_env('excel_sheet_name'), gap_rows=2,
+                backup_count=config_manager.get("excel_backup_count", 2))
+            logger.info(f"数据已追加到Excel文件: A{start_row}, 标题: {title}, 物品数: {len(items)}")
+            return True
+
+        except UnsupportedWorkbookError as e:
+            logger.info(f"工作簿不适合XML追加，改用openpyxl: {e}")
+            return False
+        except Exception as e:
+            logger.warning(f"XML追加失败，改用openpyxl: {e}")
+            return False
+
     def _write_with_openpyxl(self, title, items):
         """使用openpyxl写入Excel文件"""
         try:
@@ -227,10 +296,11 @@ class ExcelManager:
             for i, item_name in enumerate(items):
                 item_row = current_row + i
                 worksheet.cell(row=item_row, column=2, value=item_name)
-                logger.debug(f"写入物品名到B{item_row}: {item_name}")
+                logger.debug("写入物品名到B%d: %s", item_row, item_name)
 
-            # 保存并关闭文件
-            workbook.save(self.excel_file_path)
+            # 原子保存并关闭文件
+            atomic_save_workbook(workbook, self.excel_file_path,
+                                 config_manager.get("excel_backup_count", 2))
             workbook.close()
             logger.info("数据已写入Excel文件")
             return True
@@ -331,14 +401,82 @@ class ExcelManager:
             logger.error(f"查找空行失败: {e}")
             return 1
 
+    def get_live_read_workbook(self):
+        """获取用于实时读取的已打开工作簿，未启用实时读取或Excel未打开时返回None"""
+        if not config_manager.get("live_excel_read", True):
+            return None
+        return self.get_live_workbook()
+
+    @staticmethod
+    def _read_live_sheet_rows(sheet, max_columns=None):
+        """一次COM调用读取从A1到已用区域右下角的二维数组"""
+        last_cell = sheet.used_range.last_cell
+        last_row, last_col = last_cell.row, last_cell.column
+        if max_columns:
+            last_col = min(last_col, max_columns)
+        values = sheet.range((1, 1), (last_row, last_col)).options(ndim=2).value
+        # xlwings把数字读成浮点数，整数值转回int，与openpyxl读取结果保持一致
+        return [[int(value) if isinstance(value, float) and value.is_integer() else value
+                 for value in row] for row in values]
+
+    @staticmethod
+    def _parse_data_rows(rows):
+        """从(A列, B列)行数据中解析标题组，返回DataGroup列表"""
+        data_groups = []
+        current_group = None
+
+        for row in rows:
+            a_value = row[0] if len(row) > 0 else None
+            b_value = row[1] if len(row) > 1 else None
+
+            if a_value and str(a_value).strip():
+                # A列有值，这是一个新的标题组
+                if current_group:
+                    data_groups.append(current_group)
+
+                current_group = DataGroup(str(a_value).strip())
+
+                # 如果B列也有值，添加到物品列表
+                if b_value and str(b_value).strip():
+                    current_group.items.append(str(b_value).strip())
+
+            elif b_value and str(b_value).strip() and current_group:
+                # 只有B列有值，添加到当前组的物品列表
+                current_group.items.append(str(b_value).strip())
+
+        # 添加最后一组
+        if current_group:
+            data_groups.append(current_group)
+
+        return data_groups
+
     def read_data(self):
         """读取Excel中的原始数据"""
         if not self.excel_file_path or not os.path.exists(self.excel_file_path):
             logger.error("Excel文件不存在")
             return []
 
+        # Excel已打开时读取实时数据，包含尚未保存的修改
+        book = self.get_live_read_workbook()
+        if book is not None:
+            try:
+                excel_sheet_name = config_manager.get_env('excel_sheet_name')
+                if excel_sheet_name and excel_sheet_name in [ws.name for ws in book.sheets]:
+                    worksheet = book.sheets[excel_sheet_name]
+                else:
+                    worksheet = book.sheets[0]
+
+                data_groups = self._parse_data_rows(
+                    self._read_live_sheet_rows(worksheet, 2))
+                logger.info(f"从正在运行的Excel读取到 {len(data_groups)} 个数据组")
+                return data_groups
+
+            except Exception as e:
+                logger.warning(f"实时读取Excel失败，改用文件读取: {e}")
+
         try:
-            workbook = openpyxl.load_workbook(self.excel_file_path)
+            # 只读模式流式读取A、B两列
+            workbook = openpyxl.load_workbook(self.excel_file_path, read_only=True)
 
             # 选择原始数据工作表
             excel_sheet_name = config_manager.get_env('excel_sheet_name')
@@ -347,35 +485,8 @@ class ExcelManager:
             else:
                 worksheet = workbook.active
 
-            data_groups = []
-            current_group = None
-
-            # 读取所有数据
-            for row in range(1, worksheet.max_row + 1):
-                a_value = worksheet.cell(row=row, column=1).value
-                b_value = worksheet.cell(row=row, column=2).value
-
-                if a_value and str(a_value).strip():
-                    # A列有值，这是一个新的标题组
-                    if current_group:
-                        data_groups.append(current_group)
-
-                    current_group = {
-                        'title': str(a_value).strip(),
-                        'items': []
-                    }
-
-                    # 如果B列也有值，添加到物品列表
-                    if b_value and str(b_value).strip():
-                        current_group['items'].append(str(b_value).strip())
-
-                elif b_value and str(b_value).strip() and current_group:
-                    # 只有B列有值，添加到当前组的物品列表
-                    current_group['items'].append(str(b_value).strip())
-
-            # 添加最后一组
-            if current_group:
-                data_groups.append(current_group)
+            data_groups = self._parse_data_rows(
+                worksheet.iter_rows(min_col=1, max_col=2, values_only=True))
 
             workbook.close()
             logger.info(f"读取到 {len(data_groups)} 个数据组")
@@ -385,59 +496,124 @@ class ExcelManager:
             logger.error(f"读取Excel数据失败: {e}")
             return []
 
-    def read_historical_quantities(self):
-        """读取排序结果表中的历史数量数据"""
+    def read_workbook_sheet_names(self):
+        """快速获取工作表名称列表（Excel已打开时读取实时工作簿）"""
+        book = self.get_live_read_workbook()
+        if book is not None:
+            try:
+                return [sheet.name for sheet in book.sheets]
+            except Exception as e:
+                logger.warning(f"实时读取工作表列表失败，改用文件读取: {e}")
+
+        try:
+            workbook = openpyxl.load_workbook(self.excel_file_path, read_only=True)
+            sheet_names = workbook.sheetnames
+            workbook.close()
+            return sheet_names
+        except Exception as e:
+            logger.error(f"读取工作表列表失败: {e}")
+            return []
+
+    def get_sorted_sheet_names(self, sheet_names):
+        """从工作表名称中筛选排序结果表（包括按年份拆分的表）"""
+        sorted_sheet_name = config_manager.get_env(
+            'excel_sorted_sheet_name', '排序结果')
+        year_pattern = re.compile(rf'^{re.escape(sorted_sheet_name)}_\d{{4}}$')
+        return [name for name in sheet_names
+                if name == sorted_sheet_name or year_pattern.match(name)]
+
+    def _iter_sorted_sheet_rows(self):
+        """逐行读取所有排序结果表的值
+
+        Excel已打开时每张表一次COM调用读取实时数据，否则以只读模式流式读取文件。
+        """
+        book = self.get_live_read_workbook()
+        if book is not None:
+            try:
+                sheet_names = self.get_sorted_sheet_names(
+                    [sheet.name for sheet in book.sheets])
+                live_rows = []
+                for sheet_name in sheet_names:
+                    live_rows.extend(self._read_live_sheet_rows(book.sheets[sheet_name]))
+                logger.info(f"从正在运行的Excel读取排序结果表: {sheet_names}")
+                yield from live_rows
+                return
+            except Exception as e:
+                logger.warning(f"实时读取排序结果表失败，改用文件读取: {e}")
+
+        workbook = openpyxl.load_workbook(self.excel_file_path, read_only=True)
+        try:
+            sheet_names = self.get_sorted_sheet_names(workbook.sheetnames)
+            if not sheet_names:
+                logger.info("排序结果表不存在")
+            for sheet_name in sheet_names:
+                yield from workbook[sheet_name].iter_rows(values_only=True)
+        finally:
+            workbook.close()
+
+    def read_historical_quantities(self, block_width=None):
+        """读取排序结果表中的历史数量数据，返回{物品名: 按数量列顺序的数量元组}
+
+        block_width: 排序结果表写入时的类别块宽度（见DataSorter.written_block_width），默认使用当前布局配置
+        """
         if not self.excel_file_path or not os.path.exists(self.excel_file_path):
             logger.error("Excel文件不存在")
             return {}
 
         try:
-            workbook = openpyxl.load_workbook(self.excel_file_path)
-            sorted_sheet_name = config_manager.get_env(
-                'excel_sorted_sheet_name', '排序结果')
-
-            # 检查排序结果表是否存在
-            if sorted_sheet_name not in workbook.sheetnames:
-                logger.info(f"排序结果表 '{sorted_sheet_name}' 不存在，无历史数量数据")
-                workbook.close()
-                return {}
-
-            sorted_sheet = workbook[sorted_sheet_name]
+            block_width = block_width or SheetLayout.from_config().block_width
+            quantity_count = block_width - 3
             historical_quantities = {}
 
-            # 遍历所有行和列，查找家具名称和对应的数量
-            for row in range(1, sorted_sheet.max_row + 1):
-                for col in range(1, sorted_sheet.max_column + 1, 5):  # 每5列为一个类别组
-                    # B列（col+1）是家具名称，C列（col+2）和D列（col+3）是数量
-                    furniture_name_cell = sorted_sheet.cell(
-                        row=row, column=col + 1)
-                    quantity1_cell = sorted_sheet.cell(row=row, column=col + 2)
-                    quantity2_cell = sorted_sheet.cell(row=row, column=col + 3)
-
-                    furniture_name = furniture_name_cell.value
-                    quantity1 = quantity1_cell.value
-                    quantity2 = quantity2_cell.value
+            # 遍历所有行和类别块，查找家具名称和对应的数量
+            for row in self._iter_sorted_sheet_rows():
+                row_length = len(row)
+                for col in range(0, row_length, block_width):
+                    # 块内第2列是家具名称，之后是数量列
+                    if col + 1 >= row_length:
+                        break
+                    furniture_name = row[col + 1]
 
                     # 如果家具名称存在且不为空
                     if furniture_name and str(furniture_name).strip():
                         furniture_key = str(furniture_name).strip()
 
                         # 保存数量数据（如果存在）
-                        quantities = {}
-                        if quantity1 is not None and str(quantity1).strip():
-                            quantities['quantity1'] = quantity1
-                        if quantity2 is not None and str(quantity2).strip():
-                            quantities['quantity2'] = quantity2
+                        quantities = quantity_row(
+                            row[quantity_col] if quantity_col < row_length else None
+                            for quantity_col in range(col + 2, col + 2 + quantity_count))
 
                         if quantities:  # 只有当存在数量数据时才保存
                             historical_quantities[furniture_key] = quantities
-                            logger.debug(
-                                f"保存历史数量: {furniture_key} -> {quantities}")
+                            logger.debug("保存历史数量: %s -> %s",
+                                         furniture_key, quantities)
 
-            workbook.close()
             logger.info(f"读取到 {len(historical_quantities)} 个家具的历史数量数据")
             return historical_quantities
 
         except Exception as e:
             logger.error(f"读取历史数量数据失败: {e}")
             return {}
+
+    def read_known_item_names(self, block_width=None):
+        """读取排序结果表中已确认的物品名，block_width含义同read_historical_quantities"""
+        if not self.excel_file_path or not os.path.exists(self.excel_file_path):
+            return []
+
+        try:
+            block_width = block_width or SheetLayout.from_config().block_width
+            item_names = []
+
+            # 每个类别块的第2列是物品名
+            for row in self._iter_sorted_sheet_rows():
+                for col in range(1, len(row), block_width):
+                    value = row[col]
+                    if value and str(value).strip():
+                        item_names.append(str(value).strip())
+
+            logger.info(f"读取到 {len(item_names)} 个已确认物品名")
+            return item_names
+
+        except Exception as e:
+            logger.error(f"读取已确认物品名失败: {e}")
+            return []
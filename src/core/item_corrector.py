@@ -0,0 +1,135 @@
+# -*- coding: utf-8 -*-
+"""
+物品名纠错模块
+
+基于已确认物品名词库，使用SymSpell风格的删除字典对OCR结果进行纠错。
+"""
+
+import json
+import threading
+from itertools import combinations
+from pathlib import Path
+from ..utils import logger, config_manager
+from ..utils.fuzzy_matcher import levenshtein_distance
+
+
+class ItemCorrector:
+    """已知物品名纠错器"""
+
+    def __init__(self):
+        self.correction_config = config_manager.get_correction_config()
+        self.max_edit_distance = self.correction_config.get(
+            'max_edit_distance', 1)
+        self.store_file = Path(self.correction_config.get(
+            'store_file', 'known_items.json'))
+        self.known_items = set()
+        self.deletes = {}  # 删除变体 -> 物品名集合
+        # 预识别线程查询词库时，界面线程可能正在添加物品名
+        self.lock = threading.Lock()
+
+        self._load_store()
+
+    def _load_store(self):
+        """加载本地物品名词库"""
+        try:
+            if self.store_file.exists():
+                with open(self.store_file, 'r', encoding='utf-8') as f:
+                    items = json.load(f)
+                self.add_items(items)
+                logger.info(f"加载物品名词库: {len(self.known_items)} 项")
+        except Exception as e:
+            logger.error(f"加载物品名词库失败: {e}")
+
+    def save_store(self):
+        """保存本地物品名词库"""
+        try:
+            with self.lock:
+                items = sorted(self.known_items)
+            with open(self.store_file, 'w', encoding='utf-8') as f:
+                json.dump(items, f, ensure_ascii=False, indent=0)
+            logger.info(f"物品名词库已保存: {len(self.known_items)} 项")
+        except Exception as e:
+            logger.error(f"保存物品名词库失败: {e}")
+
+    def _generate_deletes(self, text):
+        """生成最多删除max_edit_distance个字符的所有变体"""
+        variants = {text}
+        for distance in range(1, min(self.max_edit_distance, len(text)) + 1):
+            for positions in combinations(range(len(text)), distance):
+                variants.add("".join(char for i, char in enumerate(text)
+                                     if i not in positions))
+        return variants
+
+    def add_items(self, items, persist=False):
+        """添加已确认的物品名到词库，返回新增数量"""
+        added = 0
+        with self.lock:
+            for item in items:
+                item = str(item).strip() if item is not None else ""
+                if not item or item in self.known_items:
+                    continue
+                self.known_items.add(item)
+                for variant in self._generate_deletes(item):
+                    self.deletes.setdefault(variant, set()).add(item)
+                added += 1
+
+        if added and persist:
+            self.save_store()
+        return added
+
+    def lookup(self, text):
+        """查找最接近的已知物品名，返回(物品名, 编辑距离)或None"""
+        variants = self._generate_deletes(text)
+        with self.lock:
+            if text in self.known_items:
+                return text, 0
+            candidates = set()
+            for variant in variants:
+                candidates.update(self.deletes.get(variant, ()))
+
+        best = None
+        ambiguous = False
+        for candidate in candidates:
+            distance = levenshtein_distance(
+                text, candidate, self.max_edit_distance)
+            if distance > self.max_edit_distance:
+                continue
+            if best is None or distance < best[1]:
+                best = (candidate, distance)
+                ambiguous = False
+            elif distance == best[1]:
+                ambiguous = True
+
+        # 存在多个同样接近的候选时不做纠正
+        if best is None or ambiguous:
+            return None
+        return best
+
+    def correct(self, text, corrections=None):
+        """纠正物品名，返回(纠正后的文本, 置信度)，发生纠正时把纠错记录追加到corrections"""
+        if not self.correction_config.get('enabled', True) or not self.known_items:
+            return text, None
+
+        match = self.lookup(text)
+        if not match:
+            return text, None
+
+        corrected, distance = match
+        confidence = 1.0 - distance / max(len(text), len(corrected))
+        if distance == 0:
+            return corrected, confidence
+
+        if confidence < self.correction_config.get('min_confidence', 0.75):
+            logger.info(
+                f"物品名纠正置信度过低，保留原文: '{text}' ≈ '{corrected}' (置信度 {confidence:.2f})")
+            return text, None
+
+        if corrections is not None:
+            corrections.append({
+                'original': text,
+                'corrected': corrected,
+                'confidence': confidence
+            })
+        logger.info(
+            f"物品名纠正: '{text}' → '{corrected}' (置信度 {confidence:.2f})")
+        return corrected, confidence
@@ -0,0 +1,300 @@
+# -*- coding: utf-8 -*-
+"""
+物品倒排索引模块
+
+根据原始数据表和排序结果表中的历史数量，建立 物品名 / 字符n-gram → 套装、年份、类别、数量
+的倒排索引，用于快速回答"某个物品在哪个套装里、有多少"。
+索引保存到本地文件；Excel文件变化后只增删内容发生变化的套装，不重建整个索引。
+"""
+
+import hashlib
+import json
+import os
+import time
+from pathlib import Path
+from ..utils import logger, config_manager
+from ..utils.atomic_file import atomic_write_text
+from ..utils.fuzzy_matcher import normalize_text
+from .models import ItemLocation
+
+INDEX_VERSION = 1
+
+# 前缀标记：PREFIX_MARK + 物品名的首字/前两个字，用于先找出以查询开头的物品
+PREFIX_MARK = "\x02"
+
+
+def _grams(text):
+    """索引用的字符n-gram：单字、相邻双字和带前缀标记的首字、前两个字"""
+    grams = set(text)
+    grams.update(text[i:i + 2] for i in range(len(text) - 1))
+    grams.add(PREFIX_MARK + text[:1])
+    grams.add(PREFIX_MARK + text[:2])
+    return grams
+
+
+def _query_grams(text):
+    """查询用的n-gram：单字查询用单字，否则用双字"""
+    if len(text) == 1:
+        return [text]
+    return [text[i:i + 2] for i in range(len(text) - 1)]
+
+
+def _set_digest(title, items):
+    """套装内容摘要，标题和物品都相同的套装视为同一个"""
+    encoded = "\x1f".join([title] + list(items)).encode("utf-8")
+    return hashlib.blake2b(encoded, digest_size=12).hexdigest()
+
+
+class ItemIndex:
+    """物品倒排索引"""
+
+    def __init__(self, data_sorter, index_file=None):
+        self.data_sorter = data_sorter
+        self.excel_manager = data_sorter.excel_manager
+        index_config = config_manager.get("item_index", {})
+        self.index_file = Path(index_file or index_config.get("file", "item_index.json"))
+        self.live_refresh_seconds = index_config.get("live_refresh_seconds", 60)
+        self.search_limit = index_config.get("search_limit", 50)
+        self.last_refresh = 0.0
+        self._clear()
+        self._load()
+
+    def _clear(self):
+        """清空索引"""
+        self.source = {}
+        self.next_id = 0
+        self.sets = {}        # 套装摘要 -> [标题, 年份, 类别, [[条目编号, 物品名, 规范化物品名], ...]]
+        self.entries = {}     # 条目编号 -> (物品名, 规范化物品名, 套装摘要)
+        self.lengths = {}     # 条目编号 -> 规范化物品名长度，用于排序倒排表
+        self.postings = {}    # n-gram -> {条目编号}
+        self.ordered = {}     # n-gram -> 按(物品名长度, 条目编号)排序的条目编号列表，查询时按需生成
+        self.quantities = {}  # 物品名 -> 数量元组
+
+    def __len__(self):
+        return len(self.entries)
+
+    def mark_stale(self):
+        """程序自身写入Excel后调用，下次查询时重新读取（Excel打开时不受刷新间隔限制）"""
+        self.last_refresh = 0.0
+
+    # ---------- 持久化 ----------
+
+    def _load(self):
+        """从索引文件加载，版本不一致或文件损坏时视为空索引"""
+        try:
+            if not self.index_file.exists():
+                return
+            with open(self.index_file, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get('version') != INDEX_VERSION:
+                return
+
+            self.source = data['source']
+            self.next_id = data['next_id']
+            self.sets = data['sets']
+            self.quantities = {name: tuple(values) for name, values in data['quantities'].items()}
+            # 文件中的倒排表已按查询顺序排列，直接作为排序缓存
+            self.ordered = data['postings']
+            self.postings = {gram: set(ids) for gram, ids in self.ordered.items()}
+            for digest, (_, _, _, items) in self.sets.items():
+                for entry_id, item_name, key in items:
+                    self.entries[entry_id] = (item_name, key, digest)
+                    self.lengths[entry_id] = len(key)
+            logger.info(f"已加载物品索引: {len(self.sets)} 个套装, {len(self.entries)} 个物品")
+        except Exception as e:
+            logger.warning(f"加载物品索引失败，将重新建立: {e}")
+            self._clear()
+
+    def save(self):
+        """原子写入索引文件"""
+        data = {
+            'version': INDEX_VERSION,
+            'source': self.source,
+            'next_id': self.next_id,
+            'sets': self.sets,
+            'quantities': self.quantities,
+            'postings': {gram: self._ordered(gram) for gram in self.postings},
+        }
+        try:
+            atomic_write_text(self.index_file,
+                              json.dumps(data, ensure_ascii=False, separators=(',', ':')))
+        except Exception as e:
+            logger.warning(f"保存物品索引失败: {e}")
+
+    # ---------- 增量更新 ----------
+
+    def _add_set(self, digest, title, items):
+        """把一个套装的物品加入索引"""
+        parsed = self.data_sorter.parse_title(title)
+        year, category = (parsed[0], parsed[1]) if parsed else (None, None)
+
+        indexed_items = []
+        for item_name in items:
+            key = normalize_text(item_name)
+            if not key:
+                continue
+            entry_id = self.next_id
+            self.next_id += 1
+            indexed_items.append([entry_id, item_name, key])
+            self.entries[entry_id] = (item_name, key, digest)
+            self.lengths[entry_id] = len(key)
+            for gram in _grams(key):
+                self.postings.setdefault(gram, set()).add(entry_id)
+                self.ordered.pop(gram, None)
+        self.sets[digest] = [title, year, category, indexed_items]
+
+    def _remove_set(self, digest):
+        """把一个套装的物品移出索引"""
+        for entry_id, _, key in self.sets.pop(digest)[3]:
+            del self.entries[entry_id]
+            del self.lengths[entry_id]
+            for gram in _grams(key):
+                self.ordered.pop(gram, None)
+                ids = self.postings.get(gram)
+                if ids is not None:
+                    ids.discard(entry_id)
+                    if not ids:
+                        del self.postings[gram]
+
+    def update(self, data_groups, historical_quantities):
+        """按套装内容摘要增量更新索引，返回(新增套装数, 删除套装数)"""
+        current = {}
+        for group in data_groups:
+            current.setdefault(_set_digest(group.title, group.items), group)
+
+        removed = [digest for digest in self.sets if digest not in current]
+        for digest in removed:
+            self._remove_set(digest)
+        added = [digest for digest in current if digest not in self.sets]
+        # 同一次更新中的套装按同一套类别规则解析
+        with self.data_sorter.rules_lock:
+            for digest in added:
+                self._add_set(digest, current[digest].title, current[digest].items)
+
+        self.quantities = dict(historical_quantities)
+        return len(added), len(removed)
+
+    def _source_key(self):
+        """索引对应的Excel文件、文件时间戳和类别规则"""
+        path = self.excel_manager.excel_file_path
+        try:
+            stat = os.stat(path)
+            stamp = [stat.st_mtime_ns, stat.st_size]
+        except (OSError, TypeError):
+            stamp = None
+        rules = json.dumps(self.data_sorter.category_config, ensure_ascii=False, sort_keys=True)
+        return {'excel_file': str(path), 'file_stamp': stamp, 'rules': rules}
+
+    def read_changes(self, force=False):
+        """Excel内容可能变化时读取原始数据和历史数量，返回(来源, 数据组, 历史数量)，无需读取时返回None
+
+        文件时间戳未变化时直接使用已有索引；工作簿在Excel中打开时无法判断是否修改，
+        按live_refresh_seconds间隔重新读取。只读取不修改索引，可以在后台线程中调用，
+        结果交给apply_changes在查询所在的线程中更新索引。
+        """
+        source = self._source_key()
+        live = self.excel_manager.get_live_read_workbook() is not None
+        if not force and self.sets:
+            if not live and source == self.source:
+                return None
+            if live and self.last_refresh and \
+                    time.monotonic() - self.last_refresh < self.live_refresh_seconds:
+                return None
+
+        start = time.perf_counter()
+        data_groups = self.excel_manager.read_data()
+        historical_quantities = self.excel_manager.read_historical_quantities(
+            self.data_sorter.written_block_width())
+        logger.info(f"物品索引读取Excel耗时 {time.perf_counter() - start:.2f}s")
+        return source, data_groups, historical_quantities
+
+    def apply_changes(self, changes):
+        """用read_changes的结果增量更新索引并保存"""
+        source, data_groups, historical_quantities = changes
+        # Excel文件或类别规则不同时，已有条目不能复用
+        if (source['excel_file'], source['rules']) != (self.source.get('excel_file'),
+                                                     self.source.get('rules')):
+            self._clear()
+
+        start = time.perf_counter()
+        added, removed = self.update(data_groups, historical_quantities)
+        self.source = source
+        self.last_refresh = time.monotonic()
+        self.save()
+        logger.info(f"物品索引已更新: 新增 {added} 个套装, 删除 {removed} 个套装, "
+                    f"共 {len(self.entries)} 个物品, 耗时 {time.perf_counter() - start:.2f}s")
+
+    def refresh(self, force=False):
+        """Excel内容可能变化时重新读取并增量更新索引，返回是否读取了Excel"""
+        changes = self.read_changes(force)
+        if changes is None:
+            return False
+        self.apply_changes(changes)
+        return True
+
+    # ---------- 查询 ----------
+
+    def _ordered(self, gram):
+        """按(物品名长度, 条目编号)排序的倒排表，较短的物品名排在前面"""
+        ordered = self.ordered.get(gram)
+        if ordered is None:
+            # 先按编号排序，再按长度稳定排序，避免逐个构造元组
+            ordered = sorted(self.postings.get(gram, ()))
+            ordered.sort(key=self.lengths.__getitem__)
+            self.ordered[gram] = ordered
+        return ordered
+
+    def _collect(self, grams, matches, found, limit):
+        """从grams中最短的倒排表按顺序收集满足条件的条目，够limit个时停止"""
+        gram = min(grams, key=lambda gram: len(self.postings[gram]))
+        entries = self.entries
+        for entry_id in self._ordered(gram):
+            if matches(entries[entry_id][1]) and entry_id not in found:
+                found.append(entry_id)
+                if len(found) >= limit:
+                    break
+
+    def search(self, query, limit=None):
+        """查询包含query的物品，返回ItemLocation列表
+
+        以query开头的排在前面（完全相同的最短，自然排在最前），其次是其他包含query的，
+        同一级内物品名短的在前。
+        """
+        key = normalize_text(query)
+        if not key:
+            return []
+        limit = limit or self.search_limit
+
+        # 包含query的物品一定出现在每个查询n-gram的倒排表中，n-gram只能筛选候选，需确认是连续子串
+        grams = _query_grams(key)
+        if not all(gram in self.postings for gram in grams):
+            return []
+        posting_sets = sorted((self.postings[gram] for gram in grams), key=len)
+        candidates = posting_sets[0].intersection(*posting_sets[1:]) if len(posting_sets) > 1 \
+            else posting_sets[0]
+
+        if len(candidates) <= limit * 4:
+            # 候选较少时直接排序
+            entries = self.entries
+            ranked = sorted((not item_key.startswith(key), len(item_key), entry_id)
+                            for entry_id, item_key in ((entry_id, entries[entry_id][1])
+                                                       for entry_id in candidates)
+                            if key in item_key)
+            found = [entry_id for _, _, entry_id in ranked[:limit]]
+        else:
+            # 候选很多时（如单字查询）按已排好序的倒排表依次收集，找够limit个即停止
+            found = []
+            prefix = PREFIX_MARK + key[:2]
+            if prefix in self.postings:
+                self._collect(grams + [prefix], lambda item_key: item_key.startswith(key),
+                              found, limit)
+            if len(found) < limit:
+                self._collect(grams, lambda item_key: key in item_key, found, limit)
+
+        results = []
+        for entry_id in found:
+            item_name, _, digest = self.entries[entry_id]
+            title, year, category, _ = self.sets[digest]
+            results.append(ItemLocation(item_name, title, year, category,
+                                        self.quantities.get(item_name)))
+        return results
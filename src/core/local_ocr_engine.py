@@ -0,0 +1,275 @@
+# -*- coding: utf-8 -*-
+"""
+本地离线OCR引擎模块
+
+通过表格线检测切分单元格，再用Tesseract逐个识别，
+输出与腾讯云表格识别相同的TableDetections/Cells结构。
+"""
+
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from PIL import Image
+from ..utils import logger, config_manager
+
+try:
+    import pytesseract
+    PYTESSERACT_AVAILABLE = True
+except ImportError:
+    PYTESSERACT_AVAILABLE = False
+    logger.warning("pytesseract未安装，本地OCR引擎不可用")
+
+
+def _recognize_lines(image, lang, psm, tesseract_cmd=None):
+    """识别图像中的文本行，返回[(文本, 置信度, (left, top, right, bottom))]"""
+    if tesseract_cmd:
+        pytesseract.pytesseract.tesseract_cmd = tesseract_cmd
+
+    data = pytesseract.image_to_data(
+        image, lang=lang, config=f'--psm {psm}', output_type=pytesseract.Output.DICT)
+
+    lines = {}
+    for i, word in enumerate(data['text']):
+        word = word.strip()
+        confidence = float(data['conf'][i])
+        if not word or confidence < 0:
+            continue
+        key = (data['block_num'][i], data['par_num'][i], data['line_num'][i])
+        line = lines.setdefault(key, {'words': [], 'confs': [], 'box': None})
+        line['words'].append(word)
+        line['confs'].append(confidence)
+        box = (data['left'][i], data['top'][i],
+               data['left'][i] + data['width'][i], data['top'][i] + data['height'][i])
+        if line['box'] is None:
+            line['box'] = box
+        else:
+            line['box'] = (min(line['box'][0], box[0]), min(line['box'][1], box[1]),
+                           max(line['box'][2], box[2]), max(line['box'][3], box[3]))
+
+    results = []
+    for key in sorted(lines):
+        line = lines[key]
+        # 中文模型会在字符间插入空格，这里直接拼接
+        text = "".join(line['words'])
+        confidence = sum(line['confs']) / len(line['confs'])
+        results.append((text, confidence, line['box']))
+    return results
+
+
+def _recognize_cell(task):
+    """识别单个单元格（在工作进程中执行）"""
+    image, lang, tesseract_cmd = task
+    lines = _recognize_lines(image, lang, 7, tesseract_cmd)
+    if not lines:
+        return "", 0.0
+    text = "".join(line[0] for line in lines)
+    confidence = min(line[1] for line in lines)
+    return text, confidence
+
+
+class LocalOCREngine:
+    """本地离线表格OCR引擎"""
+
+    def __init__(self):
+        self.local_config = config_manager.get("local_ocr", {})
+        self.lang = self.local_config.get("lang", "chi_sim")
+        self.tesseract_cmd = self.local_config.get("tesseract_cmd") or None
+        self.dark_threshold = self.local_config.get("dark_threshold", 100)
+        self.line_ratio = self.local_config.get("line_ratio", 0.5)
+        self.max_workers = self.local_config.get(
+            "max_workers") or os.cpu_count() or 1
+        self.executor = None
+        self.executor_lock = threading.Lock()
+
+        if self.tesseract_cmd and PYTESSERACT_AVAILABLE:
+            pytesseract.pytesseract.tesseract_cmd = self.tesseract_cmd
+
+    def is_available(self):
+        """检查本地OCR引擎是否可用"""
+        if not PYTESSERACT_AVAILABLE:
+            return False
+        try:
+            pytesseract.get_tesseract_version()
+            return True
+        except Exception as e:
+            logger.error(f"Tesseract不可用: {e}")
+            return False
+
+    def _get_executor(self):
+        """获取进程池（首次使用时创建，之后复用）"""
+        with self.executor_lock:
+            if self.executor is None and self.max_workers > 1:
+                self.executor = ProcessPoolExecutor(max_workers=self.max_workers)
+                logger.info(f"本地OCR进程池已创建，进程数: {self.max_workers}")
+            return self.executor
+
+    def close(self):
+        """关闭进程池"""
+        if self.executor is not None:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+            self.executor = None
+
+    def recognize_table(self, image):
+        """识别表格图像，返回与腾讯云表格识别结构一致的结果"""
+        if not PYTESSERACT_AVAILABLE:
+            logger.error("pytesseract未安装，无法使用本地OCR")
+            return None
+
+        try:
+            image = image.convert('RGB')
+            row_lines, col_lines = self.detect_grid(image)
+            if len(row_lines) < 2 or len(col_lines) < 2:
+                logger.warning("本地OCR未检测到表格线")
+                return None
+
+            cells = self._recognize_title_cells(image, row_lines[0])
+            cells.extend(self._recognize_grid_cells(
+                image, row_lines, col_lines))
+
+            logger.info(
+                f"本地OCR识别完成: {len(row_lines) - 1}行 x {len(col_lines) - 1}列")
+            return {
+                "TableDetections": [{"Type": 1, "Cells": cells}],
+                "RequestId": "local"
+            }
+
+        except Exception as e:
+            logger.error(f"本地OCR识别失败: {e}")
+            return None
+
+    def recognize_text_lines(self, image):
+        """识别普通文本图像，返回[(文本, 置信度, (left, top, right, bottom))]"""
+        if not PYTESSERACT_AVAILABLE:
+            logger.error("pytesseract未安装，无法使用本地OCR")
+            return None
+
+        try:
+            return _recognize_lines(image, self.lang, 6)
+        except Exception as e:
+            logger.error(f"本地文字识别失败: {e}")
+            return None
+
+    def detect_grid(self, image):
+        """检测表格线，返回(横线y坐标列表, 竖线x坐标列表)"""
+        binary = self._binarize(image)
+        width, height = binary.size
+
+        # 用BOX缩放一次性求出每行/每列的深色像素占比
+        row_profile = list(binary.resize((1, height), Image.BOX).getdata())
+        row_lines = self._find_lines(row_profile)
+        if len(row_lines) < 2:
+            return row_lines, []
+
+        # 竖线只在表格的纵向范围内统计
+        table_region = binary.crop((0, row_lines[0], width, row_lines[-1] + 1))
+        col_profile = list(table_region.resize((width, 1), Image.BOX).getdata())
+        col_lines = self._find_lines(col_profile)
+
+        # 只保留落在表格顶线水平范围内的竖线，排除窗口边框
+        top_line = list(binary.crop(
+            (0, row_lines[0], width, row_lines[0] + 1)).getdata())
+        span = self._longest_run(top_line)
+        if span:
+            left, right = span[0] - 2, span[1] + 2
+            col_lines = [x for x in col_lines if left <= x <= right]
+        return row_lines, col_lines
+
+    def _longest_run(self, values):
+        """返回最长连续深色像素段的(起点, 终点)"""
+        best = None
+        run_start = None
+        for index, value in enumerate(values + [0]):
+            if value:
+                if run_start is None:
+                    run_start = index
+            elif run_start is not None:
+                if best is None or index - run_start > best[1] - best[0]:
+                    best = (run_start, index - 1)
+                run_start = None
+        return best
+
+    def _binarize(self, image):
+        """灰度化并二值化，深色像素为255"""
+        threshold = self.dark_threshold
+        return image.convert('L').point(lambda p: 255 if p < threshold else 0)
+
+    def _find_lines(self, profile):
+        """从投影中找出表格线位置，相邻的线像素合并为一条"""
+        limit = 255 * self.line_ratio
+        lines = []
+        run_start = None
+        for index, value in enumerate(profile + [0]):
+            if value >= limit:
+                if run_start is None:
+                    run_start = index
+            elif run_start is not None:
+                lines.append((run_start + index - 1) // 2)
+                run_start = None
+        return lines
+
+    def _recognize_title_cells(self, image, table_top):
+        """识别表格上方区域的文本行，作为位置为-1的标题单元格"""
+        if table_top <= 0:
+            return []
+
+        title_strip = image.crop((0, 0, image.width, table_top))
+        cells = []
+        for text, confidence, box in _recognize_lines(title_strip, self.lang, 6):
+            cells.append(self._make_cell(-1, -1, -1, -1, text, confidence, box))
+        return cells
+
+    def _recognize_grid_cells(self, image, row_lines, col_lines):
+        """切分并识别所有表格单元格"""
+        binary = self._binarize(image)
+        positions = []
+        tasks = []
+        empty_cells = []
+        inset = 2
+
+        for row in range(len(row_lines) - 1):
+            for col in range(len(col_lines) - 1):
+                box = (col_lines[col] + inset, row_lines[row] + inset,
+                       col_lines[col + 1] - inset, row_lines[row + 1] - inset)
+                if box[2] <= box[0] or box[3] <= box[1]:
+                    continue
+
+                # 没有深色像素的单元格直接跳过识别
+                if not binary.crop(box).getbbox():
+                    empty_cells.append((row, col, box))
+                    continue
+
+                positions.append((row, col, box))
+                tasks.append((image.crop(box), self.lang, self.tesseract_cmd))
+
+        executor = self._get_executor()
+        if executor is not None and len(tasks) > 1:
+            results = list(executor.map(_recognize_cell, tasks))
+        else:
+            results = [_recognize_cell(task) for task in tasks]
+
+        cells = []
+        for (row, col, box), (text, confidence) in zip(positions, results):
+            cells.append(self._make_cell(
+                col, row, col + 1, row + 1, text, confidence, box))
+        for row, col, box in empty_cells:
+            cells.append(self._make_cell(col, row, col + 1, row + 1, "", 0, box))
+        return cells
+
+    def _make_cell(self, col_tl, row_tl, col_br, row_br, text, confidence, box):
+        """构造与腾讯云结果一致的单元格结构"""
+        left, top, right, bottom = box
+        return {
+            "ColTl": col_tl,
+            "RowTl": row_tl,
+            "ColBr": col_br,
+            "RowBr": row_br,
+            "Text": text,
+            "Type": "body",
+            "Confidence": int(confidence),
+            "Polygon": [
+                {"X": left, "Y": top},
+                {"X": right, "Y": top},
+                {"X": right, "Y": bottom},
+                {"X": left, "Y": bottom}
+            ]
+        }
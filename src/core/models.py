@@ -0,0 +1,110 @@
+# -*- coding: utf-8 -*-
+"""
+数据模型模块
+
+Excel读取、OCR提取和排序流程共用的数据结构。使用__slots__，
+不为每个对象分配属性字典；类别名经过驻留，同一类别的所有套装共享同一个字符串对象。
+历史数量按数量列顺序保存为元组（空白为None），不再使用逐个物品的字典。
+"""
+
+import sys
+
+_years = {}
+
+
+def intern_category(category):
+    """驻留类别名，相同类别只保留一个字符串对象"""
+    return sys.intern(category) if category else category
+
+
+def intern_year(year):
+    """共享年份整数对象（超出小整数缓存范围的int每次解析都会新建）"""
+    return _years.setdefault(year, year)
+
+
+class DataGroup:
+    """原始数据中的标题组：标题和其下的物品名"""
+
+    __slots__ = ('title', 'items')
+
+    def __init__(self, title, items=None):
+        self.title = title
+        self.items = items if items is not None else []
+
+    def __repr__(self):
+        return f"DataGroup({self.title!r}, {len(self.items)}项)"
+
+
+class SetEntry:
+    """解析后的套装"""
+
+    __slots__ = ('original_title', 'year', 'category', 'set_number', 'items')
+
+    def __init__(self, original_title, year, category, set_number, items):
+        self.original_title = original_title
+        self.year = intern_year(year)
+        self.category = intern_category(category)
+        self.set_number = set_number
+        self.items = items
+
+    @property
+    def sort_key(self):
+        """排序键：年份、类别、套装号"""
+        return self.year, self.category, self.set_number
+
+    def __repr__(self):
+        return f"SetEntry({self.original_title!r}, {len(self.items)}项)"
+
+
+class TextCandidate:
+    """OCR识别出的标题或物品名候选"""
+
+    __slots__ = ('text', 'row', 'confidence')
+
+    def __init__(self, text, row, confidence):
+        self.text = text
+        self.row = row
+        self.confidence = confidence
+
+    def __repr__(self):
+        return f"TextCandidate({self.text!r}, 行{self.row})"
+
+
+def quantity_row(values):
+    """把数量列的值转为历史数量元组（空白为None），全部为空时返回None"""
+    quantities = []
+    filled = False
+    for value in values:
+        # 只有字符串需要判断是否为空白，数字直接视为已填写
+        if value is None or (isinstance(value, str) and not value.strip()):
+            quantities.append(None)
+        else:
+            quantities.append(value)
+            filled = True
+    return tuple(quantities) if filled else None
+
+
+class ItemLocation:
+    """物品查询结果：物品所在的套装和历史数量"""
+
+    __slots__ = ('item_name', 'title', 'year', 'category', 'quantities')
+
+    def __init__(self, item_name, title, year, category, quantities=None):
+        self.item_name = item_name
+        self.title = title
+        self.year = year
+        self.category = category
+        self.quantities = quantities
+
+    def describe(self):
+        """一行文字描述：物品 — 套装标题 (年份 类别) 数量: a/b"""
+        text = f"{self.item_name} — {self.title}"
+        if self.year is not None:
+            text += f" ({self.year} {self.category})"
+        if self.quantities:
+            text += " 数量: " + "/".join("" if value is None else str(value)
+                                         for value in self.quantities)
+        return text
+
+    def __repr__(self):
+        return f"ItemLocation({self.item_name!r}, {self.title!r})"
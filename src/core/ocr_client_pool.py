@@ -0,0 +1,168 @@
+# -*- coding: utf-8 -*-
+"""
+OCR客户端池模块
+
+按配置创建多个地域/多个账号的OCR客户端，按最少在途请求或平滑加权轮询分发请求，
+并按客户端跟踪健康状态，失败时自动切换到其他客户端。
+"""
+
+import threading
+from tencentcloud.common import credential
+from tencentcloud.common.profile.client_profile import ClientProfile
+from tencentcloud.common.profile.http_profile import HttpProfile
+from tencentcloud.ocr.v20181119 import ocr_client
+from ..utils import logger, config_manager
+from .ocr_resilience import (CircuitBreaker, CircuitOpenError, ResilientCaller, TokenBucket,
+                             get_shared_rate_limiter, is_retriable_error)
+
+DEFAULT_ENDPOINT = "ocr.tencentcloudapi.com"
+
+
+class PooledClient:
+    """池中的单个OCR客户端"""
+
+    def __init__(self, name, client, weight, caller):
+        self.name = name
+        self.client = client
+        self.weight = max(1, int(weight))
+        self.caller = caller
+        self.outstanding = 0
+        self.current_weight = 0  # 平滑加权轮询的当前权重
+
+    def is_healthy(self):
+        """熔断器未打开（或冷却已结束）时视为健康"""
+        return self.caller.circuit_breaker.is_available()
+
+
+class OCRClientPool:
+    """OCR客户端池"""
+
+    def __init__(self, clients, strategy="least_outstanding"):
+        self.clients = clients
+        self.strategy = strategy
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def configured_credentials():
+        """按ocr_endpoints读取每个客户端的密钥，返回[(名称, SecretId, SecretKey)]
+
+        默认密钥与程序其他部分一样通过config_manager.get_env读取，
+        单独配置了secret_id_env/secret_key_env的客户端按变量名读取，.env热加载后同样生效。
+        """
+        credentials = []
+        for index, endpoint_config in enumerate(config_manager.get("ocr_endpoints") or [{}]):
+            name = endpoint_config.get("name") or f"client{index + 1}"
+            secret_id_env = endpoint_config.get("secret_id_env")
+            secret_key_env = endpoint_config.get("secret_key_env")
+            secret_id = (config_manager.get_env_var(secret_id_env) if secret_id_env
+                         else config_manager.get_env('secret_id'))
+            secret_key = (config_manager.get_env_var(secret_key_env) if secret_key_env
+                          else config_manager.get_env('secret_key'))
+            credentials.append((name, secret_id, secret_key))
+        return credentials
+
+    @classmethod
+    def from_config(cls, credentials=None):
+        """根据配置创建客户端池，未配置ocr_endpoints时使用.env中的单个账号
+
+        credentials为configured_credentials()的结果，为空时重新读取。
+        """
+        endpoints = config_manager.get("ocr_endpoints") or [{}]
+        breaker_config = config_manager.get("ocr_circuit_breaker", {})
+        retry_config = config_manager.get("ocr_retry", {})
+
+        credentials = credentials or cls.configured_credentials()
+
+        clients = []
+        for endpoint_config, (name, secret_id, secret_key) in zip(endpoints, credentials):
+            if not secret_id or not secret_key:
+                logger.error(f"OCR客户端 {name} 的API密钥未设置，已跳过")
+                continue
+
+            try:
+                http_profile = HttpProfile(
+                    protocol=endpoint_config.get("protocol", "https"),
+                    endpoint=endpoint_config.get("endpoint", DEFAULT_ENDPOINT))
+                client_profile = ClientProfile()
+                client_profile.httpProfile = http_profile
+                client = ocr_client.OcrClient(
+                    credential.Credential(secret_id, secret_key),
+                    endpoint_config.get("region", ""), client_profile)
+            except Exception as e:
+                logger.error(f"初始化OCR客户端 {name} 失败: {e}")
+                continue
+
+            # 每个账号有独立的QPS配额，未单独配置时使用全局共享令牌桶
+            if "qps" in endpoint_config:
+                rate_limiter = TokenBucket(endpoint_config["qps"],
+                                           endpoint_config.get("burst", endpoint_config["qps"]))
+            else:
+                rate_limiter = get_shared_rate_limiter()
+
+            caller = ResilientCaller(
+                rate_limiter,
+                CircuitBreaker(breaker_config.get("failure_threshold", 5),
+                               breaker_config.get("reset_timeout", 30)),
+                retry_config)
+            clients.append(PooledClient(
+                name, client, endpoint_config.get("weight", 1), caller))
+            logger.info(
+                f"OCR客户端 {name} 初始化成功: {endpoint_config.get('endpoint', DEFAULT_ENDPOINT)} "
+                f"地域={endpoint_config.get('region', '') or '默认'}")
+
+        return cls(clients, config_manager.get("ocr_dispatch_strategy", "least_outstanding"))
+
+    def __len__(self):
+        return len(self.clients)
+
+    def _choose(self, exclude):
+        """选择下一个客户端"""
+        candidates = [client for client in self.clients
+                      if client not in exclude and client.is_healthy()]
+        if not candidates:
+            # 全部不健康时仍然尝试，由熔断器决定是否快速失败
+            candidates = [
+                client for client in self.clients if client not in exclude]
+        if not candidates:
+            return None
+
+        if self.strategy == "weighted_round_robin":
+            # 平滑加权轮询（同nginx）
+            total = sum(client.weight for client in candidates)
+            for client in candidates:
+                client.current_weight += client.weight
+            chosen = max(candidates, key=lambda client: client.current_weight)
+            chosen.current_weight -= total
+            return chosen
+
+        return min(candidates, key=lambda client: client.outstanding / client.weight)
+
+    def call(self, action, request):
+        """调用OCR接口，单个客户端失败时切换到其他客户端"""
+        tried = []
+        last_error = None
+        while True:
+            with self.lock:
+                pooled = self._choose(tried)
+                if pooled is None:
+                    break
+                pooled.outstanding += 1
+            tried.append(pooled)
+
+            try:
+                return pooled.caller.call(getattr(pooled.client, action), request)
+            except Exception as e:
+                if not isinstance(e, CircuitOpenError) and not is_retriable_error(e):
+                    raise
+                last_error = e
+                logger.warning(f"OCR客户端 {pooled.name} 调用失败，切换客户端: {e}")
+            finally:
+                with self.lock:
+                    pooled.outstanding -= 1
+
+        raise last_error or CircuitOpenError("没有可用的OCR客户端")
+
+    def get_stats(self):
+        """获取每个客户端的在途请求和容错统计"""
+        return {client.name: {"outstanding": client.outstanding, **client.caller.get_stats()}
+                for client in self.clients}
@@ -4,15 +4,22 @@ OCR处理模块
 """
 
 import json
-import base64
-import io
+import logging
 import re
-from tencentcloud.common import credential
-from tencentcloud.common.profile.client_profile import ClientProfile
-from tencentcloud.common.profile.http_profile import HttpProfile
+import threading
+from collections import OrderedDict
 from tencentcloud.common.exception.tencent_cloud_sdk_exception import TencentCloudSDKException
-from tencentcloud.ocr.v20181119 import ocr_client, models
+from tencentcloud.ocr.v20181119 import models
 from ..utils import logger, config_manager
+from ..utils.response_sink import RawResponseSink
+from ..utils.multi_matcher import pattern_matcher
+from .item_corrector import ItemCorrector
+from .local_ocr_engine import LocalOCREngine
+from .table_template import TableTemplate
+from .capture_artifact import CaptureArtifact
+from .ocr_resilience import CircuitOpenError
+from .ocr_client_pool import OCRClientPool
+from .models import TextCandidate
 
 
 class OCRProcessor:
@@ -20,83 +27,252 @@ class OCRProcessor:
 
     def __init__(self):
         self.ocr_client = None
+        self.client_credentials = None  # 创建客户端池时使用的密钥
         self.filter_config = config_manager.get_filter_config()
+        self.invalid_item_matcher, self.invalid_item_texts, self.title_blacklist = \
+            self._build_filters(self.filter_config)
+        # 热加载在配置监视线程中替换过滤规则；提取期间持有此锁，一次提取只使用同一套规则
+        self.filter_lock = threading.Lock()
+        config_manager.add_listener(self.reload_filters)
+        self.item_corrector = ItemCorrector()
+        self.engine = config_manager.get("ocr_engine", "tencent")
+        self.local_engine = LocalOCREngine() if self.engine == "local" else None
+        self.table_template = TableTemplate(config_manager.get("table_template"))
+        self.result_cache = OrderedDict()
+        # 多区域识别时多个线程同时读写结果缓存
+        self.cache_lock = threading.Lock()
+        # 原始响应记录方式：sink（压缩JSONL）、text（文本日志）或off
+        self.raw_response_log = config_manager.get("raw_response_log", "sink")
+        self.response_sink = RawResponseSink() if self.raw_response_log == "sink" else None
         self._init_ocr_client()
+        config_manager.add_listener(self.reload_client)
+
+    @staticmethod
+    def _build_filters(filter_config):
+        """根据过滤配置编译无效物品名正则和黑名单集合"""
+        return (pattern_matcher(filter_config.get('invalid_item_patterns')),
+                frozenset(filter_config.get('invalid_item_texts', [])),
+                frozenset(filter_config.get('title_blacklist', [])))
+
+    def reload_filters(self):
+        """配置修改后重新加载过滤规则，规则没有变化时不重新编译，返回是否有变化
+
+        新规则先编译好，再在过滤规则锁内一起替换，不会与正在进行的提取混用新旧规则。
+        """
+        filter_config = config_manager.get_filter_config()
+        if filter_config == self.filter_config:
+            return False
+        filters = self._build_filters(filter_config)
+        with self.filter_lock:
+            self.filter_config = filter_config
+            self.invalid_item_matcher, self.invalid_item_texts, self.title_blacklist = filters
+        logger.info("OCR过滤规则已重新加载")
+        return True
 
     def _init_ocr_client(self):
-        """初始化腾讯云OCR客户端"""
+        """初始化腾讯云OCR客户端池"""
         try:
-            secret_id = config_manager.get_env('secret_id')
-            secret_key = config_manager.get_env('secret_key')
-
-            if not secret_id or not secret_key:
-                logger.error("腾讯云API密钥未设置")
+            self.client_credentials = OCRClientPool.configured_credentials()
+            ocr_client = OCRClientPool.from_config(self.client_credentials)
+            if not len(ocr_client):
+                logger.error("没有可用的腾讯云OCR客户端")
+                self.ocr_client = None
                 return False
 
-            cred = credential.Credential(secret_id, secret_key)
-            httpProfile = HttpProfile()
-            httpProfile.endpoint = "ocr.tencentcloudapi.com"
-
-            clientProfile = ClientProfile()
-            clientProfile.httpProfile = httpProfile
-
-            self.ocr_client = ocr_client.OcrClient(cred, "", clientProfile)
-            logger.info("腾讯云OCR客户端初始化成功")
+            # 整体替换，进行中的请求继续使用原来的客户端池
+            self.ocr_client = ocr_client
+            logger.info(f"腾讯云OCR客户端池初始化成功，共 {len(self.ocr_client)} 个客户端")
             return True
 
         except Exception as e:
             logger.error(f"初始化OCR客户端失败: {e}")
             return False
 
-    def recognize_table(self, image):
-        """识别表格图像"""
+    def reload_client(self):
+        """.env中的密钥修改后重新创建客户端池，密钥没有变化时不重建，返回是否重建"""
+        if OCRClientPool.configured_credentials() == self.client_credentials:
+            return False
+        logger.info("OCR密钥已修改，重新创建客户端池")
+        self._init_ocr_client()
+        return True
+
+    def recognize_table(self, image, use_template=True):
+        """识别表格图像
+
+        image: PIL图像或CaptureArtifact，传入CaptureArtifact时复用其PNG编码和内容哈希
+        use_template: 是否允许使用表格模板快速识别（模板只适用于主选框截图）
+        """
+        artifact = image if isinstance(
+            image, CaptureArtifact) else CaptureArtifact(image)
+
+        # 相同画面直接返回缓存结果
+        cache_key = (self.engine, artifact.digest)
+        with self.cache_lock:
+            if cache_key in self.result_cache:
+                self.result_cache.move_to_end(cache_key)
+                logger.info(f"命中OCR结果缓存: {artifact.digest}")
+                return self.result_cache[cache_key]
+
+        result = None
+        if use_template and config_manager.get("use_table_template", False) and self.table_template.is_valid_for(
+                artifact.size, config_manager.get("selection_coordinates")):
+            result = self._recognize_with_template(artifact.image)
+            if not result:
+                logger.warning("模板快速识别未得到有效结果，改用整表识别")
+
+        if not result:
+            result = self._recognize_full_table(artifact)
+        artifact.release_payload()
+
+        if result:
+            with self.cache_lock:
+                self.result_cache[cache_key] = result
+                while len(self.result_cache) > config_manager.get("ocr_result_cache_size", 16):
+                    self.result_cache.popitem(last=False)
+        return result
+
+    def _recognize_full_table(self, artifact):
+        """整表识别"""
+        if self.local_engine is not None:
+            return self.local_engine.recognize_table(artifact.image)
+
         if not self.ocr_client:
             logger.error("OCR客户端未初始化")
             return None
 
         try:
-            # 转换图片为base64
-            buffer = io.BytesIO()
-            image.save(buffer, format='PNG')
-            image_base64 = base64.b64encode(buffer.getvalue()).decode('utf-8')
-
-            # 发送表格OCR请求
+            # 直接设置请求字段，避免json序列化再反序列化大段base64
             req = models.RecognizeTableAccurateOCRRequest()
-            params = {"ImageBase64": image_base64}
-            req.from_json_string(json.dumps(params))
+            req.ImageBase64 = artifact.image_base64
 
             # 调用表格识别接口
-            resp = self.ocr_client.RecognizeTableAccurateOCR(req)
+            resp = self.ocr_client.call("RecognizeTableAccurateOCR", req)
+            # 每个响应只序列化一次，提取、缓存和原始响应记录共用同一个字典
             result = json.loads(resp.to_json_string())
 
             logger.info("表格OCR识别完成")
-            logger.info(result)
+            self._record_raw_response(
+                "RecognizeTableAccurateOCR", result, artifact.digest)
             return result
 
-        except TencentCloudSDKException as e:
+        except CircuitOpenError as e:
             logger.error(f"OCR识别失败: {e}")
             return None
+        except TencentCloudSDKException as e:
+            logger.error(
+                f"OCR识别失败: {e}，统计: {self.get_resilience_stats()}")
+            return None
         except Exception as e:
             logger.error(f"OCR处理失败: {e}")
             return None
 
-    def extract_title_and_items(self, ocr_result):
-        """从OCR结果中提取标题和物品名"""
+    def _recognize_with_template(self, image):
+        """使用表格模板只识别标题条和物品名列"""
+        composite, title_height = self.table_template.build_composite(image)
+
+        if self.local_engine is not None:
+            lines = self.local_engine.recognize_text_lines(composite)
+        else:
+            lines = self._recognize_general_text(composite)
+
+        if not lines:
+            return None
+
+        result = self.table_template.to_table_detections(lines, title_height)
+        title, items = self.extract_title_and_items(result)
+        if not title or not items:
+            return None
+
+        logger.info("模板快速识别完成")
+        return result
+
+    def _recognize_general_text(self, image):
+        """调用通用文字识别接口，返回[(文本, 置信度, (left, top, right, bottom))]"""
+        if not self.ocr_client:
+            logger.error("OCR客户端未初始化")
+            return None
+
+        try:
+            req = models.GeneralAccurateOCRRequest()
+            req.ImageBase64 = CaptureArtifact(image).image_base64
+            resp = self.ocr_client.call("GeneralAccurateOCR", req)
+            if self._raw_response_wanted():
+                self._record_raw_response(
+                    "GeneralAccurateOCR", json.loads(resp.to_json_string()))
+
+            lines = []
+            for detection in resp.TextDetections or []:
+                polygon = detection.ItemPolygon
+                lines.append((detection.DetectedText, detection.Confidence,
+                              (polygon.X, polygon.Y, polygon.X + polygon.Width, polygon.Y + polygon.Height)))
+            return lines
+
+        except (CircuitOpenError, TencentCloudSDKException) as e:
+            logger.error(f"通用文字识别失败: {e}")
+            return None
+        except Exception as e:
+            logger.error(f"通用文字识别处理失败: {e}")
+            return None
+
+    def _raw_response_wanted(self):
+        """是否需要记录原始响应；text方式在INFO级别被过滤时不记录，省去序列化响应的开销"""
+        if self.response_sink is not None:
+            return True
+        return self.raw_response_log == "text" and logger.is_enabled_for(logging.INFO)
+
+    def _record_raw_response(self, action, response, digest=None):
+        """按配置记录OCR原始响应"""
+        if self.response_sink is not None:
+            self.response_sink.submit(action, response, digest)
+        elif self.raw_response_log == "text":
+            logger.info("%s 原始响应: %s", action, response)
+
+    def learn_table_template(self, ocr_result, title, image_size):
+        """从整表识别结果学习表格模板并保存到配置"""
+        if not config_manager.get("use_table_template", False):
+            return False
+        if not ocr_result or ocr_result.get("Source") == "template":
+            return False
+
+        selection = config_manager.get("selection_coordinates")
+        if self.table_template.is_valid_for(image_size, selection):
+            return False
+
+        template = self.table_template.learn(
+            ocr_result, title, image_size, selection)
+        if not template:
+            return False
+
+        config_manager.set("table_template", template)
+        return True
+
+    def extract_title_and_items(self, ocr_result, return_confidence=False):
+        """从OCR结果中提取标题和物品名
+
+        return_confidence为True时额外返回置信度信息：
+        {'title': 标题置信度, 'items': [与物品名一一对应的置信度], 'corrections': [纠错记录]}，
+        置信度取值0~100。置信度和纠错记录只保存在返回值中，多个线程可以同时提取。
+        """
+        confidence = {'title': None, 'items': [], 'corrections': []}
+
         if not ocr_result or "TableDetections" not in ocr_result:
             logger.warning("OCR结果为空或格式不正确")
+            if return_confidence:
+                return None, [], confidence
             return None, []
 
         extracted_title = None
         extracted_items = []
 
         try:
-            # 查找标题
-            extracted_title = self._extract_title(
-                ocr_result["TableDetections"])
+            with self.filter_lock:
+                # 查找标题
+                extracted_title = self._extract_title(
+                    ocr_result["TableDetections"], confidence)
 
-            # 提取物品名
-            extracted_items = self._extract_items(
-                ocr_result["TableDetections"])
+                # 提取物品名
+                extracted_items = self._extract_items(
+                    ocr_result["TableDetections"], confidence)
 
             logger.info(
                 f"提取完成 - 标题: {extracted_title}, 物品数量: {len(extracted_items)}")
@@ -104,10 +280,12 @@ class OCRProcessor:
         except Exception as e:
             logger.error(f"提取标题和物品失败: {e}")
 
+        if return_confidence:
+            return extracted_title, extracted_items, confidence
         return extracted_title, extracted_items
 
-    def _extract_title(self, table_detections):
-        """提取标题"""
+    def _extract_title(self, table_detections, confidence):
+        """提取标题，标题置信度写入confidence"""
         for table in table_detections:
             # 查找所有位置为-1的单元格
             for cell in table.get("Cells", []):
@@ -125,12 +303,13 @@ class OCRProcessor:
                 year_pattern = r'^\d{4}.*$'
                 if re.match(year_pattern, text):
                     logger.info(f"从年份格式文本中找到标题: {text}")
+                    confidence['title'] = cell.get("Confidence")
                     return self._clean_title(text)
 
         # 如果没有找到标题，尝试从数据表格中查找
-        return self._extract_title_from_data_table(table_detections)
+        return self._extract_title_from_data_table(table_detections, confidence)
 
-    def _extract_title_from_data_table(self, table_detections):
+    def _extract_title_from_data_table(self, table_detections, confidence):
         """从数据表格中提取标题"""
         for table in table_detections:
             # 兼容不同类型的表格：Type 0（标题表格）、Type 1（数据表格）和 Type 2（其他表格类型）
@@ -153,35 +332,33 @@ class OCRProcessor:
 
                         if text and row is not None and row < pic_row:
                             # 过滤黑名单文本
-                            if text not in self.filter_config.get('title_blacklist', []):
-                                distance = pic_row - row
-                                title_candidates.append({
-                                    'text': text,
-                                    'distance': distance
-                                })
+                            if text not in self.title_blacklist:
+                                title_candidates.append(
+                                    TextCandidate(text, row, cell.get("Confidence")))
 
                     if title_candidates:
-                        # 选择距离最近的非空文本作为标题
+                        # 选择距离图片行最近的非空文本作为标题
                         closest_text = min(
-                            title_candidates, key=lambda x: x['distance'])
-                        logger.info(f"从表格中找到标题: {closest_text['text']}")
-                        return self._clean_title(closest_text['text'])
+                            title_candidates, key=lambda x: pic_row - x.row)
+                        logger.info(f"从表格中找到标题: {closest_text.text}")
+                        confidence['title'] = closest_text.confidence
+                        return self._clean_title(closest_text.text)
 
         return None
 
-    def _extract_items(self, table_detections):
-        """提取物品名"""
+    def _extract_items(self, table_detections, confidence):
+        """提取物品名，置信度和纠错记录写入confidence"""
         for table in table_detections:
             # 兼容不同类型的表格：Type 1（数据表格）和 Type 2（其他表格类型）
             if table.get("Type") in [0, 1, 2]:
                 cells = table.get("Cells", [])
-                items = self._extract_items_from_table(cells)
+                items = self._extract_items_from_table(cells, confidence)
                 if items:  # 如果找到物品，直接返回
                     return items
 
         return []
 
-    def _extract_items_from_table(self, cells):
+    def _extract_items_from_table(self, cells, confidence):
         """从表格单元格中提取物品名"""
         # 查找"物品名"列索引
         item_col = None
@@ -205,14 +382,19 @@ class OCRProcessor:
             # 检查是否在物品名列
             if cell.get("ColTl") == item_col and cell.get("RowTl") > 0:  # 排除表头行
                 if self._is_valid_item_name(text):
-                    items.append({
-                        'text': self._clean_text(text),
-                        'row': cell.get("RowTl", 0)
-                    })
+                    corrected_text, correction_confidence = self.item_corrector.correct(
+                        self._clean_text(text), confidence['corrections'])
+                    cell_confidence = cell.get("Confidence")
+                    if corrected_text != self._clean_text(text) and cell_confidence is not None:
+                        # 纠正过的物品名置信度取OCR置信度和纠错置信度中的较低者
+                        cell_confidence = min(cell_confidence, correction_confidence * 100)
+                    items.append(TextCandidate(
+                        corrected_text, cell.get("RowTl", 0), cell_confidence))
 
         # 按行号排序
-        items.sort(key=lambda x: x['row'])
-        item_names = [item['text'] for item in items]
+        items.sort(key=lambda x: x.row)
+        item_names = [item.text for item in items]
+        confidence['items'] = [item.confidence for item in items]
 
         logger.info(f"找到物品名: {item_names}")
         return item_names
@@ -224,13 +406,12 @@ class OCRProcessor:
 
         text = text.strip()
 
-        # 使用配置中的模式过滤
-        for pattern in self.filter_config.get('invalid_item_patterns', []):
-            if re.match(pattern, text):
-                return False
+        # 使用配置中的模式过滤（所有模式合并为一个正则）
+        if self.invalid_item_matcher.match(text):
+            return False
 
         # 使用配置中的黑名单文本过滤
-        if text in self.filter_config.get('invalid_item_texts', []):
+        if text in self.invalid_item_texts:
             return False
 
         # 检查是否包含中文字符
@@ -278,3 +459,15 @@ class OCRProcessor:
             logger.info("标题处理: 去掉'-'及后面的文字")
 
         return cleaned_title.strip()
+
+    def get_resilience_stats(self):
+        """获取每个OCR客户端的在途请求、限流、重试和熔断统计"""
+        return self.ocr_client.get_stats() if self.ocr_client else {}
+
+    def close(self):
+        """释放OCR资源"""
+        logger.info(f"OCR请求统计: {self.get_resilience_stats()}")
+        if self.local_engine is not None:
+            self.local_engine.close()
+        if self.response_sink is not None:
+            self.response_sink.close()
@@ -0,0 +1,246 @@
+# -*- coding: utf-8 -*-
+"""
+OCR请求容错模块
+
+提供所有OCR调用共享的令牌桶限流、带抖动的指数退避重试和熔断器。
+"""
+
+import random
+import threading
+import time
+from tencentcloud.common.exception.tencent_cloud_sdk_exception import TencentCloudSDKException
+from ..utils import logger, config_manager
+
+# 可重试的错误码（限流、服务端内部错误和网络错误）
+RETRIABLE_ERROR_CODES = {
+    "RequestLimitExceeded",
+    "InternalError",
+    "ClientNetworkError",
+    "ServerNetworkError",
+    "RequestTimeout",
+}
+
+
+def error_code(error):
+    """获取SDK异常的错误码"""
+    if isinstance(error, TencentCloudSDKException):
+        return error.get_code() or ""
+    return ""
+
+
+def is_throttle_error(error):
+    """是否为限流错误"""
+    return error_code(error).startswith("RequestLimitExceeded")
+
+
+def is_retriable_error(error):
+    """是否为可重试的错误"""
+    code = error_code(error)
+    return code.split(".")[0] in RETRIABLE_ERROR_CODES
+
+
+class CircuitOpenError(Exception):
+    """熔断器打开时拒绝请求"""
+
+
+class TokenBucket:
+    """线程安全的令牌桶限流器"""
+
+    def __init__(self, rate, capacity):
+        self.rate = float(rate)
+        self.capacity = float(capacity)
+        self.tokens = float(capacity)
+        self.updated_at = time.monotonic()
+        self.lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens +
+                          (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    def acquire(self, timeout=None):
+        """获取一个令牌，令牌不足时等待；超时返回False，返回值为是否获取成功"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            with self.lock:
+                self._refill()
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return True
+                wait = (1 - self.tokens) / self.rate
+
+            if deadline is not None and time.monotonic() + wait > deadline:
+                return False
+            time.sleep(wait)
+
+    def drain(self):
+        """清空令牌（服务端返回限流时调用），之后的请求按速率重新积攒令牌后再发出"""
+        with self.lock:
+            self._refill()
+            self.tokens = min(self.tokens, 0.0)
+
+
+class CircuitBreaker:
+    """熔断器：连续失败达到阈值后打开，冷却后放行一次试探请求"""
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold=5, reset_timeout=30):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = None  # 最近一次打开的时间，用于计算冷却
+        self.degraded_since = None  # 首次打开的时间，用于统计打开时长
+        self.open_seconds = 0.0
+        self.probe_in_flight = False  # 半开状态下是否已有试探请求在进行
+        self.lock = threading.Lock()
+
+    def allow_request(self):
+        """是否允许发出请求，半开状态下只放行一个试探请求，其他调用在试探结束前被拒绝"""
+        with self.lock:
+            if self.state == self.OPEN:
+                if time.monotonic() - self.opened_at < self.reset_timeout:
+                    return False
+                self.state = self.HALF_OPEN
+            if self.state == self.HALF_OPEN:
+                if self.probe_in_flight:
+                    return False
+                self.probe_in_flight = True
+            return True
+
+    def release_probe(self):
+        """试探请求没有得出成功或失败的结论（如参数错误）时释放，允许下一个调用试探"""
+        with self.lock:
+            self.probe_in_flight = False
+
+    def is_available(self):
+        """是否可以接收请求（只查询状态，不触发半开）"""
+        with self.lock:
+            if self.state == self.HALF_OPEN:
+                return not self.probe_in_flight
+            return (self.state != self.OPEN or
+                    time.monotonic() - self.opened_at >= self.reset_timeout)
+
+    def record_success(self):
+        """记录成功，关闭熔断器"""
+        with self.lock:
+            if self.degraded_since is not None:
+                self.open_seconds += time.monotonic() - self.degraded_since
+                self.degraded_since = None
+                logger.info("OCR熔断器已恢复")
+            self.state = self.CLOSED
+            self.failures = 0
+            self.probe_in_flight = False
+
+    def record_failure(self):
+        """记录失败，达到阈值或试探失败时打开熔断器"""
+        with self.lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                if self.state != self.OPEN:
+                    logger.warning(f"OCR熔断器打开，{self.reset_timeout}秒内快速失败")
+                now = time.monotonic()
+                self.opened_at = now
+                if self.degraded_since is None:
+                    self.degraded_since = now
+                self.state = self.OPEN
+                self.probe_in_flight = False
+
+    def total_open_seconds(self):
+        """累计熔断时长（秒）"""
+        with self.lock:
+            current = (time.monotonic() - self.degraded_since
+                       if self.degraded_since is not None else 0.0)
+            return self.open_seconds + current
+
+
+class ResilientCaller:
+    """带限流、重试和熔断的调用器"""
+
+    def __init__(self, rate_limiter, circuit_breaker, retry_config=None):
+        retry_config = retry_config or {}
+        self.rate_limiter = rate_limiter
+        self.circuit_breaker = circuit_breaker
+        self.max_attempts = retry_config.get("max_attempts", 3)
+        self.base_delay = retry_config.get("base_delay", 0.5)
+        self.max_delay = retry_config.get("max_delay", 5.0)
+        self.stats = {"calls": 0, "throttled": 0,
+                      "retries": 0, "circuit_rejections": 0}
+        self.stats_lock = threading.Lock()
+
+    def _count(self, key):
+        with self.stats_lock:
+            self.stats[key] += 1
+
+    def call(self, func, *args, **kwargs):
+        """执行调用，可重试的错误按带抖动的指数退避重试
+
+        限流错误只清空令牌桶并退避重试，不计入熔断器的失败次数；其他可重试错误才计入。
+        """
+        if not self.circuit_breaker.allow_request():
+            self._count("circuit_rejections")
+            raise CircuitOpenError("OCR服务熔断中，请稍后重试")
+
+        self._count("calls")
+        attempt = 0
+        while True:
+            self.rate_limiter.acquire()
+            try:
+                result = func(*args, **kwargs)
+                self.circuit_breaker.record_success()
+                return result
+            except Exception as e:
+                throttled = is_throttle_error(e)
+                if not throttled and not is_retriable_error(e):
+                    self.circuit_breaker.release_probe()
+                    raise
+
+                attempt += 1
+                if throttled:
+                    # 服务端限流说明服务可用，只是请求过快：由令牌桶减速，不打开熔断器
+                    self._count("throttled")
+                    self.rate_limiter.drain()
+                    if attempt >= self.max_attempts:
+                        self.circuit_breaker.release_probe()
+                        raise
+                else:
+                    self.circuit_breaker.record_failure()
+                    if attempt >= self.max_attempts or not self.circuit_breaker.allow_request():
+                        raise
+
+                # 全抖动指数退避
+                delay = random.uniform(
+                    0, min(self.max_delay, self.base_delay * (2 ** (attempt - 1))))
+                self._count("retries")
+                logger.warning(
+                    f"OCR请求失败({error_code(e)})，{delay:.2f}秒后第{attempt}次重试")
+                time.sleep(delay)
+
+    def get_stats(self):
+        """获取限流、重试和熔断统计"""
+        with self.stats_lock:
+            stats = dict(self.stats)
+        stats["circuit_state"] = self.circuit_breaker.state
+        stats["circuit_open_seconds"] = round(
+            self.circuit_breaker.total_open_seconds(), 2)
+        return stats
+
+
+_shared_rate_limiter = None
+_shared_lock = threading.Lock()
+
+
+def get_shared_rate_limiter():
+    """获取所有OCR调用共享的令牌桶"""
+    global _shared_rate_limiter
+    with _shared_lock:
+        if _shared_rate_limiter is None:
+            rate_config = config_manager.get("ocr_rate_limit", {})
+            _shared_rate_limiter = TokenBucket(
+                rate_config.get("qps", 10), rate_config.get("burst", 10))
+        return _shared_rate_limiter
+
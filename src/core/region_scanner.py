@@ -0,0 +1,100 @@
+# -*- coding: utf-8 -*-
+"""
+多区域并行识别模块
+
+一次截图裁剪出的多个命名区域同时发送OCR请求，识别耗时取决于最慢的区域而不是各区域之和。
+各区域按提取方式（full / title / items）取标题和物品名，合并成一条结果写入。
+"""
+
+import time
+from concurrent.futures import ThreadPoolExecutor
+from ..utils import logger, config_manager
+
+PROFILES = ("full", "title", "items")
+
+
+class RegionScanner:
+    """多区域并行识别器"""
+
+    def __init__(self, ocr_processor, max_workers=None):
+        self.ocr_processor = ocr_processor
+        self.max_workers = max_workers or config_manager.get("region_ocr_max_workers", 4)
+        self.executor = None
+
+    def _get_executor(self):
+        """获取线程池（首次使用时创建，之后复用）"""
+        if self.executor is None:
+            self.executor = ThreadPoolExecutor(max_workers=max(1, self.max_workers),
+                                               thread_name_prefix="region-ocr")
+        return self.executor
+
+    def recognize(self, captured):
+        """并行识别[(区域, CaptureArtifact)]，返回与之一一对应的OCR结果列表"""
+        start = time.perf_counter()
+        # 表格模板针对主选框学习，裁剪出的区域不使用模板
+        futures = [self._get_executor().submit(self.ocr_processor.recognize_table, artifact, False)
+                   for _, artifact in captured]
+        results = [future.result() for future in futures]
+        logger.info(f"{len(captured)} 个区域识别完成，耗时 {time.perf_counter() - start:.2f}s")
+        return results
+
+    def scan(self, captured):
+        """识别并合并所有区域，返回(标题, 物品名列表, 置信度)，所有区域都识别失败时返回None
+
+        置信度与OCRProcessor.extract_title_and_items返回的格式相同，包含所有区域的纠错记录
+        """
+        results = self.recognize(captured)
+        if not any(results):
+            return None
+        return self.merge(captured, results)
+
+    def merge(self, captured, results):
+        """按区域顺序合并提取结果
+
+        标题取第一个能提取到标题的full/title区域；物品名按区域顺序拼接，
+        跨区域重复的物品名（区域重叠时）只保留第一次出现的。
+        """
+        ocr_processor = self.ocr_processor
+        title = None
+        confidence = {'title': None, 'items': [], 'corrections': []}
+        items = []
+        seen = set()
+
+        # 每个区域的置信度和纠错记录由提取结果返回，逐个合并，不读写OCRProcessor上的状态
+        for (region, _), result in zip(captured, results):
+            if not result:
+                logger.warning(f"区域 {region['name']} 识别失败，已跳过")
+                continue
+
+            profile = region.get("profile", "full")
+            if profile not in PROFILES:
+                logger.warning(f"区域 {region['name']} 的提取方式 {profile} 无效，按full处理")
+                profile = "full"
+
+            region_title, region_items, region_confidence = \
+                ocr_processor.extract_title_and_items(result, return_confidence=True)
+
+            if profile != "items" and title is None and region_title:
+                title = region_title
+                confidence['title'] = region_confidence.get('title')
+
+            if profile != "title":
+                confidence['corrections'].extend(region_confidence.get('corrections', []))
+                item_confidences = region_confidence.get('items', [])
+                if len(item_confidences) != len(region_items):
+                    item_confidences = [None] * len(region_items)
+                for item_name, item_confidence in zip(region_items, item_confidences):
+                    if item_name in seen:
+                        continue
+                    seen.add(item_name)
+                    items.append(item_name)
+                    confidence['items'].append(item_confidence)
+
+        logger.info(f"多区域合并完成 - 标题: {title}, 物品数量: {len(items)}")
+        return title, items, confidence
+
+    def close(self):
+        """关闭线程池"""
+        if self.executor is not None:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+            self.executor = None
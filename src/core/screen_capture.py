@@ -4,10 +4,11 @@
 """
 
 import tkinter as tk
-from PIL import Image, ImageGrab
-from datetime import datetime
-from pathlib import Path
+from PIL import Image
 from ..utils import logger, config_manager, dpi_helper
+from .capture_backend import create_capture_backend
+from .debug_archiver import DebugImageArchiver
+from .capture_artifact import CaptureArtifact
 
 
 class ScreenCapture:
@@ -22,12 +23,19 @@ class ScreenCapture:
         self.end_x = None
         self.end_y = None
         self.captured_image = None
+        self.captured_artifact = None
+        # 框选截图完成后的回调，参数为CaptureArtifact（用于预识别）
+        self.on_capture = None
         self.selection_coords = self._load_selection_coordinates()
+        self.regions = self._load_regions()
 
-        # 创建调试图片目录
-        self.debug_dir = Path(config_manager.get(
-            'debug_image_dir', 'debug_images'))
-        self.debug_dir.mkdir(exist_ok=True)
+        # 截图后端（持久复用，避免每次截图重新创建设备上下文）
+        self.capture_backend = create_capture_backend()
+        logger.info(f"截图后端: {self.capture_backend.name}")
+
+        # 调试图片归档器（后台线程异步写入）
+        self.debug_archiver = DebugImageArchiver(
+            config_manager.get('debug_image_dir', 'debug_images'))
 
         # 获取DPI缩放信息
         self.dpi_scale = dpi_helper.get_dpi_scale()
@@ -44,6 +52,59 @@ class ScreenCapture:
         self.selection_coords = coords
         logger.info(f"保存选框坐标: {coords}")
 
+    def _load_regions(self):
+        """加载多区域识别的命名区域，忽略格式不正确的项"""
+        regions = []
+        for region in config_manager.get("capture_regions") or []:
+            try:
+                if region["x2"] > region["x1"] and region["y2"] > region["y1"] and region.get("name"):
+                    regions.append({**region, "profile": region.get("profile", "full")})
+            except (KeyError, TypeError):
+                pass
+        if regions:
+            logger.info(f"加载 {len(regions)} 个识别区域: {[region['name'] for region in regions]}")
+        return regions
+
+    def _save_regions(self):
+        """保存命名区域"""
+        config_manager.set("capture_regions", self.regions)
+
+    def has_regions(self):
+        """是否配置了多区域识别"""
+        return bool(self.regions)
+
+    def add_region(self, name, profile="full"):
+        """把当前选框保存为命名区域，同名区域会被替换"""
+        if not self.has_valid_selection():
+            logger.error("没有有效的选框区域")
+            return False
+
+        coords = self.selection_coords
+        region = {"name": name,
+                  "x1": min(coords["x1"], coords["x2"]), "y1": min(coords["y1"], coords["y2"]),
+                  "x2": max(coords["x1"], coords["x2"]), "y2": max(coords["y1"], coords["y2"]),
+                  "profile": profile}
+        self.regions = [item for item in self.regions if item["name"] != name] + [region]
+        self._save_regions()
+        logger.info(f"添加识别区域: {region}")
+        return True
+
+    def remove_region(self, name):
+        """删除命名区域"""
+        regions = [region for region in self.regions if region["name"] != name]
+        if len(regions) == len(self.regions):
+            return False
+        self.regions = regions
+        self._save_regions()
+        logger.info(f"删除识别区域: {name}")
+        return True
+
+    def clear_regions(self):
+        """清除所有命名区域"""
+        self.regions = []
+        self._save_regions()
+        logger.info("已清除所有识别区域")
+
     def has_valid_selection(self):
         """检查是否有有效的选框坐标"""
         coords = self.selection_coords
@@ -86,7 +147,7 @@ class ScreenCapture:
         """鼠标点击事件"""
         self.start_x = event.x
         self.start_y = event.y
-        logger.debug(f"鼠标点击: ({self.start_x}, {self.start_y})")
+        logger.debug("鼠标点击: (%s, %s)", self.start_x, self.start_y)
 
     def _on_drag(self, event):
         """鼠标拖拽事件"""
@@ -136,23 +197,27 @@ class ScreenCapture:
     def _capture_selected_area(self, x1, y1, x2, y2):
         """截图选中区域"""
         try:
-            # 关闭选择窗口
+            # 关闭选择窗口，处理完窗口销毁后再截图，避免截到半透明遮罩
             if self.selection_window:
                 self.selection_window.destroy()
                 self.selection_window = None
+                self.parent_window.update_idletasks()
 
             # 截图
-            screenshot = ImageGrab.grab(bbox=(x1, y1, x2, y2))
+            screenshot = self.capture_backend.grab((x1, y1, x2, y2))
             self.captured_image = screenshot
+            self.captured_artifact = CaptureArtifact(screenshot)
 
             # 保存调试图片
             if config_manager.get('save_debug_images', True):
-                self._save_debug_image(screenshot)
+                self._save_debug_image(self.captured_artifact)
 
             # 显示主窗口
             self.parent_window.deiconify()
 
             logger.info(f"截图完成，区域大小: {x2-x1}x{y2-y1} 像素")
+            if self.on_capture is not None:
+                self.on_capture(self.captured_artifact)
             return True
 
         except Exception as e:
@@ -160,16 +225,9 @@ class ScreenCapture:
             self._cancel_selection()
             return False
 
-    def _save_debug_image(self, image):
-        """保存调试图片"""
-        try:
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            filename = f"capture_{timestamp}.png"
-            filepath = self.debug_dir / filename
-            image.save(filepath)
-            logger.info(f"调试图片已保存: {filepath}")
-        except Exception as e:
-            logger.error(f"保存调试图片失败: {e}")
+    def _save_debug_image(self, artifact):
+        """提交调试图片到后台归档线程"""
+        self.debug_archiver.submit(artifact)
 
     def _cancel_selection(self, event=None):
         """取消选择"""
@@ -180,7 +238,7 @@ class ScreenCapture:
         logger.info("取消屏幕选择")
 
     def capture_current_selection(self):
-        """根据当前选框坐标重新截图"""
+        """根据当前选框坐标重新截图，返回CaptureArtifact"""
         if not self.has_valid_selection():
             logger.error("没有有效的选框区域")
             return None
@@ -196,20 +254,59 @@ class ScreenCapture:
 
         try:
             # 截图选中区域
-            screenshot = ImageGrab.grab(bbox=(left, top, right, bottom))
+            screenshot = self.capture_backend.grab((left, top, right, bottom))
             self.captured_image = screenshot
+            self.captured_artifact = CaptureArtifact(screenshot)
 
             # 保存调试图片
             if config_manager.get('save_debug_images', True):
-                self._save_debug_image(screenshot)
+                self._save_debug_image(self.captured_artifact)
 
             logger.info(f"重新截图完成: ({left}, {top}) - ({right}, {bottom})")
-            return screenshot
+            return self.captured_artifact
 
         except Exception as e:
             logger.error(f"重新截图失败: {e}")
             return None
 
+    def capture_regions(self):
+        """一次截取所有命名区域的外接矩形，再裁剪出各个区域，返回[(区域, CaptureArtifact)]"""
+        if not self.regions:
+            logger.error("没有配置识别区域")
+            return None
+
+        left = min(region["x1"] for region in self.regions)
+        top = min(region["y1"] for region in self.regions)
+        right = max(region["x2"] for region in self.regions)
+        bottom = max(region["y2"] for region in self.regions)
+
+        try:
+            screenshot = self.capture_backend.grab((left, top, right, bottom))
+            self.captured_image = screenshot
+            self.captured_artifact = CaptureArtifact(screenshot)
+
+            # 保存调试图片（整张外接矩形截图）
+            if config_manager.get('save_debug_images', True):
+                self._save_debug_image(self.captured_artifact)
+
+            # 截图后端返回的图像可能与逻辑坐标存在缩放
+            scale_x = screenshot.width / (right - left)
+            scale_y = screenshot.height / (bottom - top)
+            captured = []
+            for region in self.regions:
+                box = (round((region["x1"] - left) * scale_x), round((region["y1"] - top) * scale_y),
+                       round((region["x2"] - left) * scale_x), round((region["y2"] - top) * scale_y))
+                captured.append((region, CaptureArtifact(
+                    screenshot.crop(box), self.captured_artifact.captured_at)))
+
+            logger.info(f"多区域截图完成: {len(captured)} 个区域, "
+                        f"外接矩形 ({left}, {top}) - ({right}, {bottom})")
+            return captured
+
+        except Exception as e:
+            logger.error(f"多区域截图失败: {e}")
+            return None
+
     def get_captured_image(self):
         """获取截图图像"""
         return self.captured_image
@@ -229,3 +326,8 @@ class ScreenCapture:
             'size': (width, height),
             'area': width * height
         }
+
+    def close(self):
+        """释放截图后端和调试图片归档资源"""
+        self.capture_backend.close()
+        self.debug_archiver.close()
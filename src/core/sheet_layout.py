@@ -0,0 +1,250 @@
+# -*- coding: utf-8 -*-
+"""
+排序结果表布局模块
+
+每个类别占一个固定宽度的列块（标题、物品名、若干数量列和1列红色空隙），
+类别块从左到右排列，超过最大宽度时换到下一排。写入前先算好所有单元格坐标，
+再按行批量追加，写入耗时只与单元格数量有关。
+"""
+
+from copy import copy
+from ..utils import logger, config_manager
+
+try:
+    from openpyxl.cell.cell import Cell
+    from openpyxl.styles import PatternFill, Font, Alignment
+    from openpyxl.utils import get_column_letter
+    OPENPYXL_AVAILABLE = True
+except ImportError:
+    OPENPYXL_AVAILABLE = False
+
+TITLE_WIDTH = 20.13
+ITEM_WIDTH = 20.13
+QUANTITY_WIDTH = 5.13
+GAP_WIDTH = 1.13
+ROW_HEIGHT = 20
+XL_CENTER = -4108  # Excel常量xlCenter
+
+
+class SheetLayout:
+    """排序结果表布局"""
+
+    def __init__(self, block_width=5, max_width=0, band_gap_rows=2):
+        # 至少包含标题、物品名和空隙三列
+        self.block_width = max(3, int(block_width))
+        self.quantity_count = self.block_width - 3
+        self.max_width = max(0, int(max_width or 0))
+        self.band_gap_rows = max(0, int(band_gap_rows))
+
+    @classmethod
+    def from_config(cls):
+        """根据配置创建布局"""
+        layout_config = config_manager.get_layout_config()
+        return cls(layout_config.get('block_width', 5),
+                   layout_config.get('max_width', 0),
+                   layout_config.get('band_gap_rows', 2))
+
+    @staticmethod
+    def block_height(entries):
+        """类别块占用的行数：套装之间空一行，最后一个套装后不留空行"""
+        if not entries:
+            return 0
+        return (sum(len(entry.items) + 1 for entry in entries[:-1]) +
+                max(1, len(entries[-1].items)))
+
+    def plan(self, ordered_blocks):
+        """把[(类别, 套装列表)]分排，返回[(本排类别块, 本排行数)]"""
+        if self.max_width:
+            per_band = max(1, self.max_width // self.block_width)
+        else:
+            per_band = max(1, len(ordered_blocks))
+
+        bands = []
+        for start in range(0, len(ordered_blocks), per_band):
+            band = ordered_blocks[start:start + per_band]
+            height = max(self.block_height(entries) for _, entries in band)
+            bands.append((band, height))
+        return bands
+
+    def block_values(self, entries, historical_quantities, height=None):
+        """类别块的二维值数组（不含空隙列），未填写的位置为None"""
+        height = height or self.block_height(entries)
+        values = [[None] * (self.block_width - 1) for _ in range(height)]
+
+        row = 0
+        for entry in entries:
+            values[row][0] = entry.original_title
+            for offset, item_name in enumerate(entry.items):
+                target = values[row + offset]
+                target[1] = item_name
+                quantities = historical_quantities.get(item_name)
+                if quantities:
+                    # 数量元组按列顺序保存，超出当前布局的列忽略
+                    quantities = quantities[:self.quantity_count]
+                    target[2:2 + len(quantities)] = quantities
+            row += len(entry.items) + 1
+        return values
+
+    def placements(self, ordered_blocks):
+        """预先计算每个类别块的位置，返回[(类别, 套装列表, 起始行, 起始列, 所在排行数)]，行列从1开始"""
+        result = []
+        top_row = 1
+        for band, height in self.plan(ordered_blocks):
+            for block_index, (category, entries) in enumerate(band):
+                result.append((category, entries, top_row,
+                               block_index * self.block_width + 1, height))
+            top_row += height + self.band_gap_rows
+        return result
+
+    def write(self, sheet, ordered_blocks, historical_quantities=None):
+        """按布局写入空工作表（openpyxl），返回写入的类别块数"""
+        historical_quantities = historical_quantities or {}
+        make_cell = _StyledCellFactory(sheet)
+        gap_offset = self.block_width - 1
+
+        bands = self.plan(ordered_blocks)
+        max_columns = 0
+        for band_index, (band, height) in enumerate(bands):
+            if band_index:
+                for _ in range(self.band_gap_rows):
+                    sheet.append([])
+
+            # 预先分配本排的行缓冲区，按坐标填入单元格后整行追加
+            width = len(band) * self.block_width
+            max_columns = max(max_columns, width)
+            rows = [[None] * width for _ in range(height)]
+
+            for block_index, (category, entries) in enumerate(band):
+                col = block_index * self.block_width
+                values = self.block_values(entries, historical_quantities)
+                for target, row_values in zip(rows, values):
+                    for offset, value in enumerate(row_values):
+                        if value is not None:
+                            target[col + offset] = make_cell.data(value)
+
+                for target in rows:
+                    target[col + gap_offset] = make_cell.gap()
+
+                logger.debug("类别 '%s' (共%d项) 写入第%d排 %s-%s", category, len(entries),
+                             band_index + 1, get_column_letter(col + 1),
+                             get_column_letter(col + self.block_width))
+
+            for target in rows:
+                sheet.append(target)
+
+        self._apply_dimensions(sheet, max_columns)
+        logger.info(f"排序结果布局: {len(ordered_blocks)} 个类别, {len(bands)} 排, "
+                    f"{sheet.max_row} 行 x {max_columns} 列")
+        return len(ordered_blocks)
+
+    def write_live(self, sheet, ordered_blocks, historical_quantities=None):
+        """按布局写入正在运行的Excel中的空工作表（xlwings）
+
+        每个类别块用一次range.value赋值写入二维数组。加粗居中与openpyxl写入一致，只设置有值的单元格：
+        有值的单元格按列合并成连续区域，多个区域拼成一个地址批量设置，COM调用次数与单元格数量无关。
+        """
+        historical_quantities = historical_quantities or {}
+        placements = self.placements(ordered_blocks)
+        if not placements:
+            return 0
+
+        max_row = 0
+        max_columns = 0
+        data_areas = []
+        for category, entries, top_row, start_col, height in placements:
+            values = self.block_values(entries, historical_quantities, height)
+            sheet.range((top_row, start_col)).value = values
+            data_areas.extend(self._populated_areas(values, top_row, start_col))
+
+            # 空隙列整段标红
+            gap_col = start_col + self.block_width - 1
+            sheet.range((top_row, gap_col), (top_row + height - 1, gap_col)).color = (255, 0, 0)
+
+            max_row = max(max_row, top_row + height - 1)
+            max_columns = max(max_columns, gap_col)
+
+        for address in self._join_addresses(data_areas):
+            data_range = sheet.range(address)
+            data_range.font.bold = True
+            data_range.api.HorizontalAlignment = XL_CENTER
+            data_range.api.VerticalAlignment = XL_CENTER
+
+        # 行高按整行设置，与openpyxl写入时相同
+        sheet.range((1, 1), (max_row, 1)).row_height = ROW_HEIGHT
+
+        # 各排列位置相同，只需按第一排设置列宽
+        quantity_end = 2 + self.quantity_count
+        for start_col in range(1, max_columns + 1, self.block_width):
+            sheet.range((1, start_col), (1, start_col + 1)).column_width = TITLE_WIDTH
+            if self.quantity_count:
+                sheet.range((1, start_col + 2), (1, start_col + quantity_end - 1)).column_width = QUANTITY_WIDTH
+            sheet.range((1, start_col + self.block_width - 1)).column_width = GAP_WIDTH
+
+        logger.info(f"排序结果布局(实时写入): {len(placements)} 个类别, {max_row} 行 x {max_columns} 列")
+        return len(placements)
+
+    @staticmethod
+    def _populated_areas(values, top_row, start_col):
+        """类别块中有值的单元格按列合并成连续区域，返回区域地址列表（如"B3:B7"）"""
+        areas = []
+        for offset in range(len(values[0]) if values else 0):
+            column = get_column_letter(start_col + offset)
+            run_start = None
+            for row_index, row_values in enumerate(values + [[None] * len(values[0])]):
+                if row_values[offset] is not None:
+                    if run_start is None:
+                        run_start = row_index
+                    continue
+                if run_start is not None:
+                    first, last = top_row + run_start, top_row + row_index - 1
+                    areas.append(f"{column}{first}" if first == last else f"{column}{first}:{column}{last}")
+                    run_start = None
+        return areas
+
+    @staticmethod
+    def _join_addresses(areas, limit=255):
+        """把区域地址用逗号拼接成多区域地址，每个地址不超过Excel允许的长度"""
+        joined = []
+        current = ""
+        for area in areas:
+            if current and len(current) + 1 + len(area) > limit:
+                joined.append(current)
+                current = ""
+            current = f"{current},{area}" if current else area
+        if current:
+            joined.append(current)
+        return joined
+
+    def _apply_dimensions(self, sheet, max_columns):
+        """设置行高和列宽"""
+        for row in range(1, sheet.max_row + 1):
+            sheet.row_dimensions[row].height = ROW_HEIGHT
+
+        widths = [TITLE_WIDTH, ITEM_WIDTH] + [QUANTITY_WIDTH] * self.quantity_count + [GAP_WIDTH]
+        for col in range(max_columns):
+            sheet.column_dimensions[get_column_letter(col + 1)].width = widths[col % self.block_width]
+
+
+class _StyledCellFactory:
+    """按预先注册的样式批量创建单元格，避免逐个单元格查找和注册样式"""
+
+    def __init__(self, sheet):
+        self.sheet = sheet
+
+        data_prototype = Cell(sheet)
+        data_prototype.font = Font(bold=True)
+        data_prototype.alignment = Alignment(horizontal='center', vertical='center')
+        self.data_style = data_prototype._style
+
+        gap_prototype = Cell(sheet)
+        gap_prototype.fill = PatternFill(
+            start_color="FF0000", end_color="FF0000", fill_type="solid")
+        self.gap_style = gap_prototype._style
+
+    def data(self, value):
+        """加粗居中的数据单元格"""
+        return Cell(self.sheet, value=value, style_array=copy(self.data_style))
+
+    def gap(self):
+        """红色空隙单元格"""
+        return Cell(self.sheet, style_array=copy(self.gap_style))
@@ -0,0 +1,383 @@
+# -*- coding: utf-8 -*-
+"""
+排序结果表XML导出模块
+
+不经过openpyxl的对象模型和序列化，直接生成排序结果表的工作表XML：
+各类别块的单元格XML在多个工作进程中并行生成，主进程按行合并后流式写入新的压缩包；
+workbook.xml、工作簿关系、内容类型和styles.xml用字符串方式修改，其他成员直接复制压缩后的字节。
+布局、行高列宽和样式与SheetLayout.write（openpyxl）写出的结果一致。
+"""
+
+import math
+import os
+import posixpath
+import re
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from xml.sax.saxutils import escape, quoteattr, unescape
+
+from ..utils import logger, config_manager
+from .sheet_layout import (SheetLayout, TITLE_WIDTH, ITEM_WIDTH, QUANTITY_WIDTH,
+                           GAP_WIDTH, ROW_HEIGHT)
+from .xlsx_appender import (UnsupportedWorkbookError, ILLEGAL_XML_CHARS, MAIN_NS, REL_NS,
+                            PackageWriter, column_letter, fresh_info)
+from ..utils.atomic_file import atomic_write_path
+
+WORKSHEET_REL_TYPE = "http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet"
+WORKSHEET_CONTENT_TYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"
+CALC_CHAIN_REL_TYPE = "http://schemas.openxmlformats.org/officeDocument/2006/relationships/calcChain"
+APP_PROPERTIES_MEMBER = "docProps/app.xml"
+
+# 与openpyxl写出的样式相同：加粗居中的数据单元格、红色实心填充的空隙单元格
+_DATA_FONT = '<font><b val="1"/></font>'
+_GAP_FILL = ('<fill><patternFill patternType="solid"><fgColor rgb="00FF0000"/>'
+             '<bgColor rgb="00FF0000"/></patternFill></fill>')
+_DATA_XF = ('<xf numFmtId="0" fontId="{font}" fillId="0" borderId="0" applyFont="1" '
+            'applyAlignment="1" xfId="0"><alignment horizontal="center" vertical="center"/></xf>')
+_GAP_XF = '<xf numFmtId="0" fontId="0" fillId="{fill}" borderId="0" applyFill="1" xfId="0"/>'
+
+_XML_ATTR_ENTITIES = {"&quot;": '"', "&apos;": "'"}
+_ROW_FLUSH_COUNT = 2000
+
+
+def _attr(tag, name):
+    """读取标签字符串中的属性值"""
+    match = re.search(rf'(?:^|\s){re.escape(name)}="([^"]*)"', tag)
+    return unescape(match.group(1), _XML_ATTR_ENTITIES) if match else None
+
+
+def _normalize(fragment):
+    """去掉标签间空白和自闭合标签前的空格，便于比较样式条目"""
+    return re.sub(r'\s+/>', '/>', re.sub(r'>\s+<', '><', fragment.strip()))
+
+
+def _cell_xml(ref, value, style):
+    """单个单元格的XML，字符串使用内联字符串"""
+    if isinstance(value, bool):
+        return f'<c r="{ref}" s="{style}" t="b"><v>{int(value)}</v></c>'
+    if isinstance(value, (int, float)):
+        if isinstance(value, float) and not math.isfinite(value):
+            raise UnsupportedWorkbookError(f"无法写入的数值: {value}")
+        return f'<c r="{ref}" s="{style}" t="n"><v>{value}</v></c>'
+    if isinstance(value, str):
+        return (f'<c r="{ref}" s="{style}" t="inlineStr"><is><t xml:space="preserve">'
+                f'{escape(ILLEGAL_XML_CHARS.sub("", value))}</t></is></c>')
+    # 日期等类型在openpyxl中会带数字格式，这里不处理，交给openpyxl
+    raise UnsupportedWorkbookError(f"不支持的单元格类型: {type(value).__name__}")
+
+
+def _render_block(task):
+    """生成一个类别块每一行的单元格XML片段（在工作进程中执行），返回(起始行, 片段列表)"""
+    top_row, start_col, values, data_style, gap_style = task
+    width = len(values[0]) if values else 0
+    letters = [column_letter(start_col + offset) for offset in range(width)]
+    gap_letter = column_letter(start_col + width)
+
+    fragments = []
+    for offset, row_values in enumerate(values):
+        row = top_row + offset
+        parts = [_cell_xml(f"{letter}{row}", value, data_style)
+                 for letter, value in zip(letters, row_values) if value is not None]
+        parts.append(f'<c r="{gap_letter}{row}" s="{gap_style}"/>')
+        fragments.append("".join(parts))
+    return top_row, fragments
+
+
+class SortedSheetExporter:
+    """排序结果表XML导出器"""
+
+    def __init__(self, layout, max_workers=0, parallel_min_cells=200000):
+        self.layout = layout
+        self.max_workers = max(0, int(max_workers or 0))
+        self.parallel_min_cells = max(0, int(parallel_min_cells))
+
+    @classmethod
+    def from_config(cls, layout=None):
+        """根据配置创建导出器"""
+        export_config = config_manager.get("sorted_export", {})
+        return cls(layout or SheetLayout.from_config(),
+                   export_config.get("max_workers", 0),
+                   export_config.get("parallel_min_cells", 200000))
+
+    def count_cells(self, sheets):
+        """估算写入的单元格数量（含空白位置），用于选择导出方式"""
+        return sum(self.layout.block_height(entries) * self.layout.block_width
+                   for _, ordered_blocks in sheets for _, entries in ordered_blocks)
+
+    def _worker_count(self, cell_count):
+        """并行进程数，单元格较少时在当前进程中生成，避免启动进程的开销"""
+        workers = self.max_workers or os.cpu_count() or 1
+        if cell_count < self.parallel_min_cells:
+            return 1
+        return workers
+
+    def _render(self, tasks, cell_count):
+        """生成所有类别块的XML片段，结果顺序与tasks一致"""
+        workers = min(self._worker_count(cell_count), len(tasks))
+        if workers > 1:
+            chunksize = max(1, math.ceil(len(tasks) / (workers * 4)))
+            try:
+                with ProcessPoolExecutor(max_workers=workers) as executor:
+                    return list(executor.map(_render_block, tasks, chunksize=chunksize))
+            except (BrokenProcessPool, OSError) as e:
+                logger.warning(f"并行生成排序结果XML失败，改为单进程生成: {e}")
+        return [_render_block(task) for task in tasks]
+
+    # ---------- 工作簿各部件的字符串修改 ----------
+
+    @staticmethod
+    def _ensure_style_entry(styles_xml, section, tag, entry):
+        """在styles.xml的section中查找与entry相同的条目，不存在时追加，返回(新XML, 条目序号)"""
+        match = re.search(rf'<{section}\b([^>]*?)(?:/>|>(.*?)</{section}>)', styles_xml, re.S)
+        if not match:
+            raise UnsupportedWorkbookError(f"styles.xml中没有{section}")
+
+        body = match.group(2) or ""
+        entries = [_normalize(item) for item in
+                   re.findall(rf'<{tag}\b[^>]*?(?:/>|>.*?</{tag}>)', body, re.S)]
+        if entry in entries:
+            return styles_xml, entries.index(entry)
+
+        attributes = re.sub(r'\s*\bcount="\d+"', '', match.group(1))
+        section_xml = f'<{section} count="{len(entries) + 1}"{attributes}>{body}{entry}</{section}>'
+        return styles_xml[:match.start()] + section_xml + styles_xml[match.end():], len(entries)
+
+    def _patch_styles(self, styles_xml):
+        """注册数据和空隙单元格样式，返回(新XML, 数据样式序号, 空隙样式序号)"""
+        styles_xml, font_id = self._ensure_style_entry(styles_xml, "fonts", "font", _DATA_FONT)
+        styles_xml, fill_id = self._ensure_style_entry(styles_xml, "fills", "fill", _GAP_FILL)
+        styles_xml, data_style = self._ensure_style_entry(
+            styles_xml, "cellXfs", "xf", _DATA_XF.format(font=font_id))
+        styles_xml, gap_style = self._ensure_style_entry(
+            styles_xml, "cellXfs", "xf", _GAP_XF.format(fill=fill_id))
+        return styles_xml, data_style, gap_style
+
+    @staticmethod
+    def _resolve_target(target):
+        """工作簿关系中的Target转为压缩包内路径"""
+        if target.startswith("/"):
+            return target.lstrip("/")
+        return posixpath.normpath(posixpath.join("xl", target))
+
+    def _patch_package(self, archive, select_replaced, new_names):
+        """修改workbook.xml、工作簿关系和内容类型
+
+        删除select_replaced(工作表名列表)选出的工作表并在末尾追加new_names，
+        返回({成员路径: 新内容}, 需要删除的成员集合, [(工作表名, 新成员路径)])。
+        """
+        workbook_xml = archive.read("xl/workbook.xml").decode("utf-8")
+        rels_xml = archive.read("xl/_rels/workbook.xml.rels").decode("utf-8")
+        types_xml = archive.read("[Content_Types].xml").decode("utf-8")
+        names = set(archive.namelist())
+
+        prefix = re.search(rf'xmlns:(\w+)="{re.escape(REL_NS)}"', workbook_xml)
+        sheets_match = re.search(r'<sheets\b[^>]*>(.*?)</sheets>', workbook_xml, re.S)
+        if not prefix or not sheets_match:
+            raise UnsupportedWorkbookError("无法识别workbook.xml的结构")
+        rid_attr = f"{prefix.group(1)}:id"
+
+        sheet_tags = re.findall(r'<sheet\b[^>]*?/>', sheets_match.group(1))
+        if re.sub(r'<sheet\b[^>]*?/>', '', sheets_match.group(1)).strip():
+            raise UnsupportedWorkbookError("workbook.xml的sheets中含有无法识别的内容")
+
+        relations = {_attr(tag, "Id"): tag for tag in re.findall(r'<Relationship\b[^>]*?/>', rels_xml)}
+        sheet_names = [_attr(tag, "name") for tag in sheet_tags]
+        replace_names = set(select_replaced(sheet_names)) if select_replaced else set()
+        removed = [index for index, name in enumerate(sheet_names) if name in replace_names]
+        kept_count = len(sheet_tags) - len(removed)
+        # 只处理排序结果表位于末尾的情况，否则其他工作表的序号会变化
+        if removed != list(range(kept_count, len(sheet_tags))):
+            raise UnsupportedWorkbookError("排序结果表不在工作簿末尾")
+
+        removed_names = [sheet_names[index] for index in removed]
+        for defined_name in re.findall(r'<definedName\b[^>]*>.*?</definedName>', workbook_xml, re.S):
+            local_id = _attr(defined_name, "localSheetId")
+            if ((local_id is not None and int(local_id) >= kept_count) or
+                    any(name in unescape(defined_name, _XML_ATTR_ENTITIES) for name in removed_names)):
+                raise UnsupportedWorkbookError("定义名称引用了排序结果表")
+
+        removed_members = set()
+        for index in removed:
+            relation = relations.pop(_attr(sheet_tags[index], rid_attr), None)
+            if relation is None:
+                raise UnsupportedWorkbookError(f"找不到工作表 {sheet_names[index]} 的关系")
+            member = self._resolve_target(_attr(relation, "Target"))
+            sheet_rels = posixpath.join(posixpath.dirname(member), "_rels",
+                                        posixpath.basename(member) + ".rels")
+            if sheet_rels in names:
+                # 工作表带有批注、图片等关联部件，交给openpyxl处理
+                raise UnsupportedWorkbookError(f"工作表 {sheet_names[index]} 含有关联部件")
+            removed_members.add(member)
+            rels_xml = rels_xml.replace(relation, "")
+            types_xml = re.sub(rf'<Override\b[^>]*?PartName="/{re.escape(member)}"[^>]*?/>',
+                               '', types_xml)
+
+        sheet_ids = [int(_attr(tag, "sheetId") or 0) for tag in sheet_tags]
+        next_sheet_id = max(sheet_ids, default=0) + 1
+        used_members = names - removed_members
+        next_member = 1
+        next_rid = 1
+        new_tags = []
+        new_relations = []
+        new_types = []
+        new_members = []
+        for name in new_names:
+            while f"xl/worksheets/sheet{next_member}.xml" in used_members:
+                next_member += 1
+            member = f"xl/worksheets/sheet{next_member}.xml"
+            used_members.add(member)
+            while f"rId{next_rid}" in relations:
+                next_rid += 1
+            rid = f"rId{next_rid}"
+            relations[rid] = ""
+
+            new_tags.append(f'<sheet name={quoteattr(name)} sheetId="{next_sheet_id}" '
+                            f'state="visible" {rid_attr}="{rid}"/>')
+            new_relations.append(f'<Relationship Type="{WORKSHEET_REL_TYPE}" '
+                                 f'Target="/{member}" Id="{rid}"/>')
+            new_types.append(f'<Override PartName="/{member}" ContentType="{WORKSHEET_CONTENT_TYPE}"/>')
+            new_members.append((name, member))
+            next_sheet_id += 1
+
+        sheets_xml = "".join(sheet_tags[:kept_count] + new_tags)
+        workbook_xml = (workbook_xml[:sheets_match.start(1)] + sheets_xml +
+                        workbook_xml[sheets_match.end(1):])
+        # 活动工作表和第一个显示的工作表不能超出工作表数量
+        sheet_count = kept_count + len(new_names)
+        for attribute in ("activeTab", "firstSheet"):
+            workbook_xml = re.sub(
+                rf'\b{attribute}="(\d+)"',
+                lambda m, a=attribute: f'{a}="{min(int(m.group(1)), max(sheet_count - 1, 0))}"',
+                workbook_xml)
+
+        # 计算链引用了被删除的工作表，整体删除，Excel打开时会重新生成（与openpyxl相同）
+        for relation in list(relations.values()):
+            if relation and _attr(relation, "Type") == CALC_CHAIN_REL_TYPE:
+                member = self._resolve_target(_attr(relation, "Target"))
+                removed_members.add(member)
+                rels_xml = rels_xml.replace(relation, "")
+                types_xml = re.sub(rf'<Override\b[^>]*?PartName="/{re.escape(member)}"[^>]*?/>',
+                                   '', types_xml)
+
+        rels_xml = rels_xml.replace("</Relationships>", "".join(new_relations) + "</Relationships>")
+        types_xml = types_xml.replace("</Types>", "".join(new_types) + "</Types>")
+
+        patched = {
+            "xl/workbook.xml": workbook_xml,
+            "xl/_rels/workbook.xml.rels": rels_xml,
+            "[Content_Types].xml": types_xml,
+        }
+        if APP_PROPERTIES_MEMBER in names:
+            patched[APP_PROPERTIES_MEMBER] = self._patch_app_properties(
+                archive.read(APP_PROPERTIES_MEMBER).decode("utf-8"))
+        return patched, removed_members, new_members
+
+    @staticmethod
+    def _patch_app_properties(app_xml):
+        """删除docProps/app.xml中的工作表名列表（TitlesOfParts）和分类计数（HeadingPairs）
+
+        两者都是可选项，工作表变化后不删除会与workbook.xml不一致，Excel可能提示修复。
+        """
+        return re.sub(r'<(?:\w+:)?(TitlesOfParts|HeadingPairs)\b[^>]*?(?:/>|>.*?</(?:\w+:)?\1>)',
+                      '', app_xml, flags=re.S)
+
+    # ---------- 工作表XML ----------
+
+    def _sheet_tasks(self, ordered_blocks, historical_quantities, data_style, gap_style):
+        """计算各类别块的坐标和值，返回(任务列表, 最大行, 最大列)"""
+        tasks = []
+        max_row = 0
+        max_columns = 0
+        for category, entries, top_row, start_col, height in self.layout.placements(ordered_blocks):
+            values = self.layout.block_values(entries, historical_quantities, height)
+            tasks.append((top_row, start_col, values, data_style, gap_style))
+            max_row = max(max_row, top_row + height - 1)
+            max_columns = max(max_columns, start_col + self.layout.block_width - 1)
+        return tasks, max_row, max_columns
+
+    def _write_sheet(self, target, member, rendered, max_row, max_columns):
+        """把合并后的行流式写入压缩包中的工作表成员"""
+        rows = {}
+        for top_row, fragments in rendered:
+            for offset, fragment in enumerate(fragments):
+                rows.setdefault(top_row + offset, []).append(fragment)
+
+        widths = ([TITLE_WIDTH, ITEM_WIDTH] + [QUANTITY_WIDTH] * self.layout.quantity_count +
+                  [GAP_WIDTH])
+        if max_columns:
+            dimension = f"A1:{column_letter(max_columns)}{max_row}"
+            cols = "<cols>" + "".join(
+                f'<col width="{widths[col % self.layout.block_width]}" customWidth="1" '
+                f'min="{col + 1}" max="{col + 1}"/>' for col in range(max_columns)) + "</cols>"
+        else:
+            dimension = "A1"
+            cols = ""
+
+        with target.open(zipfile.ZipInfo(member, time.localtime()[:6])) as stream:
+            stream.write((
+                f'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+                f'<worksheet xmlns="{MAIN_NS}"><sheetPr><outlinePr summaryBelow="1" summaryRight="1"/>'
+                f'<pageSetUpPr/></sheetPr><dimension ref="{dimension}"/><sheetViews>'
+                f'<sheetView workbookViewId="0"><selection activeCell="A1" sqref="A1"/></sheetView>'
+                f'</sheetViews><sheetFormatPr baseColWidth="8" defaultRowHeight="15"/>{cols}<sheetData>'
+            ).encode("utf-8"))
+
+            buffer = []
+            for row in range(1, max_row + 1):
+                buffer.append(f'<row r="{row}" ht="{ROW_HEIGHT}" customHeight="1">'
+                              f'{"".join(rows.pop(row, ()))}</row>')
+                if len(buffer) >= _ROW_FLUSH_COUNT:
+                    stream.write("".join(buffer).encode("utf-8"))
+                    buffer = []
+            buffer.append('</sheetData><pageMargins left="0.75" right="0.75" top="1" bottom="1" '
+                          'header="0.5" footer="0.5"/></worksheet>')
+            stream.write("".join(buffer).encode("utf-8"))
+
+    def export(self, path, sheets, historical_quantities=None, select_replaced=None, backup_count=0):
+        """把[(工作表名, [(类别, 套装列表)])]写入xlsx文件
+
+        select_replaced接收工作簿中的工作表名列表，返回需要删除后重新写入的工作表名。
+        工作簿结构不适合直接修改时抛出UnsupportedWorkbookError，文件保持不变。
+        返回写入的类别块数。
+        """
+        historical_quantities = historical_quantities or {}
+        start = time.perf_counter()
+
+        with zipfile.ZipFile(path) as source:
+            patched, removed_members, new_members = self._patch_package(
+                source, select_replaced, [name for name, _ in sheets])
+            styles_xml, data_style, gap_style = self._patch_styles(
+                source.read("xl/styles.xml").decode("utf-8"))
+            patched["xl/styles.xml"] = styles_xml
+
+            # 先在主进程计算坐标和值，再统一并行生成所有工作表的XML片段
+            sheet_plans = []
+            tasks = []
+            for _, ordered_blocks in sheets:
+                sheet_tasks, max_row, max_columns = self._sheet_tasks(
+                    ordered_blocks, historical_quantities, data_style, gap_style)
+                sheet_plans.append((len(tasks), len(sheet_tasks), max_row, max_columns))
+                tasks.extend(sheet_tasks)
+            cell_count = self.count_cells(sheets)
+            rendered = self._render(tasks, cell_count)
+            render_seconds = time.perf_counter() - start
+
+            with atomic_write_path(path, backup_count) as temp_path:
+                with PackageWriter(temp_path, path) as target:
+                    for info in source.infolist():
+                        if info.filename in removed_members:
+                            continue
+                        if info.filename in patched:
+                            target.write(fresh_info(info), patched[info.filename].encode("utf-8"))
+                        else:
+                            target.copy(info)
+
+                    for (_, member), (offset, count, max_row, max_columns) in zip(new_members, sheet_plans):
+                        self._write_sheet(target, member, rendered[offset:offset + count],
+                                          max_row, max_columns)
+
+        logger.info(f"排序结果XML导出: {len(sheets)} 张表, {len(tasks)} 个类别块, 约{cell_count}个单元格, "
+                    f"生成 {render_seconds:.2f}s, 合计 {time.perf_counter() - start:.2f}s")
+        return len(tasks)
@@ -0,0 +1,59 @@
+# -*- coding: utf-8 -*-
+"""
+预识别模块
+
+框选区域截图完成后立即在后台开始OCR识别。点击"识别选中区域"时重新截图，
+画面内容哈希与预识别的截图相同时直接使用进行中或已完成的识别结果，不再重复请求。
+每次框选都会发送一次OCR请求（即使之后没有点击识别），默认关闭，由speculative_ocr配置开启。
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from ..utils import logger, config_manager
+
+
+class SpeculativeRecognizer:
+    """后台预识别"""
+
+    def __init__(self, ocr_processor):
+        self.ocr_processor = ocr_processor
+        self.enabled = config_manager.get("speculative_ocr", False)
+        self.executor = None
+        self.digest = None
+        self.future = None
+
+    def _get_executor(self):
+        """获取单线程执行器（首次使用时创建，之后复用）"""
+        if self.executor is None:
+            self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="speculative-ocr")
+        return self.executor
+
+    def start(self, artifact):
+        """在后台开始识别截图，之前未开始的预识别会被取消"""
+        if not self.enabled or artifact is None:
+            return False
+        if self.future is not None and artifact.digest == self.digest:
+            return True
+
+        if self.future is not None:
+            self.future.cancel()
+        self.digest = artifact.digest
+        self.future = self._get_executor().submit(self.ocr_processor.recognize_table, artifact)
+        logger.info(f"已开始预识别: {artifact.digest}")
+        return True
+
+    def take(self, artifact):
+        """画面与预识别的截图相同时返回对应的Future（进行中或已完成），否则返回None"""
+        if self.future is None or self.future.cancelled():
+            return None
+        if artifact.digest != self.digest:
+            logger.info(f"画面已变化，放弃预识别结果: {self.digest} → {artifact.digest}")
+            return None
+        logger.info(f"使用预识别结果: {artifact.digest}（{'已完成' if self.future.done() else '进行中'}）")
+        return self.future
+
+    def close(self):
+        """关闭执行器"""
+        if self.executor is not None:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+            self.executor = None
+        self.future = None
@@ -0,0 +1,145 @@
+# -*- coding: utf-8 -*-
+"""
+表格模板模块
+
+从一次成功的表格识别结果中学习标题行、物品名列和行距，
+后续截图只裁剪标题条和物品名列，用通用文字识别代替整表识别。
+"""
+
+from statistics import median
+from PIL import Image
+from ..utils import logger
+
+ITEM_HEADER = "物品名"
+
+
+def _polygon_box(cell):
+    """单元格多边形的外接矩形(left, top, right, bottom)"""
+    polygon = cell.get("Polygon") or []
+    if not polygon:
+        return None
+    xs = [point.get("X", 0) for point in polygon]
+    ys = [point.get("Y", 0) for point in polygon]
+    return min(xs), min(ys), max(xs), max(ys)
+
+
+class TableTemplate:
+    """表格网格模板"""
+
+    GAP = 8  # 拼接图中标题条与物品名列之间的间隔
+
+    def __init__(self, template=None):
+        self.template = template or None
+
+    def is_valid_for(self, image_size, selection):
+        """模板是否适用于当前截图尺寸和选框"""
+        if not self.template:
+            return False
+        return (tuple(self.template.get("image_size", ())) == tuple(image_size) and
+                self.template.get("selection") == selection)
+
+    def learn(self, ocr_result, title, image_size, selection):
+        """从整表识别结果中学习网格几何信息，成功时返回模板字典"""
+        if not ocr_result or not title:
+            return None
+
+        for table in ocr_result.get("TableDetections", []):
+            cells = table.get("Cells", [])
+            header = next((cell for cell in cells
+                           if cell.get("Text", "").strip() == ITEM_HEADER), None)
+            if header is None:
+                continue
+
+            header_box = _polygon_box(header)
+            if header_box is None:
+                continue
+
+            item_col = header.get("ColTl")
+            item_boxes = sorted(
+                (box for box in (_polygon_box(cell) for cell in cells
+                                 if cell.get("ColTl") == item_col and cell.get("RowTl", 0) > header.get("RowTl", 0))
+                 if box is not None),
+                key=lambda box: box[1])
+            if not item_boxes:
+                continue
+
+            title_box = self._find_title_box(ocr_result, title)
+            if title_box is None:
+                continue
+
+            pitches = [box[3] - box[1] for box in item_boxes]
+            template = {
+                "selection": selection,
+                "image_size": list(image_size),
+                "title_box": [title_box[0], title_box[1], title_box[2], title_box[3]],
+                "item_column": [header_box[0], header_box[2]],
+                "header_bottom": header_box[3],
+                "row_pitch": median(pitches)
+            }
+            self.template = template
+            logger.info(f"已学习表格模板: {template}")
+            return template
+
+        logger.info("识别结果中缺少模板所需的标题或物品名列，未学习模板")
+        return None
+
+    def _find_title_box(self, ocr_result, title):
+        """查找包含标题文本的单元格位置"""
+        for table in ocr_result.get("TableDetections", []):
+            for cell in table.get("Cells", []):
+                text = cell.get("Text", "").replace(" ", "")
+                if text and title in text:
+                    return _polygon_box(cell)
+        return None
+
+    def build_composite(self, image):
+        """把标题条和物品名列拼接为一张小图，返回(拼接图, 标题条高度)"""
+        template = self.template
+        width, height = image.size
+        margin = 4
+
+        title_left, title_top, title_right, title_bottom = template["title_box"]
+        title_strip = image.crop((0, max(0, title_top - margin),
+                                  width, min(height, title_bottom + margin)))
+
+        item_left, item_right = template["item_column"]
+        item_strip = image.crop((max(0, item_left), template["header_bottom"],
+                                 min(width, item_right), height))
+
+        composite = Image.new(
+            "RGB", (max(title_strip.width, item_strip.width),
+                    title_strip.height + self.GAP + item_strip.height), "white")
+        composite.paste(title_strip.convert("RGB"), (0, 0))
+        composite.paste(item_strip.convert("RGB"),
+                        (0, title_strip.height + self.GAP))
+        return composite, title_strip.height
+
+    def to_table_detections(self, lines, title_height):
+        """把拼接图上的文本行还原为TableDetections结构
+
+        lines: [(文本, 置信度, (left, top, right, bottom))]
+        """
+        template = self.template
+        pitch = template["row_pitch"] or 1
+        item_offset = title_height + self.GAP
+
+        cells = [{"ColTl": 1, "RowTl": 0, "ColBr": 2, "RowBr": 1,
+                  "Text": ITEM_HEADER, "Confidence": 100}]
+        rows = {}
+        for text, confidence, box in lines:
+            center_y = (box[1] + box[3]) / 2
+            if center_y < title_height:
+                cells.append({"ColTl": -1, "RowTl": -1, "ColBr": -1, "RowBr": -1,
+                              "Text": text, "Confidence": confidence})
+            elif center_y >= item_offset:
+                row = int((center_y - item_offset) // pitch) + 1
+                rows.setdefault(row, []).append((box[0], text, confidence))
+
+        # 同一行内的多个文本片段按从左到右拼接为一个单元格
+        for row, fragments in rows.items():
+            fragments.sort(key=lambda fragment: fragment[0])
+            cells.append({"ColTl": 1, "RowTl": row, "ColBr": 2, "RowBr": row + 1,
+                          "Text": "".join(fragment[1] for fragment in fragments),
+                          "Confidence": min(fragment[2] for fragment in fragments)})
+
+        return {"TableDetections": [{"Type": 1, "Cells": cells}], "Source": "template"}
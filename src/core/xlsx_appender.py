@@ -0,0 +1,446 @@
+# -*- coding: utf-8 -*-
+"""
+xlsx增量追加模块
+
+直接修改xlsx压缩包中目标工作表的XML，在sheetData末尾追加<row>（使用内联字符串），
+并更新dimension；其他成员直接复制压缩后的字节，不解压、不重新压缩，也不经过openpyxl的解析和序列化，
+追加耗时只与目标工作表的大小有关。
+"""
+
+import io
+import posixpath
+import re
+import struct
+import zipfile
+import zlib
+import xml.etree.ElementTree as ET
+from xml.sax.saxutils import escape
+from ..utils import logger
+from ..utils.atomic_file import atomic_write_path
+
+MAIN_NS = "http://schemas.openxmlformats.org/spreadsheetml/2006/main"
+REL_NS = "http://schemas.openxmlformats.org/officeDocument/2006/relationships"
+PKG_REL_NS = "http://schemas.openxmlformats.org/package/2006/relationships"
+SHARED_STRINGS_TYPE = "http://schemas.openxmlformats.org/officeDocument/2006/relationships/sharedStrings"
+
+# XML 1.0不允许的控制字符
+ILLEGAL_XML_CHARS = re.compile(r'[\x00-\x08\x0b\x0c\x0e-\x1f]')
+_COPY_CHUNK_SIZE = 1024 * 1024
+
+# ZIP文件结构（APPNOTE 4.3）：本地文件头、中央目录项、中央目录结束记录
+_LOCAL_HEADER = struct.Struct("<IHHHHHIIIHH")
+_CENTRAL_HEADER = struct.Struct("<IHHHHHHIIIHHHHHII")
+_END_RECORD = struct.Struct("<IHHHHIIH")
+_LOCAL_SIGNATURE = 0x04034b50
+_CENTRAL_SIGNATURE = 0x02014b50
+_END_SIGNATURE = 0x06054b50
+_FLAG_ENCRYPTED = 0x01
+_FLAG_DATA_DESCRIPTOR = 0x08
+_FLAG_UTF8 = 0x800
+_ZIP32_LIMIT = 0xFFFFFFFF
+
+
+class UnsupportedWorkbookError(Exception):
+    """工作簿结构不适合直接修改XML，需要改用openpyxl"""
+
+
+def column_letter(index):
+    """列号转列字母（1 -> A）"""
+    letters = ""
+    while index:
+        index, remainder = divmod(index - 1, 26)
+        letters = chr(65 + remainder) + letters
+    return letters
+
+
+def column_index(letters):
+    """列字母转列号（A -> 1）"""
+    index = 0
+    for char in letters:
+        index = index * 26 + ord(char) - 64
+    return index
+
+
+def _string_item_text(item):
+    """共享字符串项（<si>）的文本：纯文本取<t>，富文本拼接各段<r><t>，不含注音"""
+    text = item.find(f"{{{MAIN_NS}}}t")
+    if text is not None:
+        return text.text or ""
+    return "".join(run.findtext(f"{{{MAIN_NS}}}t", "") for run in item.findall(f"{{{MAIN_NS}}}r"))
+
+
+def _cell_has_data(cell):
+    """单元格是否有非空值，与openpyxl读取后判断 str(value).strip() 的结果一致
+
+    共享字符串单元格需要查共享字符串表才能判断，返回其下标（int），由调用方按需解析。
+    """
+    if cell.find(f"{{{MAIN_NS}}}f") is not None:
+        return True
+
+    cell_type = cell.get("t")
+    if cell_type == "inlineStr":
+        text = "".join(node.text or "" for node in cell.iter(f"{{{MAIN_NS}}}t"))
+        return bool(text.strip())
+
+    value = cell.find(f"{{{MAIN_NS}}}v")
+    if value is None or value.text is None:
+        return False
+    if cell_type == "s":
+        try:
+            return int(value.text)
+        except ValueError:
+            return True
+    return bool(value.text.strip())
+
+
+class XlsxAppender:
+    """xlsx工作表追加器"""
+
+    def __init__(self, path):
+        self.path = path
+
+    def _resolve_sheet_path(self, archive, sheet_name=None):
+        """根据工作表名称（为空时取活动工作表）找到工作表XML在压缩包中的路径"""
+        workbook = ET.fromstring(archive.read("xl/workbook.xml"))
+        sheets = workbook.findall(f"{{{MAIN_NS}}}sheets/{{{MAIN_NS}}}sheet")
+        if not sheets:
+            raise UnsupportedWorkbookError("工作簿中没有工作表")
+
+        target = None
+        if sheet_name:
+            target = next((sheet for sheet in sheets if sheet.get("name") == sheet_name), None)
+        if target is None:
+            # 与openpyxl的workbook.active一致：取workbookView的activeTab
+            view = workbook.find(f"{{{MAIN_NS}}}bookViews/{{{MAIN_NS}}}workbookView")
+            active_tab = int(view.get("activeTab", 0)) if view is not None else 0
+            target = sheets[active_tab if active_tab < len(sheets) else 0]
+
+        relation_id = target.get(f"{{{REL_NS}}}id")
+        rels = ET.fromstring(archive.read("xl/_rels/workbook.xml.rels"))
+        for relation in rels.findall(f"{{{PKG_REL_NS}}}Relationship"):
+            if relation.get("Id") == relation_id:
+                member = relation.get("Target")
+                if member.startswith("/"):
+                    return member.lstrip("/")
+                return posixpath.normpath(posixpath.join("xl", member))
+        raise UnsupportedWorkbookError(f"找不到工作表 {target.get('name')} 的XML")
+
+    @staticmethod
+    def _blank_shared_strings(archive, count):
+        """共享字符串表前count项去除首尾空白后是否为空，读到第count项即停止；没有共享字符串表时返回空列表"""
+        rels = ET.fromstring(archive.read("xl/_rels/workbook.xml.rels"))
+        member = next((relation.get("Target") for relation in rels.findall(f"{{{PKG_REL_NS}}}Relationship")
+                       if relation.get("Type") == SHARED_STRINGS_TYPE), None)
+        if member is None:
+            return []
+        member = member.lstrip("/") if member.startswith("/") else posixpath.normpath(
+            posixpath.join("xl", member))
+
+        blank_strings = []
+        with archive.open(member) as stream:
+            for _, element in ET.iterparse(stream):
+                if element.tag == f"{{{MAIN_NS}}}si":
+                    blank_strings.append(not _string_item_text(element).strip())
+                    element.clear()
+                    if len(blank_strings) >= count:
+                        break
+        return blank_strings
+
+    @staticmethod
+    def _scan_sheet(sheet_xml):
+        """流式扫描工作表XML
+
+        返回(最后一行确定有值的行号, XML中最大的行号, 之后只含共享字符串的行[(行号, 下标列表)])，
+        共享字符串的行是否有值要查共享字符串表，只有这些行存在时才需要读取。
+        """
+        last_data_row = 0
+        max_row = 0
+        string_rows = []
+        row_has_data = False
+        row_strings = []
+
+        for event, element in ET.iterparse(io.BytesIO(sheet_xml), events=("start", "end")):
+            tag = element.tag
+            if event == "start":
+                if tag == f"{{{MAIN_NS}}}row":
+                    row_has_data = False
+                    row_strings = []
+                continue
+
+            if tag == f"{{{MAIN_NS}}}c":
+                if not row_has_data:
+                    has_data = _cell_has_data(element)
+                    if has_data is True:
+                        row_has_data = True
+                    elif has_data is not False:
+                        row_strings.append(has_data)
+                element.clear()
+            elif tag == f"{{{MAIN_NS}}}row":
+                row_number = element.get("r")
+                if row_number is None:
+                    raise UnsupportedWorkbookError("行缺少r属性")
+                row_number = int(row_number)
+                max_row = max(max_row, row_number)
+                if row_has_data:
+                    last_data_row = row_number
+                    string_rows = []
+                elif row_strings:
+                    string_rows.append((row_number, row_strings))
+                element.clear()
+
+        return last_data_row, max_row, string_rows
+
+    @staticmethod
+    def _build_rows(start_row, rows):
+        """生成追加的<row>元素，字符串使用内联字符串，不依赖共享字符串表"""
+        parts = []
+        for offset, values in enumerate(rows):
+            row_number = start_row + offset
+            cells = []
+            for col, value in enumerate(values, 1):
+                if value is None or value == "":
+                    continue
+                ref = f"{column_letter(col)}{row_number}"
+                if isinstance(value, bool):
+                    cells.append(f'<c r="{ref}" t="b"><v>{int(value)}</v></c>')
+                elif isinstance(value, (int, float)):
+                    cells.append(f'<c r="{ref}"><v>{value}</v></c>')
+                else:
+                    cells.append(f'<c r="{ref}" t="inlineStr"><is><t xml:space="preserve">'
+                                 f'{escape(ILLEGAL_XML_CHARS.sub("", str(value)))}</t></is></c>')
+            if cells:
+                parts.append(f'<row r="{row_number}">{"".join(cells)}</row>')
+        return "".join(parts).encode("utf-8")
+
+    @staticmethod
+    def _update_dimension(sheet_xml, last_row, last_col):
+        """扩展dimension的范围以包含追加的行"""
+        match = re.search(rb'<dimension ref="([A-Z]+)(\d+)(?::([A-Z]+)(\d+))?"\s*/>', sheet_xml)
+        if not match:
+            return sheet_xml
+
+        start_col, start_row = match.group(1).decode(), int(match.group(2))
+        end_col = match.group(3).decode() if match.group(3) else start_col
+        end_row = int(match.group(4)) if match.group(4) else start_row
+        end_col = column_letter(max(column_index(end_col), last_col))
+        end_row = max(end_row, last_row)
+        ref = f'<dimension ref="{start_col}{start_row}:{end_col}{end_row}"/>'.encode()
+        return sheet_xml[:match.start()] + ref + sheet_xml[match.end():]
+
+    def _last_data_row(self, archive, sheet_xml):
+        """返回(最后一行有值的行号, XML中最大的行号)"""
+        last_data_row, max_row, string_rows = self._scan_sheet(sheet_xml)
+        if string_rows:
+            count = max(max(indexes) for _, indexes in string_rows) + 1
+            blank_strings = self._blank_shared_strings(archive, count)
+            for row_number, indexes in reversed(string_rows):
+                # 下标超出共享字符串表时按有值处理
+                if any(index >= len(blank_strings) or not blank_strings[index] for index in indexes):
+                    last_data_row = row_number
+                    break
+        return last_data_row, max_row
+
+    def _patch_sheet(self, sheet_xml, rows, gap_rows, last_data_row, max_row):
+        """在工作表XML末尾追加行，返回(新的XML, 起始行号)"""
+        start_row = last_data_row + gap_rows + 1 if last_data_row else 1
+        if start_row <= max_row:
+            # 追加位置之后还有行元素（如设置过格式的空行），需要合并单元格，交给openpyxl处理
+            raise UnsupportedWorkbookError(f"第{start_row}行之后已存在行元素")
+
+        new_rows = self._build_rows(start_row, rows)
+        end_index = sheet_xml.rfind(b"</sheetData>")
+        if end_index != -1:
+            patched = sheet_xml[:end_index] + new_rows + sheet_xml[end_index:]
+        else:
+            empty = re.search(rb"<sheetData\s*/>", sheet_xml)
+            if not empty:
+                raise UnsupportedWorkbookError("找不到sheetData")
+            patched = (sheet_xml[:empty.start()] + b"<sheetData>" + new_rows +
+                       b"</sheetData>" + sheet_xml[empty.end():])
+
+        last_col = max((len(values) for values in rows), default=1)
+        patched = self._update_dimension(patched, start_row + len(rows) - 1, last_col)
+        return patched, start_row
+
+    def append_rows(self, rows, sheet_name=None, gap_rows=2, backup_count=0):
+        """在工作表最后一行有值的行之后空gap_rows行追加rows（二维列表），返回起始行号"""
+        with zipfile.ZipFile(self.path) as source:
+            sheet_member = self._resolve_sheet_path(source, sheet_name)
+            sheet_info = source.getinfo(sheet_member)
+            sheet_xml = source.read(sheet_member)
+            patched_xml, start_row = self._patch_sheet(
+                sheet_xml, rows, gap_rows, *self._last_data_row(source, sheet_xml))
+
+            with atomic_write_path(self.path, backup_count) as temp_path:
+                with PackageWriter(temp_path, self.path) as target:
+                    for info in source.infolist():
+                        if info.filename == sheet_member:
+                            target.write(fresh_info(sheet_info), patched_xml)
+                        else:
+                            target.copy(info)
+
+        logger.info(f"XML追加完成: {sheet_member} 第{start_row}行起 {len(rows)} 行")
+        return start_row
+
+
+def fresh_info(info):
+    """复制ZipInfo中的文件名、时间和属性，用于重新写入成员"""
+    new_info = zipfile.ZipInfo(info.filename, info.date_time)
+    new_info.external_attr = info.external_attr
+    new_info.create_system = info.create_system
+    return new_info
+
+
+def _dos_date_time(date_time):
+    """(年, 月, 日, 时, 分, 秒) 转为ZIP使用的DOS时间和日期"""
+    year, month, day, hour, minute, second = date_time[:6]
+    return (hour << 11) | (minute << 5) | (second // 2), (max(year - 1980, 0) << 9) | (month << 5) | day
+
+
+def _encode_name(info):
+    """成员名编码：与zipfile读取时的解码方式对应，未标记UTF-8的按cp437编码"""
+    if info.flag_bits & _FLAG_UTF8:
+        return info.filename.encode("utf-8"), _FLAG_UTF8
+    try:
+        return info.filename.encode("ascii"), 0
+    except UnicodeEncodeError:
+        pass
+    try:
+        return info.filename.encode("cp437"), 0
+    except UnicodeEncodeError:
+        return info.filename.encode("utf-8"), _FLAG_UTF8
+
+
+class PackageWriter:
+    """xlsx压缩包写入器
+
+    未修改的成员从原文件直接复制压缩后的字节（按中央目录中的header_offset和compress_size定位），
+    不解压也不重新压缩；修改过或新生成的成员用DEFLATE压缩写入。
+    只写出普通的ZIP结构，遇到加密成员、超过4GB或成员数超过65535的压缩包抛出UnsupportedWorkbookError。
+    """
+
+    def __init__(self, path, source_path=None):
+        self.file = open(path, "wb")
+        self.source = open(source_path, "rb") if source_path else None
+        self.entries = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        try:
+            if exc_type is None:
+                self._write_central_directory()
+        finally:
+            self.file.close()
+            if self.source is not None:
+                self.source.close()
+
+    def _write_local_header(self, name, flags, method, date_time, crc, compress_size, file_size):
+        """写入本地文件头，返回中央目录需要的成员信息"""
+        offset = self.file.tell()
+        if offset > _ZIP32_LIMIT:
+            raise UnsupportedWorkbookError("压缩包超过4GB")
+        dos_time, dos_date = _dos_date_time(date_time)
+        version = 20 if method == zipfile.ZIP_DEFLATED else 10
+        self.file.write(_LOCAL_HEADER.pack(_LOCAL_SIGNATURE, version, flags, method, dos_time, dos_date,
+                                           crc, compress_size, file_size, len(name), 0))
+        self.file.write(name)
+        return [name, flags, method, dos_time, dos_date, crc, compress_size, file_size, offset, version]
+
+    def copy(self, info):
+        """从原文件复制成员压缩后的字节"""
+        if info.flag_bits & _FLAG_ENCRYPTED:
+            raise UnsupportedWorkbookError(f"成员 {info.filename} 已加密")
+        if max(info.compress_size, info.file_size, info.header_offset) > _ZIP32_LIMIT:
+            raise UnsupportedWorkbookError(f"成员 {info.filename} 使用ZIP64")
+
+        self.source.seek(info.header_offset)
+        header = _LOCAL_HEADER.unpack(self.source.read(_LOCAL_HEADER.size))
+        if header[0] != _LOCAL_SIGNATURE:
+            raise UnsupportedWorkbookError(f"成员 {info.filename} 的本地文件头无效")
+        self.source.seek(header[9] + header[10], io.SEEK_CUR)
+
+        name, name_flag = _encode_name(info)
+        # 大小和CRC已写在本地文件头中，不再需要数据描述符
+        flags = (info.flag_bits & ~(_FLAG_DATA_DESCRIPTOR | _FLAG_UTF8)) | name_flag
+        entry = self._write_local_header(name, flags, info.compress_type, info.date_time,
+                                         info.CRC, info.compress_size, info.file_size)
+        remaining = info.compress_size
+        while remaining:
+            chunk = self.source.read(min(remaining, _COPY_CHUNK_SIZE))
+            if not chunk:
+                raise UnsupportedWorkbookError(f"成员 {info.filename} 数据不完整")
+            self.file.write(chunk)
+            remaining -= len(chunk)
+        self.entries.append(entry + [info.create_system, info.external_attr])
+
+    def write(self, info, data):
+        """压缩写入成员内容"""
+        with self.open(info) as stream:
+            stream.write(data)
+
+    def open(self, info):
+        """打开成员的写入流，写入的内容逐块压缩，关闭时回填CRC和大小"""
+        name, name_flag = _encode_name(info)
+        entry = self._write_local_header(name, name_flag, zipfile.ZIP_DEFLATED, info.date_time, 0, 0, 0)
+        return _MemberStream(self, entry + [info.create_system, info.external_attr])
+
+    def _write_central_directory(self):
+        """写入中央目录和结束记录"""
+        if len(self.entries) > 0xFFFF:
+            raise UnsupportedWorkbookError("压缩包成员数超过65535")
+        start = self.file.tell()
+        for (name, flags, method, dos_time, dos_date, crc, compress_size, file_size, offset, version,
+             create_system, external_attr) in self.entries:
+            self.file.write(_CENTRAL_HEADER.pack(
+                _CENTRAL_SIGNATURE, (create_system << 8) | 20, version, flags, method, dos_time, dos_date,
+                crc, compress_size, file_size, len(name), 0, 0, 0, 0, external_attr, offset))
+            self.file.write(name)
+        end = self.file.tell()
+        if end > _ZIP32_LIMIT:
+            raise UnsupportedWorkbookError("压缩包超过4GB")
+        self.file.write(_END_RECORD.pack(_END_SIGNATURE, 0, 0, len(self.entries), len(self.entries),
+                                         end - start, start, 0))
+
+
+class _MemberStream:
+    """PackageWriter.open返回的写入流"""
+
+    def __init__(self, writer, entry):
+        self.writer = writer
+        self.entry = entry
+        self.compressor = zlib.compressobj(zlib.Z_DEFAULT_COMPRESSION, zlib.DEFLATED, -15)
+        self.crc = 0
+        self.compress_size = 0
+        self.file_size = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+
+    def write(self, data):
+        self.crc = zlib.crc32(data, self.crc)
+        self.file_size += len(data)
+        self._write_compressed(self.compressor.compress(data))
+
+    def _write_compressed(self, data):
+        self.writer.file.write(data)
+        self.compress_size += len(data)
+
+    def close(self):
+        """结束压缩并回填本地文件头中的CRC和大小"""
+        self._write_compressed(self.compressor.flush())
+        if max(self.compress_size, self.file_size) > _ZIP32_LIMIT:
+            raise UnsupportedWorkbookError(f"成员 {self.entry[0].decode('utf-8', 'replace')} 超过4GB")
+        file = self.writer.file
+        end = file.tell()
+        # 本地文件头中CRC字段的偏移为14，之后依次是压缩后大小和原始大小
+        file.seek(self.entry[8] + 14)
+        file.write(struct.pack("<III", self.crc, self.compress_size, self.file_size))
+        file.seek(end)
+        self.entry[5:8] = [self.crc, self.compress_size, self.file_size]
+        self.writer.entries.append(self.entry)
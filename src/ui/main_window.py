@@ -4,8 +4,11 @@
 """
 
 import tkinter as tk
+from concurrent.futures import ThreadPoolExecutor
 from tkinter import messagebox, ttk
-from ..core import ScreenCapture, OCRProcessor, ExcelManager, DataSorter
+from ..core import ScreenCapture, OCRProcessor, ExcelManager, DataSorter, ItemIndex, RegionScanner
+from ..core.region_scanner import PROFILES
+from ..core.speculative_ocr import SpeculativeRecognizer
 from ..utils import logger, config_manager, dpi_helper
 
 
@@ -25,12 +28,26 @@ class MainWindow:
         # 初始化核心组件
         self.screen_capture = ScreenCapture(self.root)
         self.ocr_processor = OCRProcessor()
+        self.region_scanner = RegionScanner(self.ocr_processor)
+        # 框选截图完成后立即在后台预识别
+        self.speculative_ocr = SpeculativeRecognizer(self.ocr_processor)
+        self.screen_capture.on_capture = self._start_speculative_recognition
         self.excel_manager = ExcelManager()
         self.data_sorter = DataSorter(self.excel_manager)
+        # 读取整个工作簿的操作在后台线程执行，界面保持响应
+        self.background_executor = None
+        # 物品索引在第一次查询时加载，之后每次查询时在后台检查Excel是否变化
+        self.item_index = None
+        self.item_index_refreshing = False
+        self.search_query = None  # 结果区正在显示的查询，显示其他内容时为None
 
         # OCR结果
         self.extracted_title = None
         self.extracted_item_names = []
+        self.extracted_confidence = {'title': None, 'items': []}
+
+        # 自动提交统计
+        self.recognition_stats = {'total': 0, 'auto_committed': 0}
 
         # 选框边框窗口
         self.selection_border_window = None
@@ -44,12 +61,15 @@ class MainWindow:
         # 应用初始设置
         self._apply_initial_settings()
 
+        # 监视.env和配置文件，修改过滤和类别规则后无需重启
+        config_manager.start_watching()
+
         logger.info("主界面初始化完成")
 
     def _setup_window(self):
         """设置窗口属性"""
         window_width = 423
-        window_height = 557
+        window_height = 627
         screen_width = self.root.winfo_screenwidth()
         screen_height = self.root.winfo_screenheight()
         center_x = int(screen_width/2 - window_width/2)
@@ -86,6 +106,15 @@ class MainWindow:
             button_frame, text="识别选中区域", command=self._recognize_screen_area, state=tk.DISABLED)
         self.recognize_btn.pack(fill=tk.X, pady=5)
 
+        # 多区域识别按钮
+        region_frame = ttk.Frame(button_frame)
+        region_frame.pack(fill=tk.X, pady=5)
+
+        ttk.Button(region_frame, text="添加识别区域", command=self._add_capture_region).pack(
+            side=tk.LEFT, padx=(0, 5))
+        ttk.Button(region_frame, text="清除区域", command=self._clear_capture_regions).pack(
+            side=tk.LEFT, padx=(0, 10))
+
         # Excel操作按钮
         excel_frame = ttk.Frame(button_frame)
         excel_frame.pack(fill=tk.X, pady=5)
@@ -98,6 +127,16 @@ class MainWindow:
         # 选项设置
         self._create_option_widgets(button_frame)
 
+        # 物品查询
+        search_frame = ttk.Frame(button_frame)
+        search_frame.pack(fill=tk.X, pady=5)
+
+        self.search_var = tk.StringVar()
+        search_entry = ttk.Entry(search_frame, textvariable=self.search_var, font=("微软雅黑", 9))
+        search_entry.pack(side=tk.LEFT, fill=tk.X, expand=True, padx=(0, 5))
+        search_entry.bind("<Return>", lambda event: self._search_items())
+        ttk.Button(search_frame, text="查询物品", command=self._search_items).pack(side=tk.RIGHT)
+
         # 状态显示
         self.status_label = ttk.Label(
             main_frame, text="准备就绪", foreground="green")
@@ -144,6 +183,14 @@ class MainWindow:
                                         command=self._save_confirmation_setting)
         confirm_check.pack(fill=tk.X, pady=2)
 
+        # 高置信度自动写入选项
+        self.auto_commit = tk.BooleanVar(
+            value=config_manager.get("auto_commit", {}).get("enabled", False))
+        auto_commit_check = ttk.Checkbutton(parent, text="高置信度结果自动写入（仅低置信度时确认）",
+                                            variable=self.auto_commit,
+                                            command=self._save_auto_commit_setting)
+        auto_commit_check.pack(fill=tk.X, pady=2)
+
     def _create_result_area(self, parent):
         """创建结果显示区域"""
         result_frame = ttk.LabelFrame(parent, text="识别结果", padding=10)
@@ -183,14 +230,57 @@ class MainWindow:
         else:
             self.status_label.config(text="配置验证通过", foreground="green")
 
+        # 从排序结果表加载已确认物品名，用于OCR纠错
+        self.root.after(1500, self._load_known_items)
+
         # 如果勾选了自动打开Excel，则自动准备Excel文件
         if self.auto_open_excel.get():
             self.root.after(1000, self._prepare_excel_file)
 
+        # 已配置识别区域时可以直接识别
+        if self.screen_capture.has_regions():
+            self.recognize_btn.config(state=tk.NORMAL)
+
         # 如果启动时需要显示选框，则显示
         if self.show_selection_border.get() and self.screen_capture.has_valid_selection():
             self.root.after(1000, self._show_selection_border_window)
 
+    def _run_in_background(self, func, on_done):
+        """在后台线程执行func，完成后在界面线程中调用on_done(future)
+
+        后台任务共用一个线程依次执行，不会同时读取同一个工作簿。
+        """
+        if self.background_executor is None:
+            self.background_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="ui-background")
+        future = self.background_executor.submit(func)
+        self.root.after(50, self._poll_background, future, on_done)
+        return future
+
+    def _poll_background(self, future, on_done):
+        """后台任务完成后在界面线程中继续处理"""
+        if not future.done():
+            self.root.after(50, self._poll_background, future, on_done)
+            return
+        on_done(future)
+
+    def _load_known_items(self):
+        """在后台读取已确认物品名，读取完成后加入纠错词库"""
+        def read_known_items():
+            with self.excel_manager.worker_thread():
+                return self.excel_manager.read_known_item_names(
+                    self.data_sorter.written_block_width())
+
+        self._run_in_background(read_known_items, self._on_known_items_loaded)
+
+    def _on_known_items_loaded(self, future):
+        """把后台读取的已确认物品名加入纠错词库"""
+        try:
+            added = self.ocr_processor.item_corrector.add_items(
+                future.result(), persist=True)
+            logger.info(f"纠错词库新增 {added} 个物品名")
+        except Exception as e:
+            logger.error(f"加载已确认物品名失败: {e}")
+
     def _start_screen_capture(self):
         """开始屏幕选择"""
         self.status_label.config(text="请在屏幕上拖拽选择区域...", foreground="blue")
@@ -207,8 +297,16 @@ class MainWindow:
         else:
             self.status_label.config(text="屏幕选择失败", foreground="red")
 
+    def _start_speculative_recognition(self, artifact):
+        """框选截图完成后开始后台预识别（配置了识别区域时点击识别不使用该截图，不预识别）"""
+        if self.screen_capture.has_regions():
+            return
+        if self.speculative_ocr.start(artifact):
+            self.status_label.config(text="已选择区域，正在后台预识别...", foreground="blue")
+
     def _display_capture_info(self, selection_info):
         """显示截图信息"""
+        self.search_query = None
         self.result_text.delete(1.0, tk.END)
         self.result_text.insert(tk.END, "✅ 已截取屏幕区域\n")
         size = selection_info['size']
@@ -222,8 +320,63 @@ class MainWindow:
         if self.show_selection_border.get():
             self._show_selection_border_window()
 
+    def _add_capture_region(self):
+        """把当前选框添加为命名识别区域"""
+        if not self.screen_capture.has_valid_selection():
+            messagebox.showerror("错误", "没有有效的选框区域，请先选择区域")
+            return
+
+        dialog = tk.Toplevel(self.root)
+        dialog.title("添加识别区域")
+        dialog.transient(self.root)
+        dialog.grab_set()
+        dialog.resizable(False, False)
+        dialog.geometry("+%d+%d" % (self.root.winfo_rootx() +
+                        100, self.root.winfo_rooty() + 100))
+
+        frame = ttk.Frame(dialog)
+        frame.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
+
+        ttk.Label(frame, text="区域名称:").grid(row=0, column=0, sticky=tk.W, pady=3)
+        name_var = tk.StringVar(value=f"区域{len(self.screen_capture.regions) + 1}")
+        ttk.Entry(frame, textvariable=name_var, font=("微软雅黑", 9)).grid(
+            row=0, column=1, sticky=tk.EW, pady=3)
+
+        ttk.Label(frame, text="提取内容:").grid(row=1, column=0, sticky=tk.W, pady=3)
+        profile_var = tk.StringVar(value=PROFILES[0])
+        ttk.Combobox(frame, textvariable=profile_var, values=PROFILES, state="readonly",
+                     width=10).grid(row=1, column=1, sticky=tk.W, pady=3)
+
+        def confirm():
+            name = name_var.get().strip()
+            if not name:
+                return
+            dialog.destroy()
+            if self.screen_capture.add_region(name, profile_var.get()):
+                self.recognize_btn.config(state=tk.NORMAL)
+                self.status_label.config(
+                    text=f"已添加识别区域: {name}（共{len(self.screen_capture.regions)}个）",
+                    foreground="green")
+
+        button_frame = ttk.Frame(frame)
+        button_frame.grid(row=2, column=0, columnspan=2, sticky=tk.E, pady=(5, 0))
+        ttk.Button(button_frame, text="添加", command=confirm).pack(side=tk.RIGHT, padx=(3, 0))
+        ttk.Button(button_frame, text="取消", command=dialog.destroy).pack(side=tk.RIGHT, padx=(3, 0))
+
+    def _clear_capture_regions(self):
+        """清除所有识别区域，恢复单选框识别"""
+        if not self.screen_capture.has_regions():
+            return
+        if messagebox.askyesno("确认", f"清除全部 {len(self.screen_capture.regions)} 个识别区域？"):
+            self.screen_capture.clear_regions()
+            self.status_label.config(text="已清除识别区域", foreground="green")
+
     def _recognize_screen_area(self):
-        """识别截图区域"""
+        """识别截图区域，配置了识别区域时一次识别所有区域"""
+        if self.screen_capture.has_regions():
+            self._recognize_regions()
+            return
+
         if not self.screen_capture.has_valid_selection():
             messagebox.showerror("错误", "没有有效的选框区域，请先选择区域")
             return
@@ -233,40 +386,143 @@ class MainWindow:
             self.root.update()
 
             # 重新截图
-            image = self.screen_capture.capture_current_selection()
-            if not image:
+            artifact = self.screen_capture.capture_current_selection()
+            if not artifact:
                 messagebox.showerror("错误", "截图失败")
                 return
 
-            # OCR识别
-            ocr_result = self.ocr_processor.recognize_table(image)
-            if not ocr_result:
-                messagebox.showerror("错误", "OCR识别失败")
+            # 画面与框选时相同则使用预识别结果
+            future = self.speculative_ocr.take(artifact)
+            if future is not None and not future.done():
+                # 预识别仍在进行，等待期间界面保持响应
+                self.recognize_btn.config(state=tk.DISABLED)
+                self.root.after(50, self._wait_for_speculative, future, artifact)
                 return
 
-            # 提取标题和物品名
-            self.extracted_title, self.extracted_item_names = self.ocr_processor.extract_title_and_items(
-                ocr_result)
+            self._complete_recognition(artifact, future)
 
-            # 显示结果
-            self._display_recognition_results()
+        except Exception as e:
+            self._on_recognition_error(e)
 
-            # 更新状态
-            self.status_label.config(text="识别完成", foreground="green")
+    def _wait_for_speculative(self, future, artifact):
+        """预识别完成后在界面线程中继续处理"""
+        if not future.done():
+            self.root.after(50, self._wait_for_speculative, future, artifact)
+            return
 
-            # 根据配置决定是否显示确认对话框
-            if self.show_confirmation.get() and (self.extracted_title or self.extracted_item_names):
-                self._show_edit_confirmation_dialog()
-            else:
-                self._write_to_excel_direct()
+        self.recognize_btn.config(state=tk.NORMAL)
+        try:
+            self._complete_recognition(artifact, future)
+        except Exception as e:
+            self._on_recognition_error(e)
+
+    def _complete_recognition(self, artifact, future=None):
+        """取预识别结果（没有或预识别失败时重新识别），提取标题和物品名"""
+        ocr_result = None
+        if future is not None:
+            try:
+                ocr_result = future.result()
+            except Exception as e:
+                logger.warning(f"预识别失败，重新识别: {e}")
+        if not ocr_result:
+            ocr_result = self.ocr_processor.recognize_table(artifact)
+        if not ocr_result:
+            messagebox.showerror("错误", "OCR识别失败")
+            return
+
+        # 提取标题和物品名
+        self.extracted_title, self.extracted_item_names, self.extracted_confidence = \
+            self.ocr_processor.extract_title_and_items(ocr_result, return_confidence=True)
+
+        # 整表识别成功后学习表格模板，供后续快速识别使用
+        self.ocr_processor.learn_table_template(
+            ocr_result, self.extracted_title, artifact.size)
+
+        self._handle_recognition_results()
+
+    def _on_recognition_error(self, e):
+        """识别失败提示"""
+        logger.error(f"识别过程失败: {e}")
+        messagebox.showerror("错误", f"识别失败: {str(e)}")
+        self.status_label.config(text="识别失败", foreground="red")
+
+    def _recognize_regions(self):
+        """一次截图，并行识别所有命名区域，合并结果后写入"""
+        try:
+            self.status_label.config(text="正在识别...", foreground="blue")
+            self.root.update()
+
+            captured = self.screen_capture.capture_regions()
+            if not captured:
+                messagebox.showerror("错误", "截图失败")
+                return
+
+            merged = self.region_scanner.scan(captured)
+            if not merged:
+                messagebox.showerror("错误", "OCR识别失败")
+                return
+
+            self.extracted_title, self.extracted_item_names, self.extracted_confidence = merged
+            self._handle_recognition_results()
 
         except Exception as e:
-            logger.error(f"识别过程失败: {e}")
+            logger.error(f"多区域识别失败: {e}")
             messagebox.showerror("错误", f"识别失败: {str(e)}")
             self.status_label.config(text="识别失败", foreground="red")
 
+    def _handle_recognition_results(self):
+        """显示识别结果，并根据配置确认或直接写入Excel"""
+        self._display_recognition_results()
+
+        # 更新状态
+        self.status_label.config(text="识别完成", foreground="green")
+
+        # 根据配置决定是否显示确认对话框
+        self.recognition_stats['total'] += 1
+        if self.show_confirmation.get() and (self.extracted_title or self.extracted_item_names):
+            low_title, low_items = self._find_low_confidence()
+            if self.auto_commit.get() and not low_title and not low_items:
+                self.recognition_stats['auto_committed'] += 1
+                self._log_auto_commit_rate()
+                self._write_to_excel_direct()
+            else:
+                self._log_auto_commit_rate()
+                self._show_edit_confirmation_dialog(low_title, low_items)
+        else:
+            self._write_to_excel_direct()
+
+    def _find_low_confidence(self):
+        """找出低置信度的标题和物品，返回(标题是否低置信度, 低置信度物品下标集合)"""
+        min_confidence = config_manager.get(
+            "auto_commit", {}).get("min_confidence", 90)
+
+        title_confidence = self.extracted_confidence.get('title')
+        low_title = (not self.extracted_title or title_confidence is None or
+                     title_confidence < min_confidence)
+
+        if not self.extracted_item_names:
+            # 没有识别到物品名时需要人工确认
+            return True, set()
+
+        item_confidences = self.extracted_confidence.get('items', [])
+        if len(item_confidences) != len(self.extracted_item_names):
+            # 置信度与物品无法对应时，全部视为低置信度
+            return low_title, set(range(len(self.extracted_item_names)))
+
+        low_items = {index for index, confidence in enumerate(item_confidences)
+                     if confidence is None or confidence < min_confidence}
+        return low_title, low_items
+
+    def _log_auto_commit_rate(self):
+        """记录自动提交率"""
+        total = self.recognition_stats['total']
+        auto_committed = self.recognition_stats['auto_committed']
+        rate = auto_committed / total if total else 0.0
+        logger.info(f"自动提交率: {auto_committed}/{total} ({rate:.0%})")
+
     def _display_recognition_results(self):
         """显示识别结果"""
+        self.search_query = None
         self.result_text.delete(1.0, tk.END)
 
         self.result_text.insert(tk.END, "🎯 OCR识别结果\n")
@@ -286,8 +542,16 @@ class MainWindow:
         else:
             self.result_text.insert(tk.END, "📦 物品名列表: 未找到\n")
 
-    def _show_edit_confirmation_dialog(self):
-        """显示编辑确认对话框"""
+        corrections = self.extracted_confidence.get('corrections', [])
+        if corrections:
+            self.result_text.insert(
+                tk.END, f"\n🔧 已自动纠正 {len(corrections)} 项:\n")
+            for record in corrections:
+                self.result_text.insert(
+                    tk.END, f"  {record['original']} → {record['corrected']} ({record['confidence']:.0%})\n")
+
+    def _show_edit_confirmation_dialog(self, low_title=False, low_items=None):
+        """显示编辑确认对话框，低置信度的标题和物品会高亮显示"""
         if not self.extracted_title and not self.extracted_item_names:
             messagebox.showwarning("警告", "没有识别到标题和物品名")
             return
@@ -314,7 +578,8 @@ class MainWindow:
         info_label.pack(anchor=tk.W, pady=(0, 10))
 
         # 标题部分
-        title_frame = ttk.LabelFrame(main_frame, text="标题", padding=5)
+        title_frame = ttk.LabelFrame(
+            main_frame, text="标题（低置信度，请核对）" if low_title else "标题", padding=5)
         title_frame.pack(fill=tk.X, pady=(0, 5))
 
         self.title_var = tk.StringVar(value=self.extracted_title or "")
@@ -337,6 +602,13 @@ class MainWindow:
         items_content = "\n".join(self.extracted_item_names)
         self.items_text.insert(tk.END, items_content)
 
+        # 高亮低置信度物品
+        self.items_text.tag_configure("low_confidence", background="#FFF2A8")
+        for index in sorted(low_items or ()):
+            if index < len(self.extracted_item_names):
+                self.items_text.tag_add(
+                    "low_confidence", f"{index + 1}.0", f"{index + 1}.end")
+
         self.items_text.pack(side=tk.LEFT, fill=tk.BOTH,
                              expand=True, padx=(0, 2))
         items_scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
@@ -371,11 +643,11 @@ class MainWindow:
         # 关闭对话框
         dialog.destroy()
 
-        # 写入Excel
-        self._write_to_excel_direct()
+        # 写入Excel（物品名已经人工确认）
+        self._write_to_excel_direct(confirmed=True)
 
-    def _write_to_excel_direct(self):
-        """直接写入Excel文件"""
+    def _write_to_excel_direct(self, confirmed=False):
+        """直接写入Excel文件，confirmed表示物品名已在确认对话框中人工核对"""
         if not self.extracted_title and not self.extracted_item_names:
             messagebox.showwarning("警告", "没有数据可写入")
             return
@@ -388,6 +660,14 @@ class MainWindow:
                 self.status_label.config(
                     text="数据已写入Excel，可以继续选择新区域", foreground="green")
                 logger.info("数据写入Excel成功")
+
+                # 人工确认过或全部达到置信度阈值的物品名才加入纠错词库，
+                # 避免未经核对的OCR结果反过来影响纠错
+                if confirmed or not self._find_low_confidence()[1]:
+                    self.ocr_processor.item_corrector.add_items(
+                        self.extracted_item_names, persist=True)
+                if self.item_index:
+                    self.item_index.mark_stale()
             else:
                 self.status_label.config(text="数据写入失败", foreground="red")
                 messagebox.showerror("错误", "数据写入Excel失败")
@@ -413,12 +693,29 @@ class MainWindow:
         """Excel排序处理"""
         try:
             success = self.data_sorter.sort_excel_data()
-            if success:
+            if success and self.data_sorter.last_sort_skipped:
+                self.status_label.config(
+                    text="排序数据没有变化", foreground="green")
+                messagebox.showinfo("成功", "数据自上次排序后没有变化，排序结果表无需更新。")
+            elif success:
                 self.status_label.config(
                     text="Excel排序处理完成", foreground="green")
-                messagebox.showinfo("成功", "Excel数据排序处理完成！")
-                # 重新打开Excel文件
-                self.excel_manager._open_excel_file()
+                if self.item_index:
+                    self.item_index.mark_stale()
+                message = "Excel数据排序处理完成！"
+                changed = self.data_sorter.last_sort_changed
+                if changed:
+                    message += f"\n\n有变化的类别 ({len(changed)}个): " + \
+                        "、".join(changed[:15]) + ("……" if len(changed) > 15 else "")
+                merge_report = self.data_sorter.last_merge_report
+                if merge_report:
+                    message += f"\n\n已合并 {len(merge_report)} 个近似重复套装:\n" + \
+                        "\n".join(f"• {record['merged_title']} → {record['kept_title']}"
+                                  for record in merge_report[:10])
+                messagebox.showinfo("成功", message)
+                # 结果已直接写入正在运行的Excel时无需重新打开
+                if not self.data_sorter.last_sort_live:
+                    self.excel_manager._open_excel_file()
             else:
                 self.status_label.config(text="排序处理失败", foreground="red")
                 messagebox.showerror("错误", "Excel排序处理失败")
@@ -426,6 +723,70 @@ class MainWindow:
             logger.error(f"排序处理失败: {e}")
             messagebox.showerror("错误", f"排序处理失败: {str(e)}")
 
+    def _search_items(self):
+        """查询物品所在的套装和历史数量
+
+        直接查询已有索引，同时在后台检查Excel是否变化；索引更新后重新显示当前查询的结果。
+        """
+        query = self.search_var.get().strip()
+        if not query:
+            return
+
+        try:
+            if self.item_index is None:
+                self.item_index = ItemIndex(self.data_sorter)
+            results = self.item_index.search(query)
+        except Exception as e:
+            logger.error(f"查询物品失败: {e}")
+            self.status_label.config(text="查询物品失败", foreground="red")
+            return
+
+        self.search_query = query
+        self._refresh_item_index()
+        self._show_search_results(query, results)
+
+    def _refresh_item_index(self):
+        """在后台读取Excel的变化，已有刷新在进行时不重复提交"""
+        if self.item_index_refreshing:
+            return
+        self.item_index_refreshing = True
+        item_index = self.item_index
+
+        def read_changes():
+            with self.excel_manager.worker_thread():
+                return item_index.read_changes()
+
+        self._run_in_background(read_changes, self._on_item_index_changes)
+
+    def _on_item_index_changes(self, future):
+        """在界面线程中更新索引，结果区仍显示查询结果时重新查询"""
+        self.item_index_refreshing = False
+        try:
+            changes = future.result()
+            if changes is not None:
+                self.item_index.apply_changes(changes)
+            if self.search_query:
+                self._show_search_results(self.search_query, self.item_index.search(self.search_query))
+        except Exception as e:
+            logger.error(f"更新物品索引失败: {e}")
+            self.status_label.config(text="更新物品索引失败", foreground="red")
+
+    def _show_search_results(self, query, results):
+        """显示查询结果"""
+        self.result_text.delete(1.0, tk.END)
+        self.result_text.insert(tk.END, f"🔎 查询: {query}\n")
+        self.result_text.insert(tk.END, "=" * 30 + "\n\n")
+        if results:
+            for location in results:
+                self.result_text.insert(tk.END, f"• {location.describe()}\n")
+            self.status_label.config(text=f"找到 {len(results)} 个结果", foreground="green")
+        elif self.item_index_refreshing:
+            self.result_text.insert(tk.END, "正在读取Excel更新物品索引，完成后自动刷新结果\n")
+            self.status_label.config(text="正在更新物品索引...", foreground="blue")
+        else:
+            self.result_text.insert(tk.END, "没有找到包含该名称的物品\n")
+            self.status_label.config(text="没有找到匹配的物品", foreground="blue")
+
     def _toggle_topmost(self):
         """切换窗口置顶状态"""
         self.root.attributes('-topmost', self.topmost.get())
@@ -503,12 +864,28 @@ class MainWindow:
         """保存确认对话框设置"""
         config_manager.set("show_confirmation", self.show_confirmation.get())
 
+    def _save_auto_commit_setting(self):
+        """保存高置信度自动写入设置"""
+        auto_commit_config = dict(config_manager.get("auto_commit", {}))
+        auto_commit_config["enabled"] = self.auto_commit.get()
+        config_manager.set("auto_commit", auto_commit_config)
+
     def _on_closing(self):
         """程序关闭时的清理工作"""
         # 关闭选框边框窗口
         if self.selection_border_window:
             self._hide_selection_border_window()
 
+        if self.background_executor is not None:
+            self.background_executor.shutdown(wait=False, cancel_futures=True)
+        self.speculative_ocr.close()
+        self.region_scanner.close()
+        self.ocr_processor.close()
+        self.screen_capture.close()
+
+        config_manager.stop_watching()
+        config_manager.flush()
+
         logger.info("程序正在关闭")
         self.root.destroy()
 
@@ -0,0 +1,153 @@
+# -*- coding: utf-8 -*-
+"""
+原子文件写入模块
+
+先写入同目录下的临时文件并fsync，再用os.replace替换目标文件，
+写入过程中崩溃或被终止时原文件保持完整；可选保留滚动备份。
+"""
+
+import os
+import shutil
+import stat
+import tempfile
+from contextlib import contextmanager
+from pathlib import Path
+from .logger import logger
+
+
+def _fsync_file(path):
+    """把文件内容刷到磁盘"""
+    with open(path, 'rb+') as f:
+        os.fsync(f.fileno())
+
+
+def _fsync_directory(directory):
+    """刷新目录项，确保rename已落盘（Windows不支持，直接跳过）"""
+    if os.name == 'nt':
+        return
+    try:
+        fd = os.open(directory, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def backup_path(path, index):
+    """第index个备份文件路径，例如 data.bak1.xlsx"""
+    path = Path(path)
+    return path.with_name(f"{path.stem}.bak{index}{path.suffix}")
+
+
+def _current_umask():
+    """读取进程的umask（os.umask只能通过设置来读取，模块加载时读取一次）"""
+    mask = os.umask(0)
+    os.umask(mask)
+    return mask
+
+
+_UMASK = _current_umask()
+
+
+def _copy_mode(path, temp_path):
+    """mkstemp创建的文件权限为0600，改为与原文件相同；原文件不存在时按umask设置为普通新建文件的权限"""
+    try:
+        mode = stat.S_IMODE(os.stat(path).st_mode)
+    except FileNotFoundError:
+        mode = 0o666 & ~_UMASK
+    try:
+        os.chmod(temp_path, mode)
+    except OSError:
+        pass
+
+
+def _snapshot_current(path, directory):
+    """替换前把当前文件链接（不支持硬链接时复制）到临时名称，替换成功后再作为bak1，返回临时路径"""
+    if not path.exists():
+        return None
+    fd, snapshot_name = tempfile.mkstemp(
+        prefix=f".{path.stem}.", suffix=f".bak{path.suffix}", dir=directory)
+    os.close(fd)
+    snapshot = Path(snapshot_name)
+    snapshot.unlink()
+    try:
+        # 优先使用硬链接，备份不需要复制文件内容；随后的替换不会影响链接到旧内容的备份
+        os.link(path, snapshot)
+    except OSError:
+        shutil.copy2(path, snapshot)
+    return snapshot
+
+
+def _rotate_backups(path, backup_count, snapshot):
+    """滚动备份：bak1→bak2……，替换前的文件成为bak1；只在替换成功后调用"""
+    for index in range(backup_count - 1, 0, -1):
+        source = backup_path(path, index)
+        if source.exists():
+            os.replace(source, backup_path(path, index + 1))
+    os.replace(snapshot, backup_path(path, 1))
+
+
+@contextmanager
+def atomic_write_path(path, backup_count=0):
+    """原子写入上下文，返回临时文件路径
+
+    with atomic_write_path("data.xlsx", backup_count=2) as temp_path:
+        workbook.save(temp_path)
+
+    上下文正常退出时临时文件替换目标文件，发生异常时删除临时文件并保留原文件。
+    替换失败（如文件被Excel锁定）时已有的备份保持不变，替换成功后才滚动备份。
+    """
+    path = Path(path)
+    directory = path.parent if str(path.parent) else Path('.')
+    fd, temp_name = tempfile.mkstemp(
+        prefix=f".{path.stem}.", suffix=f".tmp{path.suffix}", dir=directory)
+    os.close(fd)
+    temp_path = Path(temp_name)
+    snapshot = None
+
+    try:
+        yield temp_path
+        _fsync_file(temp_path)
+        _copy_mode(path, temp_path)
+        if backup_count > 0:
+            snapshot = _snapshot_current(path, directory)
+        os.replace(temp_path, path)
+        if snapshot is not None:
+            try:
+                _rotate_backups(path, backup_count, snapshot)
+            except OSError as e:
+                # 新内容已经写入，备份失败不影响本次保存
+                logger.warning(f"滚动备份失败: {e}")
+                try:
+                    snapshot.unlink()
+                except OSError:
+                    pass
+            snapshot = None
+        _fsync_directory(directory)
+    except BaseException:
+        for leftover in (temp_path, snapshot):
+            if leftover is None:
+                continue
+            try:
+                leftover.unlink()
+            except OSError:
+                pass
+        raise
+
+
+def atomic_save_workbook(workbook, path, backup_count=0):
+    """原子保存openpyxl工作簿"""
+    with atomic_write_path(path, backup_count) as temp_path:
+        workbook.save(temp_path)
+    logger.info(f"工作簿已安全保存: {path}")
+
+
+def atomic_write_text(path, text, encoding='utf-8'):
+    """原子写入文本文件"""
+    with atomic_write_path(path) as temp_path:
+        with open(temp_path, 'w', encoding=encoding) as f:
+            f.write(text)
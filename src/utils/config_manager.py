@@ -1,72 +1,235 @@
 # -*- coding: utf-8 -*-
 """
 配置管理模块
+
+修改配置后延迟一段时间再原子写入文件，连续修改只写一次；
+后台线程轮询.env和配置文件的修改时间，文件被外部修改后重新加载并通知监听者。
 """
 
+import atexit
 import os
 import json
+import threading
+import weakref
 from pathlib import Path
 from .logger import logger
+from .atomic_file import atomic_write_text
 
 try:
-    from dotenv import load_dotenv
-    load_dotenv()
+    from dotenv import load_dotenv, find_dotenv, dotenv_values
+    ENV_FILE = find_dotenv()
+    # 由.env写入进程环境变量的键（load_dotenv不覆盖已有的环境变量），
+    # 重新加载时这些键只从.env读取，从.env中删除后不再沿用启动时的值
+    ENV_FILE_KEYS = frozenset(key for key in dotenv_values(ENV_FILE) if key not in os.environ) \
+        if ENV_FILE else frozenset()
+    load_dotenv(ENV_FILE)
+    DOTENV_AVAILABLE = True
 except ImportError:
+    ENV_FILE = ""
+    ENV_FILE_KEYS = frozenset()
+    DOTENV_AVAILABLE = False
     logger.warning("dotenv未安装，将直接读取环境变量")
 
 
+def _file_stamp(path):
+    """文件的修改时间和大小，文件不存在时返回None"""
+    try:
+        stat = os.stat(path)
+        return stat.st_mtime_ns, stat.st_size
+    except OSError:
+        return None
+
+
 class ConfigManager:
     """配置管理器"""
 
     def __init__(self, config_file="screen_ocr_config.json"):
         self.config_file = Path(config_file)
+        self.env_file = Path(ENV_FILE) if ENV_FILE else None
         self.config = self._load_config()
+        self.env_values = None  # 热加载时重新读取的.env内容，启动时为None
         self.env_config = self._load_env_config()
 
-    def _load_config(self):
-        """加载JSON配置文件"""
-        default_config = {
+        self._lock = threading.RLock()
+        self._save_timer = None
+        self._dirty_keys = set()  # 已修改但还未写入文件的配置项
+        self._listeners = []
+        self._watch_thread = None
+        self._watch_stop = threading.Event()
+        self._stamps = {}
+
+    def _default_config(self):
+        """默认配置"""
+        return {
             "auto_open_excel": False,
             "show_confirmation": True,
             "window_topmost": False,
             "show_selection_border": False,
             "selection_coordinates": {"x1": 0, "y1": 0, "x2": 0, "y2": 0},
             "save_debug_images": True,
-            "debug_image_dir": "debug_images"
+            "debug_image_dir": "debug_images",
+            # 截图PNG压缩级别（0~9），编码结果由OCR请求和调试归档共用
+            "png_compress_level": 1,
+            # OCR结果缓存条数，相同画面不重复请求
+            "ocr_result_cache_size": 16,
+            # OCR请求限流（所有调用共享的令牌桶）、重试和熔断配置
+            "ocr_rate_limit": {"qps": 10, "burst": 10},
+            "ocr_retry": {"max_attempts": 3, "base_delay": 0.5, "max_delay": 5.0},
+            "ocr_circuit_breaker": {"failure_threshold": 5, "reset_timeout": 30},
+            # OCR客户端池：每项可配置name、region、endpoint、protocol、weight、qps/burst，
+            # 以及secret_id_env/secret_key_env（存放密钥的环境变量名）；为空时使用.env中的单个账号
+            "ocr_endpoints": [],
+            # 分发策略：least_outstanding（最少在途请求）或 weighted_round_robin（加权轮询）
+            "ocr_dispatch_strategy": "least_outstanding",
+            # OCR原始响应记录：sink（logs/下的压缩JSONL）、text（写入文本日志）或off
+            "raw_response_log": "sink",
+            # 调试图片归档：后台写入队列长度和保留策略
+            "debug_archive": {
+                "queue_size": 8,
+                "max_count": 500,
+                "max_total_mb": 200,
+                "max_age_days": 7
+            },
+            # 模糊去重配置：merge_policy可选 keep_first / keep_longest / union
+            "fuzzy_dedup": {
+                "enabled": True,
+                "title_threshold": 0.85,
+                "item_threshold": 0.85,
+                "merge_policy": "union"
+            },
+            # 物品名纠错配置：基于已确认物品名词库纠正OCR误识别
+            "item_correction": {
+                "enabled": True,
+                "max_edit_distance": 1,
+                "min_confidence": 0.75,
+                "store_file": "known_items.json"
+            },
+            # 高置信度结果自动写入，跳过确认对话框（置信度取值0~100）
+            "auto_commit": {
+                "enabled": False,
+                "min_confidence": 90
+            },
+            # 排序结果表布局：每个类别块的列数（标题、物品名、数量列和1列空隙），
+            # 每排最多列数（0表示不换排），排间空行数，以及是否按年份分表
+            "sorted_layout": {
+                "block_width": 5,
+                "max_width": 0,
+                "band_gap_rows": 2,
+                "sheet_per_year": False
+            },
+            # 工作簿已在Excel中打开时，排序结果通过xlwings直接写入
+            "live_sort_output": True,
+            # 工作簿已在Excel中打开时，通过xlwings读取实时数据（包含未保存的修改）
+            "live_excel_read": True,
+            # 写入原始数据时直接修改工作表XML追加，失败时改用openpyxl
+            "xlsx_patch_append": True,
+            # 保存工作簿时保留的滚动备份数量（0表示不备份）
+            "excel_backup_count": 2,
+            # 上次排序的内容摘要，内容未变化时跳过重写
+            "sort_state_file": "sort_state.json",
+            # 排序结果导出：engine为xml（直接生成工作表XML，不支持时改用openpyxl）或openpyxl；
+            # 单元格数达到parallel_min_cells时用max_workers个进程并行生成（0表示CPU核数）
+            "sorted_export": {
+                "engine": "xml",
+                "max_workers": 0,
+                "parallel_min_cells": 200000
+            },
+            # 物品索引：索引文件、每次查询最多返回的结果数；
+            # Excel正在打开时无法根据文件时间判断是否修改，按live_refresh_seconds间隔重新读取
+            "item_index": {
+                "file": "item_index.json",
+                "search_limit": 50,
+                "live_refresh_seconds": 60
+            },
+            # OCR引擎：tencent（腾讯云表格识别）或 local（本地Tesseract）
+            "ocr_engine": "tencent",
+            "local_ocr": {
+                "lang": "chi_sim",
+                "tesseract_cmd": "",
+                "max_workers": 0,
+                "dark_threshold": 100,
+                "line_ratio": 0.5
+            },
+            # 表格模板快速识别：学习表格网格后只识别标题条和物品名列
+            "use_table_template": False,
+            "table_template": None,
+            # 截图后端：auto / mss / pil / replay（replay从capture_replay_source回放图片）
+            "capture_backend": "auto",
+            "capture_replay_source": "test_pic",
+            # 多区域识别：每项为{"name", "x1", "y1", "x2", "y2", "profile"}，profile为full（标题和物品名）、
+            # title（只取标题）或items（只取物品名）；配置后一次截图、并行识别所有区域并合并写入
+            "capture_regions": [],
+            "region_ocr_max_workers": 4,
+            # 框选区域后立即在后台预识别，点击识别时画面未变化则直接使用预识别结果
+            "speculative_ocr": False,
+            # 配置热加载：修改配置后延迟save_delay秒写入文件（连续修改只写一次），
+            # 每poll_interval秒检查.env和配置文件，被外部修改后重新加载过滤和类别规则
+            "config_reload": {
+                "enabled": True,
+                "poll_interval": 1.0,
+                "save_delay": 0.5
+            }
         }
 
+    def _read_config_file(self):
+        """读取配置文件并与默认配置合并（字典类型的配置项逐键合并），读取失败时抛出异常"""
+        default_config = self._default_config()
+        with open(self.config_file, 'r', encoding='utf-8') as f:
+            config = json.load(f)
+        merged = {**default_config, **config}
+        for key, value in default_config.items():
+            if isinstance(value, dict) and isinstance(config.get(key), dict):
+                merged[key] = {**value, **config[key]}
+        return merged
+
+    def _load_config(self):
+        """加载JSON配置文件"""
         try:
             if self.config_file.exists():
-                with open(self.config_file, 'r', encoding='utf-8') as f:
-                    config = json.load(f)
-                    # 合并默认配置和用户配置
-                    return {**default_config, **config}
+                return self._read_config_file()
             else:
                 logger.info(f"配置文件不存在，使用默认配置: {self.config_file}")
-                return default_config
+                return self._default_config()
         except Exception as e:
             logger.error(f"加载配置文件失败: {e}")
-            return default_config
+            return self._default_config()
+
+    @staticmethod
+    def _resolve_env(name, env_values, default=None):
+        """读取环境变量
 
-    def _load_env_config(self):
+        env_values为重新读取的.env内容，其中的值优先于进程启动时的环境变量；
+        启动时来自.env的键只从env_values读取，已从.env中删除时使用默认值。
+        """
+        if env_values is not None:
+            if env_values.get(name) is not None:
+                return env_values[name]
+            if name in ENV_FILE_KEYS:
+                return default
+        return os.getenv(name, default)
+
+    def _load_env_config(self, env_values=None):
         """加载环境变量配置"""
+        def getenv(name, default=None):
+            return self._resolve_env(name, env_values, default)
+
         return {
             # 腾讯云API配置
-            'secret_id': os.getenv("TENCENTCLOUD_SECRET_ID"),
-            'secret_key': os.getenv("TENCENTCLOUD_SECRET_KEY"),
+            'secret_id': getenv("TENCENTCLOUD_SECRET_ID"),
+            'secret_key': getenv("TENCENTCLOUD_SECRET_KEY"),
 
             # Excel文件配置
-            'excel_file_path': os.getenv("EXCEL_FILE_PATH"),
-            'excel_file_name': os.getenv("EXCEL_FILE_NAME"),
-            'excel_sheet_name': os.getenv("EXCEL_SHEET_NAME"),
-            'excel_sorted_sheet_name': os.getenv("EXCEL_SORTED_SHEET_NAME", "排序结果"),
+            'excel_file_path': getenv("EXCEL_FILE_PATH"),
+            'excel_file_name': getenv("EXCEL_FILE_NAME"),
+            'excel_sheet_name': getenv("EXCEL_SHEET_NAME"),
+            'excel_sorted_sheet_name': getenv("EXCEL_SORTED_SHEET_NAME", "排序结果"),
 
             # OCR过滤配置
-            'filter_invalid_patterns': self._parse_list(os.getenv("FILTER_INVALID_ITEM_PATTERNS", "")),
-            'filter_invalid_texts': self._parse_list(os.getenv("FILTER_INVALID_ITEM_TEXTS", "")),
-            'filter_title_blacklist': self._parse_list(os.getenv("FILTER_TITLE_BLACKLIST", "")),
-            'category_modifiers_to_remove': self._parse_list(os.getenv("CATEGORY_MODIFIERS_TO_REMOVE", "")),
-            'category_priority_order': self._parse_list(os.getenv("CATEGORY_PRIORITY_ORDER", ""))
+            'filter_invalid_patterns': self._parse_list(getenv("FILTER_INVALID_ITEM_PATTERNS", "")),
+            'filter_invalid_texts': self._parse_list(getenv("FILTER_INVALID_ITEM_TEXTS", "")),
+            'filter_title_blacklist': self._parse_list(getenv("FILTER_TITLE_BLACKLIST", "")),
+            'category_modifiers_to_remove': self._parse_list(getenv("CATEGORY_MODIFIERS_TO_REMOVE", "")),
+            'category_priority_order': self._parse_list(getenv("CATEGORY_PRIORITY_ORDER", ""))
         }
 
     def _parse_list(self, value):
@@ -76,27 +239,150 @@ class ConfigManager:
         return [item.strip() for item in value.split(",") if item.strip()]
 
     def save_config(self):
-        """保存配置到文件"""
-        try:
-            with open(self.config_file, 'w', encoding='utf-8') as f:
-                json.dump(self.config, f, ensure_ascii=False, indent=2)
-            logger.info(f"配置已保存到: {self.config_file}")
-        except Exception as e:
-            logger.error(f"保存配置文件失败: {e}")
+        """立即原子写入配置文件"""
+        with self._lock:
+            if self._save_timer is not None:
+                self._save_timer.cancel()
+                self._save_timer = None
+            try:
+                atomic_write_text(self.config_file,
+                                  json.dumps(self.config, ensure_ascii=False, indent=2))
+                self._dirty_keys.clear()
+                # 记录自己写入后的时间戳，轮询时不当作外部修改
+                self._stamps[self.config_file] = _file_stamp(self.config_file)
+                logger.info(f"配置已保存到: {self.config_file}")
+            except Exception as e:
+                logger.error(f"保存配置文件失败: {e}")
+
+    def flush(self):
+        """有尚未写入的修改时立即写入（程序退出前调用）"""
+        with self._lock:
+            if self._dirty_keys:
+                self.save_config()
 
     def get(self, key, default=None):
         """获取配置值"""
         return self.config.get(key, default)
 
     def set(self, key, value):
-        """设置配置值"""
-        self.config[key] = value
-        self.save_config()
+        """设置配置值，延迟save_delay秒后写入文件，期间的多次修改合并为一次写入"""
+        with self._lock:
+            self.config[key] = value
+            self._dirty_keys.add(key)
+            delay = self.config.get("config_reload", {}).get("save_delay", 0.5)
+            if delay <= 0:
+                self.save_config()
+                return
+            if self._save_timer is not None:
+                self._save_timer.cancel()
+            self._save_timer = threading.Timer(delay, self.flush)
+            self._save_timer.daemon = True
+            self._save_timer.start()
+
+    # ---------- 热加载 ----------
+
+    def add_listener(self, callback):
+        """注册配置重新加载后的回调（在轮询线程中调用）
+
+        绑定方法以弱引用保存，对象被释放后自动移除，不会因为注册监听而无法回收。
+        """
+        with self._lock:
+            if hasattr(callback, '__self__'):
+                self._listeners.append(weakref.WeakMethod(callback))
+            else:
+                self._listeners.append(lambda: callback)
+
+    def _watched_files(self):
+        """需要轮询的文件"""
+        files = [self.config_file]
+        if self.env_file is not None and DOTENV_AVAILABLE:
+            files.append(self.env_file)
+        return files
+
+    def start_watching(self):
+        """启动后台轮询线程"""
+        reload_config = self.config.get("config_reload", {})
+        if not reload_config.get("enabled", True):
+            return
+        if self._watch_thread is not None and self._watch_thread.is_alive():
+            return
+
+        with self._lock:
+            for path in self._watched_files():
+                self._stamps[path] = _file_stamp(path)
+        self._watch_stop.clear()
+        self._watch_thread = threading.Thread(
+            target=self._watch, args=(reload_config.get("poll_interval", 1.0),),
+            name="ConfigWatcher", daemon=True)
+        self._watch_thread.start()
+        logger.info(f"开始监视配置文件: {[str(path) for path in self._watched_files()]}")
+
+    def stop_watching(self, timeout=2):
+        """停止后台轮询线程"""
+        self._watch_stop.set()
+        if self._watch_thread is not None:
+            self._watch_thread.join(timeout)
+            self._watch_thread = None
+
+    def _watch(self, interval):
+        """轮询循环"""
+        while not self._watch_stop.wait(interval):
+            try:
+                self.check_for_changes()
+            except Exception as e:
+                logger.error(f"检查配置文件变化失败: {e}")
+
+    def check_for_changes(self):
+        """检查.env和配置文件是否被外部修改，有修改时重新加载并通知监听者，返回是否重新加载"""
+        with self._lock:
+            changed = []
+            for path in self._watched_files():
+                stamp = _file_stamp(path)
+                if stamp != self._stamps.get(path):
+                    self._stamps[path] = stamp
+                    changed.append(path)
+            if not changed:
+                return False
+
+            if self.config_file in changed and self.config_file.exists():
+                try:
+                    config = self._read_config_file()
+                except Exception as e:
+                    # 编辑器可能正在写入，等下次修改时间变化时再读取
+                    logger.warning(f"重新加载配置文件失败，保留当前配置: {e}")
+                else:
+                    # 尚未写入文件的修改优先
+                    for key in self._dirty_keys:
+                        config[key] = self.config[key]
+                    self.config = config
+            if self.env_file in changed:
+                self.env_values = dotenv_values(self.env_file)
+                self.env_config = self._load_env_config(self.env_values)
+
+            listeners = list(self._listeners)
+
+        logger.info(f"配置文件已修改，重新加载: {[path.name for path in changed]}")
+        for reference in listeners:
+            callback = reference()
+            if callback is None:
+                continue
+            try:
+                callback()
+            except Exception as e:
+                logger.error(f"应用新配置失败: {e}")
+        with self._lock:
+            # 移除已被回收的对象的监听
+            self._listeners = [reference for reference in self._listeners if reference() is not None]
+        return True
 
     def get_env(self, key, default=None):
         """获取环境变量配置"""
         return self.env_config.get(key, default)
 
+    def get_env_var(self, name, default=None):
+        """按变量名读取环境变量（如ocr_endpoints中配置的密钥变量），与get_env一样随.env热加载更新"""
+        return self._resolve_env(name, self.env_values, default)
+
     def validate_env_config(self):
         """验证环境变量配置"""
         errors = []
@@ -132,6 +418,20 @@ class ConfigManager:
             "priority_order": self.env_config['category_priority_order']
         }
 
+    def get_dedup_config(self):
+        """获取模糊去重配置"""
+        return self.config.get("fuzzy_dedup", {})
+
+    def get_correction_config(self):
+        """获取物品名纠错配置"""
+        return self.config.get("item_correction", {})
+
+    def get_layout_config(self):
+        """获取排序结果表布局配置"""
+        return self.config.get("sorted_layout", {})
+
 
 # 全局配置管理器实例
 config_manager = ConfigManager()
+# 退出前写入延迟保存的修改
+atexit.register(config_manager.flush)
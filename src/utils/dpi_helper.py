@@ -4,11 +4,15 @@ DPI和显示缩放处理模块
 """
 
 import ctypes
-import ctypes.wintypes
 import tkinter as tk
-from ctypes import windll
 from .logger import logger
 
+try:
+    from ctypes import windll
+except ImportError:
+    # 非Windows平台（如无显示环境下的基准测试）没有windll
+    windll = None
+
 
 class DPIHelper:
     """DPI和显示缩放处理器"""
@@ -21,6 +25,10 @@ class DPIHelper:
 
     def _init_dpi_awareness(self):
         """初始化DPI感知"""
+        if windll is None:
+            logger.info("非Windows平台，跳过DPI感知设置")
+            return
+
         try:
             # 设置DPI感知
             windll.shcore.SetProcessDpiAwareness(1)  # PROCESS_SYSTEM_DPI_AWARE
@@ -36,6 +44,9 @@ class DPIHelper:
 
     def get_dpi_scale(self):
         """获取当前DPI缩放比例"""
+        if windll is None:
+            return 1.0
+
         try:
             # 获取主显示器DPI
             hdc = windll.user32.GetDC(0)
@@ -0,0 +1,132 @@
+# -*- coding: utf-8 -*-
+"""
+模糊匹配模块
+
+基于字符n-gram倒排索引的近似字符串检索，用于OCR文本去重。
+"""
+
+import math
+from collections import defaultdict
+
+
+def normalize_text(text):
+    """规范化文本：统一括号、去除空白、转小写"""
+    if not text:
+        return ""
+    normalized = str(text).replace('（', '(').replace('）', ')')
+    normalized = "".join(normalized.split()).replace('　', '')
+    return normalized.lower()
+
+
+def levenshtein_distance(a, b, max_distance=None):
+    """计算编辑距离，超过max_distance时提前返回max_distance + 1"""
+    if a == b:
+        return 0
+    if len(a) < len(b):
+        a, b = b, a
+    if max_distance is not None and len(a) - len(b) > max_distance:
+        return max_distance + 1
+    if not b:
+        return len(a)
+
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, 1):
+        current = [i]
+        row_min = i
+        for j, char_b in enumerate(b, 1):
+            cost = 0 if char_a == char_b else 1
+            value = min(previous[j] + 1, current[j - 1] + 1,
+                        previous[j - 1] + cost)
+            current.append(value)
+            if value < row_min:
+                row_min = value
+        if max_distance is not None and row_min > max_distance:
+            return max_distance + 1
+        previous = current
+    return previous[-1]
+
+
+def similarity(a, b):
+    """基于编辑距离的相似度，范围0~1"""
+    if not a and not b:
+        return 1.0
+    longest = max(len(a), len(b))
+    return 1.0 - levenshtein_distance(a, b) / longest
+
+
+class NGramIndex:
+    """字符n-gram倒排索引
+
+    候选检索只访问与查询共享n-gram的条目，检索代价与词库大小无关，
+    再通过q-gram计数下界和编辑距离校验得到最终结果。
+    """
+
+    def __init__(self, n=2):
+        self.n = n
+        self.keys = []
+        self.values = []
+        self.postings = defaultdict(list)
+
+    def __len__(self):
+        return len(self.keys)
+
+    def _grams(self, text):
+        """生成去重后的n-gram集合"""
+        if len(text) <= self.n:
+            return {text}
+        return {text[i:i + self.n] for i in range(len(text) - self.n + 1)}
+
+    def add(self, key, value=None):
+        """添加条目，返回条目编号"""
+        entry_id = len(self.keys)
+        self.keys.append(key)
+        self.values.append(value)
+        for gram in self._grams(key):
+            self.postings[gram].append(entry_id)
+        return entry_id
+
+    def candidates(self, text, threshold):
+        """返回可能满足相似度阈值的候选条目编号"""
+        query_grams = self._grams(text)
+        counts = defaultdict(int)
+        for gram in query_grams:
+            for entry_id in self.postings.get(gram, ()):
+                counts[entry_id] += 1
+
+        result = []
+        for entry_id, shared in counts.items():
+            key = self.keys[entry_id]
+            longest = max(len(key), len(text))
+            max_distance = math.floor((1.0 - threshold) * longest)
+            # q-gram引理：每次编辑最多破坏n个gram
+            required = max(len(query_grams), len(self._grams(key))) - \
+                max_distance * self.n
+            if shared >= required:
+                result.append(entry_id)
+        return result
+
+    def find_similar(self, text, threshold=0.85, accept=None):
+        """查找相似度不低于阈值的条目，按相似度从高到低返回
+
+        accept: 可选的过滤函数，接收条目的value，返回False时跳过该条目
+        """
+        matches = []
+        for entry_id in self.candidates(text, threshold):
+            value = self.values[entry_id]
+            if accept is not None and not accept(value):
+                continue
+            key = self.keys[entry_id]
+            longest = max(len(key), len(text)) or 1
+            max_distance = math.floor((1.0 - threshold) * longest)
+            distance = levenshtein_distance(text, key, max_distance)
+            if distance > max_distance:
+                continue
+            matches.append((key, value, 1.0 - distance / longest))
+
+        matches.sort(key=lambda x: x[2], reverse=True)
+        return matches
+
+    def find_best(self, text, threshold=0.85, accept=None):
+        """查找最相似的条目，没有满足阈值的条目时返回None"""
+        matches = self.find_similar(text, threshold, accept)
+        return matches[0] if matches else None
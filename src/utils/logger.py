@@ -1,14 +1,31 @@
 # -*- coding: utf-8 -*-
 """
 日志管理模块
+
+日志记录只把记录放入队列，由后台监听线程负责格式化和写文件，
+调用方线程不再等待磁盘I/O。
 """
 
+import atexit
 import logging
+import logging.handlers
 import os
+import queue
 from datetime import datetime
 from pathlib import Path
 
 
+class _DeferredQueueHandler(logging.handlers.QueueHandler):
+    """不在调用线程格式化消息的队列处理器
+
+    标准QueueHandler会在入队前格式化消息以便跨进程传递；
+    这里队列只在进程内使用，直接传递原始记录，格式化留给后台线程。
+    """
+
+    def prepare(self, record):
+        return record
+
+
 class Logger:
     """日志管理器"""
     
@@ -31,6 +48,8 @@ class Logger:
         self.logger = logging.getLogger(name)
         self.logger.setLevel(logging.INFO)
         
+        self.listener = None
+
         # 避免重复添加handler
         if not self.logger.handlers:
             # 文件处理器
@@ -43,24 +62,41 @@ class Logger:
             console_handler.setLevel(logging.WARNING)
             console_handler.setFormatter(formatter)
             
-            self.logger.addHandler(file_handler)
-            self.logger.addHandler(console_handler)
+            # 队列处理器：调用线程只入队，由后台线程写入文件和控制台
+            log_queue = queue.SimpleQueue()
+            self.listener = logging.handlers.QueueListener(
+                log_queue, file_handler, console_handler, respect_handler_level=True)
+            self.listener.start()
+            self.logger.addHandler(_DeferredQueueHandler(log_queue))
+            atexit.register(self.close)
     
-    def info(self, message):
+    # 以下方法支持%风格的延迟格式化参数，例如 logger.debug("写入 %s", name)，
+    # 日志级别被过滤时不会格式化消息
+    def info(self, message, *args, **kwargs):
         """记录信息日志"""
-        self.logger.info(message)
+        self.logger.info(message, *args, **kwargs)
     
-    def warning(self, message):
+    def warning(self, message, *args, **kwargs):
         """记录警告日志"""
-        self.logger.warning(message)
+        self.logger.warning(message, *args, **kwargs)
     
-    def error(self, message):
+    def error(self, message, *args, **kwargs):
         """记录错误日志"""
-        self.logger.error(message)
+        self.logger.error(message, *args, **kwargs)
     
-    def debug(self, message):
+    def debug(self, message, *args, **kwargs):
         """记录调试日志"""
-        self.logger.debug(message)
+        self.logger.debug(message, *args, **kwargs)
+
+    def is_enabled_for(self, level):
+        """判断级别是否会被记录，用于跳过昂贵的日志参数计算"""
+        return self.logger.isEnabledFor(level)
+
+    def close(self):
+        """停止后台线程，写完队列中剩余的日志"""
+        if self.listener is not None:
+            self.listener.stop()
+            self.listener = None
 
 
 # 全局日志实例
@@ -0,0 +1,161 @@
+# -*- coding: utf-8 -*-
+"""
+多模式匹配模块
+
+物品名过滤、类别修饰词清理和类别优先级都是用一组词或正则逐个去匹配同一段文本，
+规则越多越慢。这里把一组关键词编译成Aho-Corasick自动机，把一组正则合并成一个正则，
+匹配耗时只与文本长度有关，与规则数量无关。编译结果按规则内容缓存，规则不变时不会重复编译。
+"""
+
+import re
+from collections import deque
+from functools import lru_cache
+from .logger import logger
+
+# 无法合并的正则：反向引用（合并后分组编号会错位）和开头的全局标志（只能出现在整个正则开头）
+_UNMERGEABLE = re.compile(r'\\[1-9]|\(\?P=|^\(\?[aiLmsux]+\)')
+
+
+class KeywordMatcher:
+    """Aho-Corasick多关键词匹配，关键词的顺序即优先级（越靠前越优先）"""
+
+    # remove结果缓存的最大条数（类别名重复很多，缓存后大多数调用不需要扫描）
+    CACHE_SIZE = 4096
+
+    def __init__(self, keywords):
+        self.keywords = list(dict.fromkeys(keyword for keyword in keywords if keyword))
+        self._index = {keyword: index for index, keyword in enumerate(self.keywords)}
+        self._removed = {}
+
+        goto = [{}]       # 状态 -> {字符: 下一状态}（字典树）
+        outputs = [()]    # 状态 -> 在此结束的关键词下标（含失配链上的）
+        for index, keyword in enumerate(self.keywords):
+            state = 0
+            for char in keyword:
+                next_state = goto[state].get(char)
+                if next_state is None:
+                    next_state = len(goto)
+                    goto[state][char] = next_state
+                    goto.append({})
+                    outputs.append(())
+                state = next_state
+            outputs[state] = (index,)
+
+        # 按层次遍历计算失配链，并把失配跳转展开成完整的状态转移表，
+        # 匹配时每个字符只需查一次字典；转移表中没有的字符回到初始状态
+        fail = [0] * len(goto)
+        self._delta = [dict(goto[0])] + [None] * (len(goto) - 1)
+        queue = deque(goto[0].values())
+        while queue:
+            state = queue.popleft()
+            delta = dict(self._delta[fail[state]])
+            delta.update(goto[state])
+            self._delta[state] = delta
+            for char, next_state in goto[state].items():
+                fail[next_state] = self._delta[fail[state]].get(char, 0) if state else 0
+                outputs[next_state] += outputs[fail[next_state]]
+                queue.append(next_state)
+        self._outputs = outputs
+
+    def __len__(self):
+        return len(self.keywords)
+
+    def iter_matches(self, text):
+        """依次返回文本中出现的关键词：(起始位置, 结束位置, 关键词下标)"""
+        delta, outputs, keywords = self._delta, self._outputs, self.keywords
+        state = 0
+        for position, char in enumerate(text):
+            state = delta[state].get(char, 0)
+            if outputs[state]:
+                for index in outputs[state]:
+                    yield position + 1 - len(keywords[index]), position + 1, index
+
+    def contains_any(self, text):
+        """文本中是否出现任一关键词"""
+        return bool(self.keywords) and next(self.iter_matches(text), None) is not None
+
+    def first_index(self, text):
+        """文本中出现的最靠前（优先级最高）的关键词下标，没有时返回None"""
+        return min((index for _, _, index in self.iter_matches(text)), default=None)
+
+    def rank(self, text):
+        """文本与某个关键词完全相同时返回该关键词的下标，否则按包含的关键词返回first_index"""
+        index = self._index.get(text)
+        return index if index is not None else self.first_index(text)
+
+    def remove(self, text):
+        """删除文本中出现的关键词，重叠时保留最左、最长的一处"""
+        if not self.keywords:
+            return text
+        removed = self._removed.get(text)
+        if removed is not None:
+            return removed
+
+        pieces = []
+        position = 0
+        for start, negative_end in sorted((start, -end) for start, end, _ in self.iter_matches(text)):
+            if start >= position:
+                pieces.append(text[position:start])
+                position = -negative_end
+        pieces.append(text[position:])
+        removed = "".join(pieces)
+
+        if len(self._removed) >= self.CACHE_SIZE:
+            self._removed.clear()
+        self._removed[text] = removed
+        return removed
+
+
+class PatternMatcher:
+    """把多个正则合并成一个，一次匹配代替逐个匹配"""
+
+    def __init__(self, patterns):
+        self.patterns = []
+        for pattern in dict.fromkeys(patterns):
+            try:
+                re.compile(pattern)
+                self.patterns.append(pattern)
+            except re.error as e:
+                logger.warning(f"忽略无效的正则表达式 {pattern!r}: {e}")
+
+        # 能合并的正则合并为一个，其余逐个匹配
+        mergeable = [pattern for pattern in self.patterns if not _UNMERGEABLE.search(pattern)]
+        self._compiled = [re.compile(pattern) for pattern in self.patterns
+                          if _UNMERGEABLE.search(pattern)]
+        if mergeable:
+            try:
+                self._compiled.insert(0, re.compile("|".join(f"(?:{pattern})" for pattern in mergeable)))
+            except re.error:
+                # 重复的分组名等情况无法合并
+                self._compiled[:0] = [re.compile(pattern) for pattern in mergeable]
+
+    def __len__(self):
+        return len(self.patterns)
+
+    def match(self, text):
+        """任一正则从文本开头匹配成功（与re.match相同）"""
+        return any(compiled.match(text) for compiled in self._compiled)
+
+    def search(self, text):
+        """任一正则在文本中匹配成功（与re.search相同）"""
+        return any(compiled.search(text) for compiled in self._compiled)
+
+
+@lru_cache(maxsize=32)
+def _keyword_matcher(keywords):
+    return KeywordMatcher(keywords)
+
+
+@lru_cache(maxsize=32)
+def _pattern_matcher(patterns):
+    return PatternMatcher(patterns)
+
+
+def keyword_matcher(keywords):
+    """获取关键词匹配器，相同关键词列表共用同一个已编译的自动机"""
+    return _keyword_matcher(tuple(keywords or ()))
+
+
+def pattern_matcher(patterns):
+    """获取正则匹配器，相同正则列表共用同一个已编译的正则"""
+    return _pattern_matcher(tuple(patterns or ()))
@@ -0,0 +1,108 @@
+# -*- coding: utf-8 -*-
+"""
+OCR原始响应存储模块
+
+把OCR接口的原始响应以压缩JSONL格式单独保存，不再写入文本日志。
+序列化和压缩在后台线程中进行，每批记录追加为一个gzip成员，
+文件可以直接用gzip.open逐行读取。
+"""
+
+import gzip
+import json
+import queue
+import threading
+from datetime import datetime
+from pathlib import Path
+from .logger import logger
+
+FILE_PREFIX = "ocr_responses_"
+
+
+class RawResponseSink:
+    """OCR原始响应存储"""
+
+    def __init__(self, log_dir="logs", queue_size=32, batch_size=16):
+        self.log_dir = Path(log_dir)
+        self.log_dir.mkdir(exist_ok=True)
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.batch_size = batch_size
+        self.thread = None
+        self.dropped = 0
+
+    def _ensure_thread(self):
+        """首次提交时启动后台写入线程"""
+        if self.thread is None or not self.thread.is_alive():
+            self.thread = threading.Thread(
+                target=self._worker, name="RawResponseSink", daemon=True)
+            self.thread.start()
+
+    def submit(self, action, response, digest=None):
+        """提交一条原始响应，不阻塞识别流程；队列已满时丢弃"""
+        self._ensure_thread()
+        record = {
+            "time": datetime.now().isoformat(timespec="milliseconds"),
+            "action": action,
+            "digest": digest,
+            "response": response,
+        }
+        try:
+            self.queue.put_nowait(record)
+            return True
+        except queue.Full:
+            self.dropped += 1
+            logger.warning("OCR原始响应队列已满，丢弃本条记录（累计丢弃 %d 条）", self.dropped)
+            return False
+
+    def close(self, timeout=5):
+        """等待队列写完并停止后台线程"""
+        if self.thread is None or not self.thread.is_alive():
+            return
+        try:
+            self.queue.put(None, timeout=timeout)
+        except queue.Full:
+            return
+        self.thread.join(timeout)
+
+    def _worker(self):
+        """后台写入循环，一次取出队列中积压的多条记录批量写入"""
+        while True:
+            record = self.queue.get()
+            if record is None:
+                break
+
+            batch = [record]
+            stop = False
+            while len(batch) < self.batch_size:
+                try:
+                    record = self.queue.get_nowait()
+                except queue.Empty:
+                    break
+                if record is None:
+                    stop = True
+                    break
+                batch.append(record)
+
+            try:
+                self._write(batch)
+            except Exception as e:
+                logger.error("保存OCR原始响应失败: %s", e)
+
+            if stop:
+                break
+
+    def _write(self, batch):
+        """把一批记录追加为一个gzip成员"""
+        path = self.log_dir / f"{FILE_PREFIX}{datetime.now().strftime('%Y%m%d')}.jsonl.gz"
+        lines = "".join(json.dumps(record, ensure_ascii=False, separators=(",", ":")) + "\n"
+                        for record in batch)
+        with gzip.open(path, "at", encoding="utf-8") as f:
+            f.write(lines)
+
+
+def iter_raw_responses(path):
+    """逐条读取压缩JSONL中的原始响应记录"""
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                yield json.loads(line)